@@ -2,25 +2,64 @@
 This module is the main module of the PyZabbixObj project
 """
 
-from __future__ import unicode_literals
+from __future__ import unicode_literals, print_function
 import logging
-import requests
+import re
+import sys
+import threading
+import time
+import weakref
 import json
-import inspect
-from pprint import pprint
+import itertools
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from .transport import RequestsTransport
+from .concurrency import RateLimiter, SingleFlight
+from .cache import ObjectCache, copy_json
+from .streaming import iter_result
+from .history import fetch_history, fetch_trends
+from .events import watch_events
+from .registry import ObjectType, object_types, lookup as _lookup
+from .stats import RequestStats, prometheus_text
+from . import records
 
 rpc_url = "/api_jsonrpc.php"
 non_auth_methods = ["user.login","apiinfo.version"]
 classable_types = ["groups","template","groups"]
 allowed_operations = ["create","get","delete"]
-allowed_objects = ["host","trigger","template","hostgroup"]
-search_by_name={
-	'hostgroup':'name',
-	'template':'name',
-	'host':'host'
+# Kept in sync with the registry by register_object_type
+allowed_objects = []
+search_by_name = {}
+search_by_id = {}
+lazy_selects={
+	'groups':'selectGroups',
+	'parentTemplates':'selectParentTemplates',
+	'templates':'selectTemplates',
+	'hosts':'selectHosts',
+	'interfaces':'selectInterfaces',
+	'macros':'selectMacros',
+	'inventory':'selectInventory',
+	'items':'selectItems',
+	'triggers':'selectTriggers'
 }
-logging.basicConfig(level=logging.DEBUG)
+# The library never configures logging: applications add their own handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+# Request and response payloads, logged at DEBUG by the servers created with trace=True
+trace_logger = logging.getLogger(__name__ + ".trace")
+_password_pattern = re.compile(r'("password"\s*:\s*)"(?:[^"\\]|\\.)*"')
+
+def _trace(direction, payload, limit):
+	"""
+	Log a payload to :data:`trace_logger`, truncated to limit characters. Passwords are masked
+	"""
+	if trace_logger.isEnabledFor(logging.DEBUG):
+		if isinstance(payload, bytes):
+			payload = payload.decode("utf-8", "replace")
+		payload = _password_pattern.sub(r'\1"***"', payload)
+		if limit is not None and len(payload) > limit:
+			payload = "%s... (%s characters)" % (payload[:limit], len(payload))
+		trace_logger.debug("%s %s", direction, payload)
 
 class ZabbixRequestError(Exception):
 	"""
@@ -33,10 +72,103 @@ class ZabbixRequestError(Exception):
 	def __str__(self):
 		return repr("%s , %s - Code: %s"% (self.value, self.message, self.code))	
 
+def _response_error(response):
+	"""
+	Build the :class:`ZabbixRequestError` of a JSON-RPC error response
+	"""
+	error = response['error']
+	return ZabbixRequestError(error.get('data'), error['code'], error['message'])
+
+def _created_ids(result):
+	"""
+	Return the ids of a ``*.create`` or ``*.delete`` result, e.g. ``{"groupids": ["7"]}``, in request order
+	"""
+	if type(result) == dict:
+		for key, value in result.items():
+			if key.endswith("ids"):
+				return value
+	return []
+
+def _created_id(result):
+	"""
+	Return the first id of a ``*.create`` result, e.g. ``{"groupids": ["7"]}``
+	"""
+	ids = _created_ids(result)
+	if len(ids) > 0:
+		return ids[0]
+	return None
+
+def _object_ids(values, id_field):
+	"""
+	Normalize objects, dicts or plain ids to a list of ids
+	"""
+	if values is None:
+		return []
+	if type(values) != list and type(values) != tuple and type(values) != set:
+		values = [values]
+	ids = []
+	for value in values:
+		if isinstance(value, GenericZabbixObject):
+			ids.append(getattr(value, id_field))
+		elif type(value) == dict:
+			ids.append(value[id_field])
+		else:
+			ids.append(value)
+	return ids
+
+def _compact_options(registered, options):
+	"""
+	Get options fetching the fields of the compact records of a type: the plain fields as ``output``
+	and the nested ones (groups, templates, interfaces) with their select option
+	"""
+	record_class = registered.record_class
+	options = dict(options)
+	output = []
+	for name, convert in zip(record_class.fields, record_class.converters):
+		if hasattr(convert, "select"):
+			options.setdefault(lazy_selects.get(name, "select" + name[0].upper() + name[1:]), convert.select)
+		else:
+			output.append(name)
+	options.setdefault("output", output)
+	return options
+
+def _registered(object_type):
+	"""
+	Return the :class:`ObjectType` of a registered type
+	
+	:raise: :class: `ZabbixRequestError` exception if the type is not registered
+	"""
+	registered = object_types.get(object_type)
+	if registered is None:
+		raise ZabbixRequestError("Programmatic error","-1","Object type %s not allowed" % object_type)
+	return registered
+
+def _projection(output, *fields):
+	"""
+	Add the given fields (e.g. the id) to an ``output`` list of fields
+	"""
+	if output == "extend" or output == "count":
+		return output
+	if type(output) != list:
+		output = [output]
+	return output + [f for f in fields if not f in output]
+
+def _chunks(values, size):
+	for i in range(0, len(values), size):
+		yield values[i:i+size]
+
+def _json_array_constructor(method, auth, params):
+	"""
+	Same as :func:`_json_constructor`, for methods taking an array as params (e.g. ``host.create`` of many hosts)
+	"""
+	p = _json_constructor(method, auth)
+	p['params'] = params
+	return p
+
 def _json_constructor(method, auth=None, **kwargs):
 	params = {}
 	if kwargs is not None:
-		for key, value in kwargs.iteritems():
+		for key, value in kwargs.items():
 			params[key] = value
 	p = {         
 		"jsonrpc":"2.0",
@@ -51,6 +183,67 @@ def _json_constructor(method, auth=None, **kwargs):
 		raise ZabbixRequestError("LOGIN NOK","-1","Auth code not initialized")
 	return p
 		
+def _coalescing_key(request):
+	"""
+	Identity of an idempotent read request (method and canonicalized params), or None for writes
+	"""
+	if request['method'] == "apiinfo.version" or request['method'].endswith(".get"):
+		return request['method'], request.get('auth'), json.dumps(request['params'], sort_keys=True)
+	return None
+
+def _request_builder(auth, func_name_object, func_name_type, **kwargs):
+	"""
+	Build the request of an operation of :meth:`ZabbixServer.do`
+	
+	:param func_name_object: name or :class:`ObjectType` of the object type
+	:return: request and searched name or id
+	:rtype: tuple
+	"""
+	object_type = _lookup(func_name_object)
+	if 'id' in kwargs:
+		name_or_id = kwargs['id']
+		search_type = object_type.id_field
+	else:
+		name_or_id = kwargs["name"]
+		search_type = object_type.name_field
+
+	#else:
+		#raise ZabbixRequestError("Programmatic Error","-1","You need to specify hostname or id in the request")
+	
+	method = object_type.methods[func_name_type]
+	if func_name_type == "get":
+		options = dict((k, v) for (k, v) in kwargs.items() if k.startswith("select"))
+		if 'output' in kwargs:
+			options['output'] = _projection(kwargs['output'], object_type.id_field)
+		elif len(options) == 0:
+			options = dict(object_type.get_options)
+		else:
+			options['output'] = "extend"
+		json_object = _json_constructor(method, auth, filter={search_type:name_or_id}, **options)
+	elif func_name_type == "create":
+		kwargs[object_type.name_field] = kwargs["name"]
+		json_object = _json_constructor(method, auth, **kwargs)
+	elif func_name_type == "delete":
+		kwargs[object_type.name_field] = kwargs["name"]
+		json_object = _json_constructor(method, auth, **kwargs)
+	return json_object, name_or_id
+	
+def _response_builder(server, func_name_object, name_or_id, response, params=None):
+	"""
+	Build the object returned by an operation of :meth:`ZabbixServer.do`.
+	The objects of a get with an ``output`` projection (see ``params``) lazy load the other fields
+	"""
+	if len(response['result']) >0:
+		# Host exists
+		object_type = _lookup(func_name_object)
+		zabbix_object = object_type.object_class(response['result'], name_or_id, server= server)
+		if params is not None and type(params.get('output')) == list:
+			_LazyLoader(server, object_type.name, params).add(zabbix_object)
+		return zabbix_object
+	else:
+		# Host does not exists
+		return None
+
 		
 class ZabbixServer(object):
 	"""
@@ -62,45 +255,23 @@ class ZabbixServer(object):
 	url = None
 	auth = None
 	https = False
+	chunk_size = 500
+	coalesce = True
+	trace = False
+	trace_limit = 2000
+	compress = False
+	# Smaller request bodies are sent as they are
+	compress_min_size = 4096
 	headers = {
 		"Content-Type": "application/json-rpc"
 	}	
 			
 	def __request_wrapper__(self, func_name_object, func_name_type, **kwargs):
-		logger.debug("Request wrapper: %s %s %s " % (func_name_object, func_name_type, kwargs))
-	
-		# "Host" on kwargs
-		if 'id' in kwargs:
-			name_or_id = kwargs['id']
-			search_type = func_name_object+"id"
-		else:
-			name_or_id = kwargs["name"]
-			search_type = "host"
-
-		#else:
-			#raise ZabbixRequestError("Programmatic Error","-1","You need to specify hostname or id in the request")
-		
-		method = func_name_object+"."+func_name_type
-		if func_name_type == "get":
-			json_object = _json_constructor(method, self.auth, output="extend", selectGroups= "extend", filter={search_type:name_or_id})
-		elif func_name_type == "create":
-			kwargs["host"] = kwargs["name"]
-			json_object = _json_constructor(method, self.auth, **kwargs)
-		elif func_name_type == "delete":
-			kwargs["host"] = kwargs["name"]
-			json_object = _json_constructor(method, self.auth, **kwargs)
-				
-		print json_object
+		logger.debug("Request wrapper: %s %s %s", func_name_object, func_name_type, kwargs)
+		json_object, name_or_id = _request_builder(self.auth, func_name_object, func_name_type, **kwargs)
 		response = self._request_handler(json_object)
-		print response
-		if len(response['result']) >0:
-			# Host exists
-			return eval('%s(response[\'result\'], name_or_id, server= self)' % func_name_object.title())
-		else:
-			# Host does not exists
-			return None
+		return _response_builder(self, func_name_object, name_or_id, response, json_object['params'])
 		
-	
 	def _request_handler(self, request):
 		"""
 		Internal routine for Zabbix requests
@@ -112,10 +283,221 @@ class ZabbixServer(object):
 		"""
 		if self.auth is None and request['method'] != "apiinfo.version" and request['method'] != "user.login":
 			raise ZabbixRequestError("LOGIN NOK","-1","User is not logged in")
-		response = requests.post(self.api_server, headers=self.headers, data=json.dumps(request)).json()
+		cache_key = self.__cache_key__(request)
+		if cache_key is not None:
+			record = self.cache.get(*cache_key)
+			if record is not None:
+				return {"jsonrpc": "2.0", "result": [record], "id": request['id']}
+		coalescing_key = _coalescing_key(request) if self.coalesce else None
+		if coalescing_key is not None:
+			# Identical reads in flight share a single HTTP call, each caller gets its own copy of the response
+			response = self._inflight.do(coalescing_key, lambda: self.__send__(request), copy_json)
+		else:
+			response = self.__send__(request)
+		self.__update_cache__(request, response, cache_key)
+		self.__update_indexes__([(request, response)])
+		return response
+		
+	def stream(self, method, **kwargs):
+		"""
+		Streaming request: the elements of the ``result`` array are decoded incrementally from
+		the socket and yielded one at a time, so large responses are never held in memory
+		
+		>>> for item in server.stream("history.get", itemids=["23296"], history=0):
+		...     print(item['clock'], item['value'])
+		
+		:param method: API method, e.g. ``host.get``
+		:type method: String
+		:return: elements of the result, as dict
+		:rtype: generator
+		:raise: :class: `ZabbixRequestError` exception if the server returns an error
+		"""
+		request = _json_constructor(method, self.auth, **kwargs)
+		if self.auth is None and not method in non_auth_methods:
+			raise ZabbixRequestError("LOGIN NOK","-1","User is not logged in")
+		request['id'] = next(self._request_ids)
+		body = self.codec.dumps(request)
+		if self.trace:
+			_trace("Request", body, self.trace_limit)
+		body, headers = self.__compress__(body)
+		for hook in self.pre_request_hooks:
+			hook(request)
+		received = [0]
+		def counted(chunks):
+			for chunk in chunks:
+				received[0] += len(chunk)
+				yield chunk
+		start = time.time()
+		error = None
+		try:
+			if hasattr(self.transport, "post_stream"):
+				chunks = self.transport.post_stream(self.api_server, body, headers)
+			else:
+				chunks = [self.transport.post(self.api_server, body, headers)]
+			# Measured on the wire, before inflating
+			chunks = gzip_decompress_stream(counted(chunks))
+			for element in iter_result(chunks, lambda error: _response_error({'error': error})):
+				yield element
+		except Exception as e:
+			error = e
+			raise
+		finally:
+			# Includes the time spent by the caller consuming the elements
+			self.__record__(request, len(body), received[0], None, error, time.time() - start)
+		self.__update_cache__(request, {'result': []}, None)
+		
+	def __post__(self, request):
+		"""
+		POST a request (or a batch) and decode the response, tracing both payloads if enabled
+		"""
+		body = self.codec.dumps(request)
+		if self.trace:
+			_trace("Request", body, self.trace_limit)
+		body, headers = self.__compress__(body)
+		for hook in self.pre_request_hooks:
+			hook(request)
+		start = time.time()
+		response = error = None
+		response_bytes = 0
+		try:
+			response_body = self.transport.post(self.api_server, body, headers)
+			response_bytes = len(response_body)
+			response_body = gzip_decompress(response_body)
+			if self.trace:
+				_trace("Response", response_body, self.trace_limit)
+			response = self.codec.loads(response_body)
+			return response
+		except Exception as e:
+			error = e
+			raise
+		finally:
+			self.__record__(request, len(body), response_bytes, response, error, time.time() - start)
+		
+	def __compress__(self, body):
+		"""
+		:return: request body and headers, gzipped if compression is on and the body is large enough
+		"""
+		if not self.compress or len(body) < self.compress_min_size:
+			return body, self.headers
+		return gzip_compress(body), self.compressed_headers
+		
+	def __record__(self, request, request_bytes, response_bytes, response, error, seconds):
+		"""
+		Update the request statistics and run the post-request hooks
+		"""
+		error_code = None
+		if error is not None:
+			error_code = getattr(error, "code", None) or error.__class__.__name__
+		elif type(response) == dict and 'error' in response:
+			error_code = response['error'].get('code')
+		if type(request) == list:
+			methods = dict((r['id'], r['method']) for r in request)
+			self.request_stats.record("batch", seconds, request_bytes, response_bytes, error_code)
+			self.request_stats.record_batch(list(methods.values()), [(methods.get(r.get('id')), r['error'].get('code'))
+				for r in (response if type(response) == list else []) if 'error' in r])
+		else:
+			self.request_stats.record(request['method'], seconds, request_bytes, response_bytes, error_code)
+		for hook in self.post_request_hooks:
+			hook(request, response, seconds, error)
+		
+	def __send__(self, request):
+		request['id'] = next(self._request_ids)
+		response = self.__post__(request)
 		if 'error' in response:
-			raise ZabbixRequestError(response['error']['data'],response['error']['code'],response['error']['message'])
+			raise _response_error(response)
 		return response
+		
+	def __cache_key__(self, request):
+		"""
+		Key of a get by a single id or name in the object cache, or None if the request is not cacheable
+		"""
+		if self.cache is None:
+			return None
+		object_type, _, operation = request['method'].partition(".")
+		params = request['params']
+		if operation != "get" or not object_type in object_types or type(params.get('filter')) != dict:
+			return None
+		if len(params['filter']) != 1:
+			return None
+		field, value = list(params['filter'].items())[0]
+		if not field in (object_types[object_type].id_field, object_types[object_type].name_field) or type(value) in (list, dict):
+			return None
+		# Gets with different output or select* options are cached separately
+		shape = json.dumps(dict((k, v) for (k, v) in params.items() if k != 'filter'), sort_keys=True)
+		# A cache shared by many servers or sessions never answers with the records read by another one
+		scope = (self.api_server, self.auth)
+		return object_type, field, value, shape, scope
+		
+	def __update_cache__(self, request, response, cache_key):
+		if self.cache is None or request['method'] in non_auth_methods:
+			return
+		object_type, _, operation = request['method'].partition(".")
+		if cache_key is not None:
+			if len(response['result']) == 1:
+				self.cache.put(object_type, response['result'][0],
+					(object_types[object_type].id_field, object_types[object_type].name_field), cache_key[3], cache_key[4])
+		elif operation != "get":
+			# create, delete, update, mass*: cached records of the type may be stale
+			self.cache.invalidate(object_type)
+		
+	def __update_indexes__(self, exchanges):
+		"""
+		Keep the host indexes of this server in sync with the hosts created, updated or deleted
+		
+		:param exchanges: successful (request, response) pairs, in the order they were executed
+		:type exchanges: list
+		"""
+		if not self._indexes:
+			return
+		changed = OrderedDict()
+		deleted = set()
+		for request, response in exchanges:
+			if not request['method'].startswith("host.") or request['method'] == "host.get":
+				continue
+			for hostid in _created_ids(response['result']) or []:
+				if request['method'] == "host.delete":
+					changed.pop(hostid, None)
+					deleted.add(hostid)
+				else:
+					changed[hostid] = True
+					deleted.discard(hostid)
+		if not (changed or deleted):
+			return
+		indexes = list(self._indexes)
+		for index in indexes:
+			index.remove(list(deleted))
+		if changed:
+			# One get for all the created or changed hosts, shared by every index
+			hosts = self.get_many("host", ids=list(changed), **HostIndex.fetch_options).values()
+			for index in indexes:
+				for host in hosts:
+					index.add(host)
+		
+	def _batch_request_handler(self, request_list):
+		"""
+		Internal routine for JSON-RPC batch requests: all the requests are sent in a single POST
+		
+		:param request_list: requests built with :func:`_json_constructor`
+		:type request_list: list
+		:return: responses of the Zabbix Server indexed by request id
+		:rtype: dict
+		:raise: :class: `ZabbixRequestError` exception if the whole batch is rejected
+		"""
+		for request in request_list:
+			if self.auth is None and not request['method'] in non_auth_methods:
+				raise ZabbixRequestError("LOGIN NOK","-1","User is not logged in")
+			request['id'] = next(self._request_ids)
+		response = self.__post__(request_list)
+		if type(response) == dict:
+			# A single error object is returned when the batch itself is invalid
+			raise _response_error(response)
+		responses = dict((r['id'], r) for r in response)
+		for request in request_list:
+			self.__update_cache__(request, {'result': []}, None)
+		# The hosts changed by the whole batch are refreshed with a single get
+		self.__update_indexes__([(request, responses[request['id']]) for request in request_list
+			if 'result' in responses.get(request['id'], {})])
+		return responses
 
 	def login(self, user, pw):
 		"""		
@@ -131,13 +513,14 @@ class ZabbixServer(object):
 		
 		:raise: :class: `ZabbixRequestError` exception if error
 		"""		
-		if self.auth is not None:
-			return True
-		json_object = _json_constructor("user.login", None, user=user, password=pw)
-		login_response = self._request_handler(json_object)
-		if 'result' in login_response:
-			self.auth = login_response['result']
-		return False
+		with self._login_lock:
+			if self.auth is not None:
+				return True
+			json_object = _json_constructor("user.login", None, user=user, password=pw)
+			login_response = self._request_handler(json_object)
+			if 'result' in login_response:
+				self.auth = login_response['result']
+			return False
 		
 	
 	def get_version(self):
@@ -145,11 +528,83 @@ class ZabbixServer(object):
 		response = self._request_handler(json_object)
 		return response['result']
 	
-	def __init__(self, server="http://localhost/zabbix"):
+	def __init__(self, server="http://localhost/zabbix", transport=None, pool_size=10, timeout=30, verify=True, cache=None,
+		trace=False, trace_limit=2000, codec=None, compress=False):
+		"""
+		:param server: Base URL of the Zabbix frontend
+		:type server: String
+		:param transport: (optional) object exposing ``post(url, data, headers)``. Default is a pooled :class:`RequestsTransport`
+		:type transport: :class:`RequestsTransport`
+		:param pool_size: Connections kept alive by the default transport
+		:type pool_size: int
+		:param timeout: Request timeout in seconds for the default transport
+		:type timeout: float
+		:param verify: TLS certificate verification for the default transport
+		:type verify: bool or String
+		:param cache: (optional) cache of the gets by id or name, e.g. ``ObjectCache(ttl=600, max_size=5000)``.
+			It is invalidated by the create/delete/update calls done through this server
+		:type cache: :class:`ObjectCache`
+		:param trace: (optional) log the request and response payloads at DEBUG level to the ``PyZabbixObj.trace`` logger
+		:type trace: bool
+		:param trace_limit: Characters of each payload kept in the trace, None for no limit
+		:type trace_limit: int
+		:param codec: (optional) JSON codec, as name ("orjson", "ujson", "json") or :class:`JSONCodec` instance.
+			Default is the fastest installed library
+		:type codec: String or :class:`JSONCodec`
+		:param compress: (optional) gzip the request bodies of at least ``compress_min_size`` bytes and ask for gzipped
+			responses. The web server of the frontend must inflate ``Content-Encoding: gzip`` request bodies
+			(e.g. Apache mod_deflate with the DEFLATE input filter). When False, the responses are not
+			compressed either (``Accept-Encoding: identity``, where requests would otherwise ask for gzip).
+			The response bytes of :meth:`stats` are measured as received, before inflating
+		:type compress: bool
+		"""
 		self.api_server = server+rpc_url
+		self.cache = cache
+		self.codec = get_codec(codec)
+		self.compress = compress
+		self.trace = trace
+		self.trace_limit = trace_limit
+		self.request_stats = RequestStats()
+		# Called with (request) before each POST and (request, response, seconds, exception) after it
+		self.pre_request_hooks = []
+		self.post_request_hooks = []
+		if transport is None:
+			transport = RequestsTransport(pool_size=pool_size, timeout=timeout, verify=verify)
+		self.transport = transport
+		# Instance copies: the class-level headers must not be shared between servers and threads
+		self.headers = dict(self.headers)
+		self.headers['Accept-Encoding'] = "gzip" if compress else "identity"
+		self.compressed_headers = dict(self.headers, **{'Content-Encoding': "gzip"})
+		# next() on itertools.count is atomic, ids stay unique across threads
+		self._request_ids = itertools.count(1)
+		self._login_lock = threading.Lock()
+		self._inflight = SingleFlight()
+		self._indexes = weakref.WeakSet()
+		
+	def close(self):
+		"""
+		Release the connections held by the transport
+		"""
+		if hasattr(self.transport, "close"):
+			self.transport.close()
+			
+	def __enter__(self):
+		return self
+		
+	def __exit__(self, *exc_info):
+		self.close()
 	
 	def class_constructor(self, operation, object_type):
-		return type(str("%s_%s" % (operation, object_type)),(BaseOperation,),{})
+		"""
+		:return: the :class:`BaseOperation` subclass of an operation on an object type, built once per pair
+		"""
+		registered = object_types[object_type]
+		operation_class = registered.operation_classes.get(operation)
+		if operation_class is None:
+			operation_class = type(str("%s_%s" % (operation, object_type)), (BaseOperation,),
+				{'object_type': registered, 'operation': operation})
+			registered.operation_classes[operation] = operation_class
+		return operation_class
 	
 	def do(self, operation, object_type,**kwargs):
 		"""
@@ -163,26 +618,498 @@ class ZabbixServer(object):
 		:return: Instantiated class of the object or None if the object does not exist and the method does not provide creation
 		:rtype: Class of the object (Host, Hostname, Template, ecc.)
 		"""
-		if operation is not None and operation in allowed_operations and object_type is not None and object_type in allowed_objects:
-			method_class = self.class_constructor(operation, object_type)
-			method = method_class(self)
-			return method.do(**kwargs)
+		registered = object_types.get(object_type)
+		if registered is not None and operation in allowed_operations:
+			return self.__request_wrapper__(registered, operation, **kwargs)
 		return None
 		
+	def get_many(self, object_type, names=None, ids=None, chunk_size=None, compact=False, **kwargs):
+		"""
+		Bulk lookup: fetch many objects of a type with one get per chunk of names or ids
+		
+		:param object_type: Type of the objects. Must be in allowed_objects
+		:type object_type: String
+		:param names: names of the objects (the technical name for hosts and templates)
+		:type names: list
+		:param ids: ids of the objects
+		:type ids: list
+		:param chunk_size: (optional) names or ids sent in each request. Default is ``server.chunk_size``
+		:type chunk_size: int
+		:param compact: (optional) return compact typed records (see :mod:`PyZabbixObj.records`) instead of objects.
+			Only the fields of the schema of the type are fetched and kept
+		:type compact: bool
+		:param kwargs: (optional) additional get parameters, e.g. ``output=["hostid", "host"]`` or ``selectGroups="extend"``.
+			Attributes not fetched are loaded on first access, with one get for all the returned objects
+		
+		:return: objects indexed by the requested name or id, with the not found ones in ``missing``
+		:rtype: :class:`LookupResult`
+		:raise: :class: `ZabbixRequestError` exception if error
+		"""
+		registered = _registered(object_type)
+		if names is not None:
+			keys = names
+			key_field = registered.name_field
+		elif ids is not None:
+			keys = ids
+			key_field = registered.id_field
+		else:
+			raise ZabbixRequestError("Programmatic error","-1","You need to specify names or ids in the request")
+		# Zabbix returns every field as a string
+		keys = list(OrderedDict.fromkeys("%s" % k for k in keys))
+		if compact:
+			kwargs = _compact_options(registered, kwargs)
+		kwargs['output'] = _projection(kwargs.get("output", "extend"), registered.id_field, key_field)
+		object_class = registered.object_class
+		loader = _LazyLoader(self, object_type, kwargs) if type(kwargs['output']) == list else None
+		result = LookupResult()
+		# Values shared by the compact records of this call only
+		shared = {}
+		for chunk in _chunks(keys, chunk_size or self.chunk_size):
+			if names is not None:
+				params = dict(kwargs, filter=dict(kwargs.get("filter", {}), **{key_field: chunk}))
+			else:
+				params = dict(kwargs, **{registered.ids_param: chunk})
+			response = self._request_handler(_json_constructor(registered.methods['get'], self.auth, **params))
+			for record in response['result']:
+				if compact:
+					result[record[key_field]] = registered.record_class(record, shared)
+				else:
+					zabbix_object = object_class([record], record[key_field], server=self)
+					result[record[key_field]] = loader.add(zabbix_object) if loader is not None else zabbix_object
+		result.missing = set(k for k in keys if not k in result)
+		return result
+		
+	def latest_values(self, hostids=None, keys=None, with_clock=False, chunk_size=None):
+		"""
+		Latest value of many items, with one ``item.get`` per chunk of hosts
+		
+		>>> values = server.latest_values(hostids=ids, keys=["system.cpu.load[percpu,avg1]", "vm.memory.size[available]"])
+		>>> values["10084"]["vm.memory.size[available]"]
+		
+		:param hostids: (optional) :class:`Host` instances or host ids. Default is every host
+		:type hostids: list
+		:param keys: (optional) item keys. Default is every item
+		:type keys: list
+		:param with_clock: values are (lastvalue, lastclock) tuples instead of lastvalue
+		:type with_clock: bool
+		:param chunk_size: (optional) hosts sent in each request. Default is ``server.chunk_size``
+		:type chunk_size: int
+		:return: key -> last value index of each host, indexed by hostid
+		:rtype: dict
+		"""
+		params = {'output': ["itemid","hostid","key_","lastvalue","lastclock"]}
+		if keys is not None:
+			params['filter'] = {'key_': list(keys)}
+		if hostids is None:
+			chunks = [None]
+		else:
+			chunks = _chunks(_object_ids(hostids, "hostid"), chunk_size or self.chunk_size)
+		index = {}
+		# Keys repeat on every host: store a single string for each of them
+		known_keys = {}
+		for chunk in chunks:
+			if chunk is not None:
+				params['hostids'] = chunk
+			for record in self.stream("item.get", **params):
+				key = known_keys.setdefault(record['key_'], record['key_'])
+				values = index.get(record['hostid'])
+				if values is None:
+					values = index[record['hostid']] = {}
+				if with_clock:
+					values[key] = (record['lastvalue'], int(record['lastclock']))
+				else:
+					values[key] = record['lastvalue']
+		return index
+		
+	def history(self, itemids, time_from, time_till, history=0, window=86400, workers=4, as_array=False):
+		"""
+		Columnar ``history.get``: values of many items over a time range as NumPy arrays.
+		The range is split in windows of ``window`` seconds fetched by ``workers`` parallel calls.
+		See :func:`PyZabbixObj.history.fetch_history`
+		
+		>>> cpu = server.history(itemids, time.time() - 7*86400, time.time())
+		>>> cpu["23296"]["value"].mean()
+		
+		:return: structured arrays (``clock``, ``ns``, ``value``) indexed by itemid
+		:rtype: dict
+		"""
+		return fetch_history(self, itemids, time_from, time_till, history=history, window=window, workers=workers,
+			as_array=as_array)
+		
+	def trends(self, itemids, time_from, time_till, window=7*86400, workers=4, as_array=False):
+		"""
+		Columnar ``trend.get``: hourly trends of many items over a time range as NumPy arrays.
+		See :func:`PyZabbixObj.history.fetch_trends`
+		
+		:return: structured arrays (``clock``, ``num``, ``value_min``, ``value_avg``, ``value_max``) indexed by itemid
+		:rtype: dict
+		"""
+		return fetch_trends(self, itemids, time_from, time_till, window=window, workers=workers, as_array=as_array)
+		
+	def watch_events(self, eventid_from=None, watermark_file=None, limit=1000, min_interval=1.0, max_interval=30.0,
+		stop=None, **kwargs):
+		"""
+		Generator of the new events: each poll runs ``event.get`` from the last event id seen, so only
+		the new events are transferred. See :func:`PyZabbixObj.events.watch_events`
+		
+		>>> for event in server.watch_events(value=1, watermark_file="/var/lib/bridge/eventid"):
+		...     notify(event)
+		
+		:return: events, by increasing id
+		:rtype: generator
+		"""
+		return watch_events(self, eventid_from=eventid_from, watermark_file=watermark_file, limit=limit,
+			min_interval=min_interval, max_interval=max_interval, stop=stop, **kwargs)
+		
+	def mirror(self, path, max_staleness=300):
+		"""
+		Local SQLite mirror of hosts, host groups, templates, interfaces and their links.
+		See :class:`PyZabbixObj.mirror.InventoryMirror`
+		
+		>>> inventory = server.mirror("/var/cache/zabbix-inventory.db", max_staleness=60)
+		>>> web01 = inventory.do("get", "host", name="web01")
+		
+		:param path: SQLite database file
+		:type path: String
+		:param max_staleness: maximum age in seconds of the data returned by reads
+		:type max_staleness: float
+		:rtype: :class:`PyZabbixObj.mirror.InventoryMirror`
+		"""
+		return InventoryMirror(self, path, max_staleness=max_staleness)
+		
+	def reconcile(self, desired_state, dry_run=False, delete_extra=False):
+		"""
+		Apply a desired state of hosts, groups, template links and interfaces with the fewest calls:
+		current state is fetched in bulk, missing groups and hosts are created with array creates,
+		links are changed with one ``host.massadd``/``host.massremove`` per distinct change and the other
+		attributes are updated in JSON-RPC batches. See :func:`PyZabbixObj.reconcile.plan`
+		
+		>>> print(server.reconcile(desired, dry_run=True))
+		1. hostgroup.create: 1 groups (Web servers)
+		2. host.create: 2 hosts (web01, web02)
+		
+		:param desired_state: ``hosts`` by technical name and optional ``groups``
+		:type desired_state: dict
+		:param dry_run: only compute the plan
+		:type dry_run: bool
+		:param delete_extra: delete the hosts of the desired groups that are not in the desired state
+		:type delete_extra: bool
+		:return: the plan, executed unless dry_run
+		:rtype: :class:`PyZabbixObj.reconcile.ReconcilePlan`
+		"""
+		plan = reconcile_plan(self, desired_state, delete_extra=delete_extra)
+		if not dry_run:
+			plan.execute()
+		return plan
+		
+	def index_hosts(self, hosts=None, page_size=1000):
+		"""
+		Build a :class:`PyZabbixObj.index.HostIndex`, kept up to date with the hosts created, updated
+		and deleted through this server
+		
+		>>> index = server.index_hosts()
+		>>> [h.host for h in index.in_group(linux.groupid)]
+		
+		:param hosts: (optional) hosts fetched with :attr:`HostIndex.fetch_options`. Default is every host,
+			fetched with :meth:`iter`
+		:type hosts: iterable
+		:param page_size: hosts fetched in each request when hosts is not given
+		:type page_size: int
+		:rtype: :class:`PyZabbixObj.index.HostIndex`
+		"""
+		if hosts is None:
+			hosts = self.iter("host", page_size=page_size, **HostIndex.fetch_options)
+		index = HostIndex(hosts)
+		self._indexes.add(index)
+		return index
+		
+	def iter(self, object_type, filter=None, page_size=1000, compact=False, **kwargs):
+		"""
+		Generator over all the objects of a type, fetched one page at a time
+		
+		The ids of the matching objects are listed first (``output=[id]``, sorted by id), then the
+		objects are fetched in pages of ``page_size`` ids, continuing from the last id seen.
+		Only one page of records is held in memory.
+		
+		>>> for host in server.iter("host", filter={"status": 0}, output=["hostid", "host"]):
+		...     print(host.host)
+		
+		:param object_type: Type of the objects. Must be in allowed_objects
+		:type object_type: String
+		:param filter: (optional) get filter of the objects
+		:type filter: dict
+		:param page_size: Objects fetched in each request
+		:type page_size: int
+		:param compact: (optional) yield compact typed records (see :mod:`PyZabbixObj.records`) instead of objects
+		:type compact: bool
+		:param kwargs: (optional) ``output`` and ``select*`` options of the pages; other get parameters
+			(e.g. ``groupids``, ``search``) select the objects
+		:return: hydrated objects, ordered by id
+		:rtype: generator
+		:raise: :class: `ZabbixRequestError` exception if error
+		"""
+		registered = _registered(object_type)
+		id_field = registered.id_field
+		name_field = registered.name_field
+		page_options = dict((k, v) for (k, v) in kwargs.items() if k == "output" or k.startswith("select"))
+		selection = dict((k, v) for (k, v) in kwargs.items() if not k in page_options)
+		if compact:
+			page_options = _compact_options(registered, page_options)
+		page_options['output'] = _projection(page_options.get("output", "extend"), id_field)
+		if filter is not None:
+			selection['filter'] = filter
+		# Only the ids are kept in memory, the records of the listing are decoded one at a time
+		ids = sorted(int(record[id_field]) for record in self.stream(registered.methods['get'], output=[id_field], **selection))
+		object_class = registered.object_class
+		# Values shared by the compact records of this call only
+		shared = {}
+		for page in _chunks(ids, page_size):
+			params = dict(page_options, **{registered.ids_param: page})
+			records = self._request_handler(_json_constructor(registered.methods['get'], self.auth, **params))['result']
+			records = sorted(records, key=lambda r: int(r[id_field]))
+			if compact:
+				for record in records:
+					yield registered.record_class(record, shared)
+				continue
+			objects = [object_class([record], record.get(name_field, record[id_field]), server=self) for record in records]
+			if type(page_options['output']) == list:
+				# The whole page joins the loader before the first object can trigger a load
+				loader = _LazyLoader(self, object_type, page_options)
+				for zabbix_object in objects:
+					loader.add(zabbix_object)
+			for zabbix_object in objects:
+				yield zabbix_object
+			
+	def create_many(self, object_type, objects, chunk_size=None):
+		"""
+		Bulk creation: send the objects as an array to ``<object_type>.create``, one request per chunk
+		
+		Each object is a dict of create parameters. ``groups`` and ``templates`` can be given as
+		:class:`Hostgroup`/:class:`Template` instances or ids. Hosts without ``interfaces`` get
+		:attr:`Host.standard_interface`.
+		
+		>>> server.create_many("host", [{"host": "web01", "groups": linux}, {"host": "web02", "groups": linux}])
+		
+		:param object_type: Type of the objects. Must be in allowed_objects
+		:type object_type: String
+		:param objects: creation parameters of each object
+		:type objects: list of dict
+		:param chunk_size: (optional) objects sent in each request. Default is ``server.chunk_size``
+		:type chunk_size: int
+		:return: ids of the created objects, in input order
+		:rtype: list
+		:raise: :class: `ZabbixRequestError` exception if error
+		"""
+		registered = _registered(object_type)
+		params = []
+		for o in objects:
+			o = dict(o)
+			if 'groups' in o:
+				o['groups'] = [{'groupid':g} for g in _object_ids(o['groups'], "groupid")]
+			if 'templates' in o:
+				o['templates'] = [{'templateid':t} for t in _object_ids(o['templates'], "templateid")]
+			if object_type == "host" and not 'interfaces' in o:
+				o['interfaces'] = [Host.standard_interface]
+			params.append(o)
+		ids = []
+		for chunk in _chunks(params, chunk_size or self.chunk_size):
+			response = self._request_handler(_json_array_constructor(registered.methods['create'], self.auth, chunk))
+			ids.extend(_created_ids(response['result']))
+		return ids
+		
+	def delete_many(self, object_type, ids, chunk_size=None):
+		"""
+		Bulk deletion: send the ids as an array to ``<object_type>.delete``, one request per chunk
+		
+		:param object_type: Type of the objects. Must be in allowed_objects
+		:type object_type: String
+		:param ids: objects or ids to be deleted
+		:type ids: list
+		:param chunk_size: (optional) ids sent in each request. Default is ``server.chunk_size``
+		:type chunk_size: int
+		:return: ids of the deleted objects
+		:rtype: list
+		:raise: :class: `ZabbixRequestError` exception if error
+		"""
+		registered = _registered(object_type)
+		ids = _object_ids(ids, registered.id_field)
+		deleted = []
+		for chunk in _chunks(ids, chunk_size or self.chunk_size):
+			response = self._request_handler(_json_array_constructor(registered.methods['delete'], self.auth, chunk))
+			deleted.extend(_created_ids(response['result']))
+		return deleted
+		
+	def mass_add(self, hosts, groups=None, templates=None, chunk_size=None):
+		"""
+		Link groups and/or templates to many hosts with ``host.massadd``
+		
+		:param hosts: :class:`Host` instances or host ids
+		:type hosts: list
+		:param groups: (optional) :class:`Hostgroup` instances or group ids
+		:type groups: list
+		:param templates: (optional) :class:`Template` instances or template ids
+		:type templates: list
+		:param chunk_size: (optional) hosts sent in each request. Default is ``server.chunk_size``
+		:type chunk_size: int
+		:return: ids of the updated hosts
+		:rtype: list
+		"""
+		return self.__mass_operation__("host.massadd", hosts, groups, templates, chunk_size)
+		
+	def mass_update(self, hosts, groups=None, templates=None, chunk_size=None):
+		"""
+		Replace groups and/or linked templates of many hosts with ``host.massupdate``.
+		Same parameters of :meth:`mass_add`
+		"""
+		return self.__mass_operation__("host.massupdate", hosts, groups, templates, chunk_size)
+		
+	def mass_remove(self, hosts, groups=None, templates=None, chunk_size=None):
+		"""
+		Remove groups and/or unlink templates from many hosts with ``host.massremove``.
+		Same parameters of :meth:`mass_add`
+		"""
+		return self.__mass_operation__("host.massremove", hosts, groups, templates, chunk_size)
+		
+	def __mass_operation__(self, method, hosts, groups, templates, chunk_size):
+		hostids = _object_ids(hosts, "hostid")
+		groupids = _object_ids(groups, "groupid")
+		templateids = _object_ids(templates, "templateid")
+		updated = []
+		for chunk in _chunks(hostids, chunk_size or self.chunk_size):
+			if method == "host.massremove":
+				params = {'hostids': chunk}
+				if groups is not None:
+					params['groupids'] = groupids
+				if templates is not None:
+					params['templateids'] = templateids
+			else:
+				params = {'hosts': [{'hostid':h} for h in chunk]}
+				if groups is not None:
+					params['groups'] = [{'groupid':g} for g in groupids]
+				if templates is not None:
+					params['templates'] = [{'templateid':t} for t in templateids]
+			response = self._request_handler(_json_constructor(method, self.auth, **params))
+			updated.extend(_created_ids(response['result']))
+		return updated
+		
+	def map(self, operation, object_type, iterable_of_kwargs, workers=10, rate_limit=None, return_exceptions=False):
+		"""
+		Run :meth:`do` for every set of kwargs in a thread pool, sharing the transport connection pool
+		
+		>>> hosts = server.map("get", "host", [{"name": n} for n in names], workers=8, rate_limit=100)
+		
+		:param operation: Type of operation to be done. Must be in allowed_operations
+		:type operation: String
+		:param object_type: Type of the object where the operation is done. Must be in allowed_objects
+		:type object_type: String
+		:param iterable_of_kwargs: kwargs of each :meth:`do` call
+		:type iterable_of_kwargs: iterable of dict
+		:param workers: Threads running the calls. Should not exceed the connection pool size of the transport
+		:type workers: int
+		:param rate_limit: (optional) Maximum calls started per second
+		:type rate_limit: float
+		:param return_exceptions: If True, failed calls return their exception in place of the result
+		:type return_exceptions: bool
+		
+		:return: results of the calls, in input order
+		:rtype: list
+		:raise: :class: `ZabbixRequestError` the exception of the first failed call, if return_exceptions is False
+		"""
+		limiter = RateLimiter(rate_limit) if rate_limit else None
+		def call(kwargs):
+			if limiter is not None:
+				limiter.acquire()
+			try:
+				return True, self.do(operation, object_type, **kwargs)
+			except Exception as e:
+				return False, e
+		pool = ThreadPool(workers)
+		try:
+			outcomes = pool.map(call, list(iterable_of_kwargs))
+		finally:
+			pool.close()
+			pool.join()
+		results = []
+		for ok, value in outcomes:
+			if not ok and not return_exceptions:
+				raise value
+			results.append(value)
+		return results
+		
+	def add_hook(self, pre=None, post=None):
+		"""
+		Register callbacks run around every request sent to the server (requests answered by the cache are not sent).
+		For batches, the request is the list of the calls and the response the list of their responses.
+		Exceptions raised by the hooks are propagated to the caller
+		
+		>>> server.add_hook(post=lambda request, response, seconds, error: seconds > 1 and slow.append(request))
+		
+		:param pre: (optional) called with the request dict before it is sent
+		:type pre: function
+		:param post: (optional) called with the request, the decoded response (None on transport errors and for
+			:meth:`stream`), the seconds waited and the exception raised (or None)
+		:type post: function
+		"""
+		if pre is not None:
+			self.pre_request_hooks.append(pre)
+		if post is not None:
+			self.post_request_hooks.append(post)
+			
+	def stats(self):
+		"""
+		Snapshot of the instrumentation of this server
+		
+		>>> for method, s in sorted(server.stats()['methods'].items(), key=lambda m: -m[1]['seconds']):
+		...     print(method, s['count'], s['mean_seconds'], s['errors'])
+		
+		:return: ``methods`` (per API method count, seconds, bytes, latency histogram and errors by code, see
+			:meth:`RequestStats.snapshot`), ``batches``, ``batch_calls``, ``coalescing`` and ``cache`` (None without cache)
+		:rtype: dict
+		"""
+		stats = self.request_stats.snapshot()
+		stats['coalescing'] = self._inflight.stats()
+		stats['cache'] = self.cache.stats() if self.cache is not None else None
+		return stats
+		
+	def prometheus(self, prefix="pyzabbixobj", **labels):
+		"""
+		:return: :meth:`stats` in the Prometheus text exposition format
+		:rtype: String
+		"""
+		return prometheus_text(self.stats(), prefix, **labels)
+		
+	def batch(self):
+		"""
+		Open a JSON-RPC batch: the calls queued in it are sent in a single POST when the block exits
+		
+		>>> with server.batch() as b:
+		...     linux = b.do("get", "hostgroup", name="Linux servers")
+		...     version = b.call("apiinfo.version")
+		>>> linux.result()
+		
+		:return: a new batch bound to this server
+		:rtype: :class:`Batch`
+		"""
+		return Batch(self)
+		
 	def __str__(self):
 		return "Server Zabbix %s" % self.api_server
 
 		
 class BaseOperation(object):
+	"""
+	Operation on an object type, bound to a server. Subclasses are built by :meth:`ZabbixServer.class_constructor`
+	"""
+	object_type = None
+	operation = None
+	
 	def __init__(self, server):
-		name_array = self.__class__.__name__.split("_")
-		self.func_name_object = name_array[1]
-		self.func_name_type = name_array[0]
+		self.func_name_object = self.object_type.name
+		self.func_name_type = self.operation
 		self.server = server
-		print "BaseOperation constructor: %s %s %s " % (self.func_name_object,self.func_name_type, server)
 	
 	def do(self, **kwargs):
-		return self.server.__request_wrapper__(self.func_name_object,self.func_name_type,**kwargs)
+		return self.server.__request_wrapper__(self.object_type,self.func_name_type,**kwargs)
 		
 	def __str__(self):
 		return "Operator %s on %s" % (self.func_name_type, self.func_name_object)
@@ -190,16 +1117,239 @@ class BaseOperation(object):
 	def __repr__(self):
 		return self.__str__()
 
+class LookupResult(dict):
+	"""
+	Result of :meth:`ZabbixServer.get_many`: a dict of the found objects indexed by name or id.
+	The names or ids that do not exist on the server are in the ``missing`` set
+	"""
+	
+	def __init__(self, *args, **kwargs):
+		super(LookupResult, self).__init__(*args, **kwargs)
+		self.missing = set()
+
+class BatchResult(object):
+	"""
+	Result of a call queued in a :class:`Batch`. It is filled when the batch is sent
+	"""
+	
+	def __init__(self, request, converter=None, created_type=None):
+		self.request = request
+		self.converter = converter
+		# Object type of a create queued by Batch.do: the object is loaded after the batch
+		self.created_type = created_type
+		self.done = False
+		self.error = None
+		self.value = None
+		
+	def set_response(self, response):
+		self.done = True
+		if 'error' in response:
+			self.error = _response_error(response)
+			return
+		if self.created_type is not None:
+			self.value = _created_id(response['result'])
+			return
+		try:
+			if self.converter is not None:
+				self.value = self.converter(response)
+			else:
+				self.value = response['result']
+		except ZabbixRequestError as e:
+			self.error = e
+			
+	def result(self):
+		"""
+		:return: result of the call (an object instance for :meth:`Batch.do`, the raw result for :meth:`Batch.call`)
+		:raise: :class: `ZabbixRequestError` exception if the call failed or the batch has not been sent
+		"""
+		if not self.done:
+			raise ZabbixRequestError("Programmatic error","-1","Batch has not been sent yet")
+		if self.error is not None:
+			raise self.error
+		return self.value
+		
+	def __str__(self):
+		return "BatchResult %s (%s)" % (self.request['method'], "done" if self.done else "pending")
+		
+	def __repr__(self):
+		return self.__str__()
+
+class Batch(object):
+	"""
+	JSON-RPC 2.0 batch. Calls are queued and sent together in one HTTP POST by :meth:`send`
+	or when the ``with`` block exits without errors
+	
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	"""
+	
+	def __init__(self, server):
+		self.server = server
+		self.calls = []
+		
+	def call(self, method, **kwargs):
+		"""
+		Queue a raw API call
+		
+		:param method: API method, e.g. ``host.get``
+		:type method: String
+		:return: placeholder of the raw result
+		:rtype: :class:`BatchResult`
+		"""
+		json_object = _json_constructor(method, self.server.auth, **kwargs)
+		return self.__queue__(BatchResult(json_object))
+		
+	def do(self, operation, object_type, **kwargs):
+		"""
+		Queue an operation with the same semantic of :meth:`ZabbixServer.do`.
+		The objects created by the batch are loaded by :meth:`send` with one
+		:meth:`ZabbixServer.get_many` per object type, not one get per create
+		
+		:return: placeholder of the object (or None if the object does not exist)
+		:rtype: :class:`BatchResult`
+		"""
+		if not (operation in allowed_operations and object_type in object_types):
+			raise ZabbixRequestError("Programmatic error","-1","Operation %s not allowed on %s" % (operation, object_type))
+		json_object, name_or_id = _request_builder(self.server.auth, object_type, operation, **kwargs)
+		if operation == "create":
+			return self.__queue__(BatchResult(json_object, created_type=object_type))
+		converter = lambda response: _response_builder(self.server, object_type, name_or_id, response, json_object['params'])
+		return self.__queue__(BatchResult(json_object, converter))
+		
+	def __queue__(self, batch_result):
+		self.calls.append(batch_result)
+		return batch_result
+		
+	def send(self):
+		"""
+		Send every queued call in one POST and dispatch the responses by id.
+		Errors are reported per call by :meth:`BatchResult.result`
+		"""
+		calls, self.calls = self.calls, []
+		if len(calls) == 0:
+			return
+		responses = self.server._batch_request_handler([c.request for c in calls])
+		created = OrderedDict()
+		for c in calls:
+			response = responses.get(c.request['id'])
+			if response is None:
+				response = {'error': {'code': "-1", 'message': "Missing response", 'data': "No response for request id %s" % c.request['id']}}
+			c.set_response(response)
+			if c.created_type is not None and c.error is None:
+				created.setdefault(c.created_type, []).append(c)
+		for object_type, created_calls in created.items():
+			self.__load_created__(object_type, created_calls)
+			
+	def __load_created__(self, object_type, calls):
+		ids = [c.value for c in calls if c.value is not None]
+		try:
+			objects = self.server.get_many(object_type, ids=ids, **_lookup(object_type).get_options) if ids else {}
+		except ZabbixRequestError as e:
+			for c in calls:
+				c.error = e
+			return
+		for c in calls:
+			c.value = objects.get("%s" % c.value) if c.value is not None else None
+			
+	def __len__(self):
+		return len(self.calls)
+		
+	def __enter__(self):
+		return self
+		
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.send()
+
+class _LazyLoader(object):
+	"""
+	Loads the attributes left out by the ``output`` projection of a query. The first access to a
+	missing attribute of one object gets it for all the objects of the query that are still alive.
+	Each attribute is requested at most once per query
+	
+	:param params: get parameters of the query
+	:type params: dict
+	"""
+	
+	def __init__(self, server, object_type, params):
+		registered = _lookup(object_type)
+		self.server = server
+		self.object_type = registered.name
+		self.id_field = registered.id_field
+		self.ids_param = registered.ids_param
+		self.method = registered.methods['get']
+		self.selects = registered.selects
+		self.objects = weakref.WeakValueDictionary()
+		# Held during a load: threads reading the same missing attribute wait for a single fetch
+		self._lock = threading.RLock()
+		# Attributes fetched by the query itself: never loaded again
+		self.unavailable = set(params['output'])
+		for name, option in lazy_selects.items():
+			if option in params and not name in self.selects:
+				self.unavailable.add(name)
+		# Type specific selects fetched by the query: result field -> attribute
+		self.renamed = {}
+		for name, (option, field) in self.selects.items():
+			if option in params:
+				self.unavailable.add(name)
+				self.renamed[field] = name
+		
+	def add(self, zabbix_object):
+		for field, name in self.renamed.items():
+			try:
+				setattr(zabbix_object, name, object.__getattribute__(zabbix_object, field))
+			except AttributeError:
+				pass
+		self.objects[getattr(zabbix_object, self.id_field)] = zabbix_object
+		zabbix_object._lazy_loader = self
+		return zabbix_object
+		
+	def load(self, name):
+		with self._lock:
+			if name in self.unavailable:
+				return
+			self.unavailable.add(name)
+			self.__fetch__(name)
+		
+	def __fetch__(self, name):
+		if name in self.selects:
+			option, field = self.selects[name]
+			options = {'output': [self.id_field], option: "extend"}
+		elif name in lazy_selects:
+			field = name
+			options = {'output': [self.id_field], lazy_selects[name]: "extend"}
+		else:
+			field = name
+			options = {'output': [self.id_field, name]}
+		logger.debug("Lazy loading %s.%s for %s objects", self.object_type, name, len(self.objects))
+		for chunk in _chunks(list(self.objects.keys()), self.server.chunk_size):
+			options[self.ids_param] = chunk
+			request = _json_constructor(self.method, self.server.auth, **options)
+			for record in self.server._request_handler(request)['result']:
+				zabbix_object = self.objects.get(record[self.id_field])
+				if zabbix_object is not None and field in record:
+					setattr(zabbix_object, name, record[field])
+
 class GenericZabbixObject(object):
 	"""
 	Generic Zabbix object class. Implements some base methods
+	
+	Objects returned by a get with an ``output`` projection load the other attributes
+	on first access (see :class:`_LazyLoader`)
 	"""
+	_lazy_loader = None
+	# ObjectType of the class, set by register_object_type
+	_type = None
 	
 	def __init__(self, response, name_or_id, server, **kwargs):			
 		self.server = server
+		if type(response) == list and len(response) > 0:
+			# The object has already been fetched by the caller: no need to get it again
+			logger.debug("%s from response", self.__class__.__name__)
+			self.__update__(response[0])
 		# name_or_id is an id: getting the infos from the server
-		if type(name_or_id)==int or name_or_id.isdigit():
-			logger.debug("%s from id" % self.__class__.__name__)
+		elif type(name_or_id)==int or name_or_id.isdigit():
+			logger.debug("%s from id", self.__class__.__name__)
 			host_results = self.get_data(name_or_id, update = True)
 			if not host_results:
 				raise ZabbixRequestError("Programmatic error","-1","HostGroup creation impossibile only from id")
@@ -207,33 +1357,68 @@ class GenericZabbixObject(object):
 			# name_or_id is a name
 			# Check if response is null (Host does not exist)
 			name = name_or_id
-			self.groups = []
 			if len(response)==0:
-				logger.debug("Creating %s" % self.__class__.__name__ )
+				if not self._type.create_from_name:
+					raise ZabbixRequestError("Programmatic error","-1","%s creation impossibile only from name" % self.__class__.__name__)
+				logger.debug("Creating %s", self.__class__.__name__)
+				self.groups = []
 				# Create the host from server and populate attributes (Host does not exists)
 				if 'groups' in kwargs:
 					if type(kwargs['groups']) == list:
 						for group in kwargs['groups']:
 							self.groups.append({'groupid':group.groupid})
-					elif type(kwargs['groups']) == HostGroup:
+					elif type(kwargs['groups']) == Hostgroup:
 						self.groups.append({'groupid':kwargs['groups'].groupid })
 					else:
 						self.groups.append({'groupid':kwargs['groups']})
-				logger.debug("%s" % self.groups)
-				creation_response = _json_constructor(self.__class__.__name__.lower()+".create", self.server.auth, host=name, groups = self.groups)
-				logger.debug("Creation: %s" % creation_response)
+				logger.debug("%s", self.groups)
+				params = {self._type.name_field: name}
+				if len(self.groups) > 0:
+					params['groups'] = self.groups
+				creation_response = _json_constructor(self._type.methods['create'], self.server.auth, **params)
+				logger.debug("Creation: %s", creation_response)
 				response = self.server._request_handler(creation_response)
-				logger.debug("Response: %s" % response)
+				logger.debug("Response: %s", response)
 				# Get the Host from Server and populate attributes
-				id_name = self.__class__.__name__.lower()+"ids"
-				self.get_data(response['result'][id_name][0], update=True)
+				self.get_data(_created_id(response['result']), update=True)
+			elif _created_id(response) is not None:
+				# Object created through ZabbixServer.do: a single get by id populates it
+				logger.debug("Getting %s info from creation response", self.__class__.__name__)
+				self.get_data(_created_id(response), update=True)
 			else:
 				# Gets data from hostname (HostGroup exists)
-				logger.debug("Getting %s info from name" % self.__class__.__name__)
+				logger.debug("Getting %s info from name", self.__class__.__name__)
 				self.get_data_from_name(name, update=True)
 			
+	def __getattr__(self, name):
+		# Only called for the attributes not set on the object
+		if name.startswith("_") or self._lazy_loader is None:
+			raise AttributeError(name)
+		try:
+			self._lazy_loader.load(name)
+		except Exception as e:
+			# hasattr() and getattr() with a default expect an AttributeError, not an API or transport error
+			raise AttributeError("%s (lazy loading failed: %s)" % (name, e))
+		return object.__getattribute__(self, name)
+		
+	def __label__(self, field):
+		"""
+		Label of the object for :meth:`__str__`: the field if it has been fetched, else the id.
+		Never lazy loads, so printing a projected object makes no request
+		"""
+		try:
+			return object.__getattribute__(self, field)
+		except AttributeError:
+			pass
+		if self._type is not None:
+			try:
+				return "%s=%s" % (self._type.id_field, object.__getattribute__(self, self._type.id_field))
+			except AttributeError:
+				pass
+		return None
+		
 	def __str__(self):
-		return "%s %s" % (self.__class__.__name__, self.name)
+		return "%s %s" % (self.__class__.__name__, self.__label__("name"))
 			
 	def __repr__(self):
 		return self.__str__()
@@ -242,42 +1427,53 @@ class GenericZabbixObject(object):
 		return self.__str__()
 		
 	def __update__(self, dictionary_info):
-		logger.debug("Updating info...")
 		if not type(dictionary_info) == dict:
 			raise ZabbixRequestError("Programmatic error","-1","Error in function update")
-		for (k, v) in dictionary_info.iteritems():
+		# Checked once: bulk gets update thousands of objects
+		debug = logger.isEnabledFor(logging.DEBUG)
+		for (k, v) in dictionary_info.items():
 			# TODO: Needs to detects groups and other "classable" items
 			if k in classable_types:
 				pass
 			setattr(self,k,v)
-			logger.debug("Setting attribute for %s: %s -> %s" % (self.__class__.__name__, k,v))
+			if debug:
+				logger.debug("Setting attribute for %s: %s -> %s", self.__class__.__name__, k, v)
 			
 		# Uniforming naming convention
 		if 'description' in dictionary_info and not 'name' in dictionary_info:
 			setattr(self,"name",self.description)
-			logger.debug("Setting attribute for %s: %s -> %s" % (self.__class__.__name__, "name",self.description))
+			if debug:
+				logger.debug("Setting attribute for %s: %s -> %s", self.__class__.__name__, "name", self.description)
 			
-	def __get_data__(self, id_type, id, update):
-		logger.debug("Getting data for %s" % self.__class__.__name__)
+	def __get_data__(self, id_type, id, update, **options):
+		logger.debug("Getting data for %s", self.__class__.__name__)
 		output = None
-		creation_response = _json_constructor(self.__class__.__name__.lower()+".get", self.server.auth, output="extend", filter={id_type:id})
+		options.setdefault("output", "extend")
+		creation_response = _json_constructor(self._type.methods['get'], self.server.auth, filter={id_type:id}, **options)
 		response = self.server._request_handler(creation_response)
 		# Get the Host from Server and populate attributes
 		if len(response['result']) > 0:
 			output = response['result'][0]
-			logger.debug("Response: %s " % output)
+			logger.debug("Response: %s", output)
 			if update:
 				self.__update__(output)
 		return output
 		
-	def __get_data_from_name__(self, name_type, name, update):
-		logger.debug("Getting data from hostname for %s " % self.__class__.__name__)
-		creation_response = _json_constructor(self.__class__.__name__.lower()+".get", self.server.auth, output="extend", filter={name_type:name})
+	def __get_data_from_name__(self, name_type, name, update, **options):
+		logger.debug("Getting data from hostname for %s", self.__class__.__name__)
+		options.setdefault("output", "extend")
+		creation_response = _json_constructor(self._type.methods['get'], self.server.auth, filter={name_type:name}, **options)
 		response = self.server._request_handler(creation_response)
 		if update:
 			self.__update__(response['result'][0])
 		return response['result']	
 		
+	
+	def get_data(self, id, update, **options):
+		return self.__get_data__(self._type.id_field, id, update, **options)
+		
+	def get_data_from_name(self, name, update, **options):
+		return self.__get_data_from_name__(self._type.name_field, name, update, **options)
 					
 	def __dict__(self, *args):
 		out = []
@@ -302,11 +1498,11 @@ class Hostgroup(GenericZabbixObject):
 	def __init__(self, response, name_or_id, server):			
 		super(type(self),self).__init__(response, name_or_id, server)
 		
-	def get_data(self, id, update):
-		return super(type(self),self).__get_data__("groupid",id, update)
+	def get_data(self, id, update, **options):
+		return super(type(self),self).__get_data__("groupid",id, update, **options)
 
-	def get_data_from_name(self, name, update):
-		return super(type(self),self).__get_data_from_name__("name", name, update)
+	def get_data_from_name(self, name, update, **options):
+		return super(type(self),self).__get_data_from_name__("name", name, update, **options)
 		
 		
 class Trigger(GenericZabbixObject):
@@ -326,15 +1522,87 @@ class Trigger(GenericZabbixObject):
 	def __init__(self, response, name_or_id, server):			
 		super(type(self),self).__init__(response, name_or_id, server)
 		
-	def get_data(self, id, update):
-		datas = super(type(self),self).__get_data__("triggerid", id, update)
+	def get_data(self, id, update, **options):
+		datas = super(type(self),self).__get_data__("triggerid", id, update, **options)
 		return datas
 
-	def get_data_from_name(self, name, update):
+	def get_data_from_name(self, name, update, **options):
 		raise ZabbixRequestError("Programmatic error","-1","Trigger search not possible for name")
 		#return super(type(self),self).__get_data_from_name__("host", name, update)
 		
 
+class Item(GenericZabbixObject):
+	"""
+	Item Class
+	
+	Items cannot be created from their key: use :meth:`ZabbixServer.create_many` with the full
+	``item.create`` parameters.
+	
+	:param response: JSON string to be sent or received from the Zabbix Server 
+	:type response: String
+	:param name_or_id: key or id of the object
+	:type name_or_id: String
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	
+	:raise: :class: `ZabbixRequestError` exception if error
+	"""
+	
+
+class Graph(GenericZabbixObject):
+	"""
+	Graph Class
+	
+	Graphs cannot be created from their name: use :meth:`ZabbixServer.create_many` with the full
+	``graph.create`` parameters.
+	
+	:param response: JSON string to be sent or received from the Zabbix Server 
+	:type response: String
+	:param name_or_id: name or id of the object
+	:type name_or_id: String
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	
+	:raise: :class: `ZabbixRequestError` exception if error
+	"""
+	
+
+class Proxy(GenericZabbixObject):
+	"""
+	Proxy Class
+	
+	:param response: JSON string to be sent or received from the Zabbix Server 
+	:type response: String
+	:param name_or_id: name or id of the object
+	:type name_or_id: String
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	
+	:raise: :class: `ZabbixRequestError` exception if error
+	"""
+	
+	def __str__(self):
+		return "%s %s" % (self.__class__.__name__, self.__label__("host"))
+	
+
+class Maintenance(GenericZabbixObject):
+	"""
+	Maintenance Class
+	
+	Maintenances cannot be created from their name: use :meth:`ZabbixServer.create_many` with the full
+	``maintenance.create`` parameters.
+	
+	:param response: JSON string to be sent or received from the Zabbix Server 
+	:type response: String
+	:param name_or_id: name or id of the object
+	:type name_or_id: String
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	
+	:raise: :class: `ZabbixRequestError` exception if error
+	"""
+	
+
 class Template(GenericZabbixObject):
 	"""
 	Template Class
@@ -352,12 +1620,12 @@ class Template(GenericZabbixObject):
 	def __init__(self, response, name_or_id, server, **kwargs):			
 		super(type(self),self).__init__(response, name_or_id, server, **kwargs)
 		
-	def get_data(self, id, update):
-		datas = super(type(self),self).__get_data__("templateids",id,  update)
+	def get_data(self, id, update, **options):
+		datas = super(type(self),self).__get_data__("templateid",id,  update, **options)
 		return datas
 
-	def get_data_from_name(self, name, update):
-		return super(type(self),self).__get_data_from_name__("host", name, update)
+	def get_data_from_name(self, name, update, **options):
+		return super(type(self),self).__get_data_from_name__("host", name, update, **options)
 
 class Host(GenericZabbixObject):
 	"""
@@ -385,17 +1653,18 @@ class Host(GenericZabbixObject):
 					"ip": "127.0.0.1",
 					"dns": "",
 					"port": "10050"}
-	interfaces = [standard_interface]
-	groups = []
-	templates = []
 	
 	def __init__(self, response, hostname_or_id, server, **kwargs):
 		"""
 		Host init method has been overridden due to different implementation
 		"""
 		self.server = server
+		if type(response) == list and len(response) > 0:
+			# The host has already been fetched by the caller: no need to get it again
+			logger.debug("Host from response")
+			self.__update__(response[0])
 		# hostname_or_id is an id: getting the infos from the server
-		if type(hostname_or_id)==int or hostname_or_id.isdigit():
+		elif type(hostname_or_id)==int or hostname_or_id.isdigit():
 			logger.debug("Host from id")
 			host_results = self.get_data(hostname_or_id, update = True)
 			if not host_results:
@@ -404,45 +1673,120 @@ class Host(GenericZabbixObject):
 		else:
 			# Check if response is null (Host does not exist)
 			hostname = hostname_or_id
-			if 'interfaces' in kwargs:
-				self.interfaces = []
-				for interface in kwargs['interfaces']:
-					self.interfaces.append(interface)
-					
-			if 'groups' in kwargs:
-				self.groups = []
-				if type(kwargs['groups']) == list:
-					for group in kwargs['groups']:
-						self.groups.append(group.groupid)
-				else:
-					self.groups.append(kwargs['groups'].groupid)
-					
-			if 'templates' in kwargs:
-				self.templates = []
-				if type(kwargs['templates']) == list:
-					for template in kwargs['templates']:
-						self.templates.append(template.templateid)
-				else:
-					self.templates.append(kwargs['templates'].templateid)
-					
 			if len(response)==0:
 				logger.debug("Creating host")
+				# Instance lists: the defaults must not be shared between hosts
+				self.interfaces = [self.standard_interface]
+				self.groups = []
+				self.templates = []
+				if 'interfaces' in kwargs:
+					self.interfaces = []
+					for interface in kwargs['interfaces']:
+						self.interfaces.append(interface)
+						
+				if 'groups' in kwargs:
+					if type(kwargs['groups']) == list:
+						for group in kwargs['groups']:
+							self.groups.append(group.groupid)
+					else:
+						self.groups.append(kwargs['groups'].groupid)
+						
+				if 'templates' in kwargs:
+					if type(kwargs['templates']) == list:
+						for template in kwargs['templates']:
+							self.templates.append(template.templateid)
+					else:
+						self.templates.append(kwargs['templates'].templateid)
+						
 				# Create the host from server and populate attributes (Host does not exists)
 				creation_response = _json_constructor("host.create", self.server.auth, host=hostname, interfaces=self.interfaces, 
-				groups = self.groups,templates=self.templates)
+				groups = [{'groupid':g} for g in self.groups],templates=[{'templateid':t} for t in self.templates])
 				response = self.server._request_handler(creation_response)
 				# Get the Host from Server and populate attributes
-				self.get_data(self.get_data(response['result']['hostids'][0]), update=True)
+				self.get_data(response['result']['hostids'][0], update=True)
+			elif _created_id(response) is not None:
+				# Host created through ZabbixServer.do: a single get by id populates it
+				logger.debug("Getting host info from creation response")
+				self.get_data(_created_id(response), update=True)
 			else:
 				# Gets data from hostname (Host exists)
 				logger.debug("Getting host info from hostname")
 				self.get_data_from_hostname(hostname, update=True)
 	
-	def get_data(self, id, update=False):
-		return super(type(self),self).__get_data__("hostid",id, update = update)
+	def get_data(self, id, update=False, **options):
+		return super(type(self),self).__get_data__("hostid",id, update = update, **options)
 
-	def get_data_from_hostname(self, hostname, update=False):
+	def get_data_from_hostname(self, hostname, update=False, **options):
 		logger.debug("Getting data from hostname")
-		return super(type(self),self).__get_data_from_name__("host", hostname, update=update)
-		
-		
+		return super(type(self),self).__get_data_from_name__("host", hostname, update=update, **options)
+
+
+def register_object_type(name, object_class, id_field, name_field=None, ids_param=None, get_options=None,
+	create_from_name=True, schema=None, selects=None):
+	"""
+	Register an API object type, making it available to :meth:`ZabbixServer.do`, :meth:`ZabbixServer.get_many`,
+	:meth:`ZabbixServer.iter` and the other bulk methods
+	
+	>>> class Usergroup(GenericZabbixObject):
+	...     pass
+	>>> register_object_type("usergroup", Usergroup, "usrgrpid", "name")
+	
+	:param name: API name of the type, e.g. "usergroup"
+	:type name: String
+	:param object_class: subclass of :class:`GenericZabbixObject` modelling the objects
+	:type object_class: class
+	:param id_field: id field, e.g. "usrgrpid"
+	:type id_field: String
+	:param name_field: (optional) field searched by name. Default is the id field
+	:type name_field: String
+	:param ids_param: (optional) get parameter filtering by id. Default is id_field + "s"
+	:type ids_param: String
+	:param get_options: (optional) get options of :meth:`ZabbixServer.do` without ``output`` or ``select*``.
+		Default is ``{'output': "extend"}``
+	:type get_options: dict
+	:param create_from_name: the objects can be created from their name alone
+	:type create_from_name: bool
+	:param schema: (optional) (field, converter) pairs of the compact records, see :mod:`PyZabbixObj.records`.
+		Default is the id and name fields
+	:type schema: list
+	:param selects: (optional) attribute -> (get option, result field) of the lazy loaded attributes
+		not following :data:`lazy_selects`
+	:type selects: dict
+	:rtype: :class:`ObjectType`
+	"""
+	registered = ObjectType(name, object_class, id_field, name_field=name_field, ids_param=ids_param,
+		get_options=get_options, create_from_name=create_from_name, schema=schema, selects=selects)
+	object_types[name] = registered
+	object_class._type = registered
+	if not name in allowed_objects:
+		allowed_objects.append(name)
+	search_by_id[name] = registered.id_field
+	search_by_name[name] = registered.name_field
+	return registered
+
+# Gets through do() of the original types also return the groups
+_extended_get = {'output': "extend", 'selectGroups': "extend"}
+# host.get has no selectTemplates: the templates linked to a host are its parentTemplates
+register_object_type("host", Host, "hostid", "host", get_options=_extended_get, schema=records.host_schema,
+	selects={'templates': ("selectParentTemplates", "parentTemplates")})
+register_object_type("trigger", Trigger, "triggerid", "description", get_options=_extended_get, create_from_name=False,
+	schema=records.trigger_schema)
+register_object_type("template", Template, "templateid", "host", get_options=_extended_get,
+	schema=records.template_schema)
+register_object_type("hostgroup", Hostgroup, "groupid", "name", get_options=_extended_get,
+	schema=records.hostgroup_schema)
+register_object_type("item", Item, "itemid", "key_", create_from_name=False, schema=records.item_schema)
+register_object_type("graph", Graph, "graphid", "name", create_from_name=False, schema=records.graph_schema)
+register_object_type("proxy", Proxy, "proxyid", "host", create_from_name=False, schema=records.proxy_schema)
+register_object_type("maintenance", Maintenance, "maintenanceid", "name", create_from_name=False,
+	schema=records.maintenance_schema)
+
+
+from .codec import JSONCodec, get_codec, gzip_compress, gzip_decompress, gzip_decompress_stream
+from .sender import ZabbixSender
+from .mirror import InventoryMirror
+from .index import HostIndex
+from .reconcile import ReconcilePlan, plan as reconcile_plan
+
+if sys.version_info >= (3, 6):
+	from .aio import AsyncZabbixServer
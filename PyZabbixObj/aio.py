@@ -0,0 +1,387 @@
+"""
+asyncio client for the Zabbix API (Python 3.6+)
+"""
+
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import (ZabbixRequestError, _coalescing_key, _json_constructor, _request_builder, _response_builder, _response_error, _trace,
+	get_codec, gzip_compress, gzip_decompress,
+	_created_id, _object_ids, _registered, allowed_operations, non_auth_methods, object_types, rpc_url, Host)
+from .cache import copy_json
+from .transport import RequestsTransport
+from .events import _Poller
+from .stats import RequestStats, prometheus_text
+
+try:
+	import aiohttp
+except ImportError:
+	aiohttp = None
+
+
+class AiohttpTransport(object):
+	"""
+	Non-blocking keep-alive transport based on an :class:`aiohttp.ClientSession`
+
+	:param pool_size: Maximum number of connections kept open (0 means no limit)
+	:type pool_size: int
+	:param timeout: Total timeout of a request in seconds
+	:type timeout: float
+	:param verify: TLS certificate verification
+	:type verify: bool
+	"""
+
+	def __init__(self, pool_size=100, timeout=30, verify=True):
+		if aiohttp is None:
+			raise ImportError("AiohttpTransport requires the aiohttp package")
+		self.pool_size = pool_size
+		self.timeout = timeout
+		self.verify = verify
+		self._session = None
+
+	@property
+	def session(self):
+		"""
+		Underlying :class:`aiohttp.ClientSession`, created on first use inside the running loop
+		"""
+		if self._session is None or self._session.closed:
+			connector = aiohttp.TCPConnector(limit=self.pool_size, ssl=None if self.verify else False)
+			# Bodies are returned as received: the server measures them, then inflates them
+			self._session = aiohttp.ClientSession(connector=connector,
+				timeout=aiohttp.ClientTimeout(total=self.timeout), auto_decompress=False)
+		return self._session
+
+	async def post(self, url, data, headers):
+		"""
+		Send a POST request and return the raw body of the response
+		"""
+		async with self.session.post(url, data=data, headers=headers) as response:
+			response.raise_for_status()
+			return await response.read()
+
+	async def close(self):
+		if self._session is not None:
+			await self._session.close()
+			self._session = None
+
+	def __str__(self):
+		return "AiohttpTransport (pool size %s)" % self.pool_size
+
+
+class ExecutorTransport(object):
+	"""
+	Non-blocking adapter of a synchronous transport: requests run in a thread pool,
+	so the event loop is never blocked. Used when aiohttp is not installed
+
+	:param transport: (optional) synchronous transport. Default is a :class:`RequestsTransport`
+	:type transport: :class:`RequestsTransport`
+	:param workers: Threads of the pool
+	:type workers: int
+	"""
+
+	def __init__(self, transport=None, workers=20):
+		if transport is None:
+			transport = RequestsTransport(pool_size=workers)
+		self.transport = transport
+		self.workers = workers
+		self._executor = ThreadPoolExecutor(max_workers=workers)
+
+	async def post(self, url, data, headers):
+		loop = asyncio.get_event_loop()
+		return await loop.run_in_executor(self._executor, self.transport.post, url, data, headers)
+
+	async def close(self):
+		self._executor.shutdown(wait=False)
+		if hasattr(self.transport, "close"):
+			self.transport.close()
+
+	def __str__(self):
+		return "ExecutorTransport (%s workers) on %s" % (self.workers, self.transport)
+
+
+class AsyncZabbixServer(object):
+	"""
+	asyncio Zabbix Server Class
+
+	Same surface of :class:`PyZabbixObj.ZabbixServer`, with awaitable methods.
+	At most ``concurrency`` requests are in flight at the same time on a server;
+	several servers can share the same transport.
+
+	>>> server = AsyncZabbixServer("https://zabbix.example.com")
+	>>> await server.login("Admin", "zabbix")
+	>>> hosts = await asyncio.gather(*[server.do("get", "host", name=n) for n in names])
+
+	Objects returned by this class are built from the responses: their synchronous
+	``get_data*`` methods must not be used and attributes not fetched are not loaded lazily.
+
+	:param server: Base URL of the Zabbix frontend
+	:type server: String
+	:param transport: (optional) object exposing a coroutine ``post(url, data, headers)``.
+		Default is :class:`AiohttpTransport` if aiohttp is installed, else :class:`ExecutorTransport`
+	:param concurrency: Maximum number of requests in flight
+	:type concurrency: int
+	:param timeout: Request timeout in seconds for the default transport
+	:type timeout: float
+	:param verify: TLS certificate verification for the default transport
+	:type verify: bool
+	:param trace: (optional) log the request and response payloads at DEBUG level to the ``PyZabbixObj.trace`` logger
+	:type trace: bool
+	:param trace_limit: Characters of each payload kept in the trace, None for no limit
+	:type trace_limit: int
+	:param codec: (optional) JSON codec, see :class:`PyZabbixObj.ZabbixServer`
+	:type codec: String or :class:`PyZabbixObj.JSONCodec`
+	:param compress: (optional) gzip the large request bodies and ask for gzipped responses, see :class:`PyZabbixObj.ZabbixServer`
+	:type compress: bool
+	"""
+	auth = None
+	coalesce = True
+	compress_min_size = 4096
+	headers = {
+		"Content-Type": "application/json-rpc"
+	}
+
+	def __init__(self, server="http://localhost/zabbix", transport=None, concurrency=50, timeout=30, verify=True,
+		trace=False, trace_limit=2000, codec=None, compress=False):
+		self.api_server = server+rpc_url
+		self.codec = get_codec(codec)
+		self.compress = compress
+		self.headers = dict(self.headers)
+		self.headers['Accept-Encoding'] = "gzip" if compress else "identity"
+		self.compressed_headers = dict(self.headers, **{'Content-Encoding': "gzip"})
+		self.trace = trace
+		self.trace_limit = trace_limit
+		self.request_stats = RequestStats()
+		self.pre_request_hooks = []
+		self.post_request_hooks = []
+		if transport is None:
+			if aiohttp is not None:
+				transport = AiohttpTransport(pool_size=concurrency, timeout=timeout, verify=verify)
+			else:
+				transport = ExecutorTransport(RequestsTransport(pool_size=concurrency, timeout=timeout,
+					verify=verify), workers=concurrency)
+		self.transport = transport
+		self.concurrency = concurrency
+		self._semaphore = None
+		self._request_ids = itertools.count(1)
+		self._inflight = {}
+
+	@property
+	def semaphore(self):
+		# Created lazily: before Python 3.10 it is bound to the loop running at creation time
+		if self._semaphore is None:
+			self._semaphore = asyncio.Semaphore(self.concurrency)
+		return self._semaphore
+
+	async def _request_handler(self, request):
+		"""
+		Internal routine for Zabbix requests
+
+		:raise: :class: `ZabbixRequestError` exception if error
+		"""
+		if self.auth is None and not request['method'] in non_auth_methods:
+			raise ZabbixRequestError("LOGIN NOK","-1","User is not logged in")
+		coalescing_key = _coalescing_key(request) if self.coalesce else None
+		if coalescing_key is None:
+			return await self.__send__(request)
+		# Identical reads in flight share a single HTTP call, each caller gets its own copy of the response
+		task = self._inflight.get(coalescing_key)
+		if task is None:
+			task = asyncio.ensure_future(self.__send__(request))
+			self._inflight[coalescing_key] = task
+			task.add_done_callback(lambda t: self._inflight.pop(coalescing_key, None))
+		# The first caller gets a copy too: changing the shared response would change the copies made later
+		return copy_json(await asyncio.shield(task))
+
+	async def __send__(self, request):
+		request['id'] = next(self._request_ids)
+		body = self.codec.dumps(request)
+		if self.trace:
+			_trace("Request", body, self.trace_limit)
+		headers = self.headers
+		if self.compress and len(body) >= self.compress_min_size:
+			body, headers = gzip_compress(body), self.compressed_headers
+		for hook in self.pre_request_hooks:
+			hook(request)
+		response = error = None
+		response_bytes = 0
+		async with self.semaphore:
+			# Measured inside the semaphore: the time waiting for a free slot is not server latency
+			start = time.time()
+			try:
+				response_body = await self.transport.post(self.api_server, body, headers)
+				response_bytes = len(response_body)
+				response_body = gzip_decompress(response_body)
+				if self.trace:
+					_trace("Response", response_body, self.trace_limit)
+				response = self.codec.loads(response_body)
+			except Exception as e:
+				error = e
+				raise
+			finally:
+				seconds = time.time() - start
+				error_code = getattr(error, "code", None) or (error.__class__.__name__ if error is not None else None)
+				if response is not None and 'error' in response:
+					error_code = response['error'].get('code')
+				self.request_stats.record(request['method'], seconds, len(body), response_bytes, error_code)
+				for hook in self.post_request_hooks:
+					hook(request, response, seconds, error)
+		if 'error' in response:
+			raise _response_error(response)
+		return response
+
+	def add_hook(self, pre=None, post=None):
+		"""
+		Register callbacks run around every request. See :meth:`PyZabbixObj.ZabbixServer.add_hook`
+		"""
+		if pre is not None:
+			self.pre_request_hooks.append(pre)
+		if post is not None:
+			self.post_request_hooks.append(post)
+
+	def stats(self):
+		"""
+		Snapshot of the instrumentation of this server. See :meth:`PyZabbixObj.ZabbixServer.stats`
+
+		:rtype: dict
+		"""
+		stats = self.request_stats.snapshot()
+		stats['coalescing'] = None
+		stats['cache'] = None
+		return stats
+
+	def prometheus(self, prefix="pyzabbixobj", **labels):
+		"""
+		:return: :meth:`stats` in the Prometheus text exposition format
+		:rtype: String
+		"""
+		return prometheus_text(self.stats(), prefix, **labels)
+
+	async def login(self, user, pw):
+		"""
+		Routine login. See :meth:`PyZabbixObj.ZabbixServer.login`
+
+		:return: True if already logged, else False
+		:rtype: bool
+		"""
+		if self.auth is not None:
+			return True
+		login_response = await self._request_handler(_json_constructor("user.login", None, user=user, password=pw))
+		if 'result' in login_response:
+			self.auth = login_response['result']
+		return False
+
+	async def get_version(self):
+		response = await self._request_handler(_json_constructor("apiinfo.version", None))
+		return response['result']
+
+	async def do(self, operation, object_type, **kwargs):
+		"""
+		Main executing method for the server. See :meth:`PyZabbixObj.ZabbixServer.do`
+
+		:return: Instantiated class of the object or None if the object does not exist
+		"""
+		if not operation in allowed_operations or not object_type in object_types:
+			return None
+		json_object, name_or_id = _request_builder(self.auth, object_type, operation, **kwargs)
+		response = await self._request_handler(json_object)
+		if operation == "create":
+			# Populate the new object here: the object constructor would do it with a blocking request
+			name_or_id = _created_id(response['result'])
+			response = await self.__get_by_id__(object_type, name_or_id)
+		return _response_builder(self, object_type, name_or_id, response)
+
+	async def get_object(self, object_type, name_or_id, create=True, **kwargs):
+		"""
+		Awaitable object constructor: get an object by name or id and create it if it does not exist
+
+		>>> linux = await server.get_object("hostgroup", "Linux servers")
+		>>> host = await server.get_object("host", "web01", groups=[linux])
+
+		:param object_type: Type of the object. Must be in allowed_objects
+		:type object_type: String
+		:param name_or_id: name or id of the object
+		:type name_or_id: String
+		:param create: create the object from its name if it does not exist
+		:type create: bool
+		:param kwargs: (optional) creation parameters, e.g. ``groups``, ``templates``, ``interfaces``
+		:return: Instantiated class of the object or None
+		:raise: :class: `ZabbixRequestError` exception if error
+		"""
+		registered = _registered(object_type)
+		if type(name_or_id) == int or name_or_id.isdigit():
+			response = await self.__get_by_id__(object_type, name_or_id)
+			if len(response['result']) == 0:
+				raise ZabbixRequestError("Programmatic error","-1","%s creation impossibile only from id" % object_type)
+			return _response_builder(self, object_type, name_or_id, response)
+		name_type = registered.name_field
+		response = await self._request_handler(_json_constructor(registered.methods['get'], self.auth, output="extend",
+			filter={name_type: name_or_id}))
+		if len(response['result']) == 0:
+			if not create:
+				return None
+			if not registered.create_from_name:
+				raise ZabbixRequestError("Programmatic error","-1","%s creation impossibile only from name" % object_type)
+			params = {name_type: name_or_id}
+			if 'groups' in kwargs:
+				params['groups'] = [{'groupid':g} for g in _object_ids(kwargs['groups'], "groupid")]
+			if 'templates' in kwargs:
+				params['templates'] = [{'templateid':t} for t in _object_ids(kwargs['templates'], "templateid")]
+			if object_type == "host":
+				params['interfaces'] = kwargs.get('interfaces', [Host.standard_interface])
+			created = await self._request_handler(_json_constructor(registered.methods['create'], self.auth, **params))
+			response = await self.__get_by_id__(object_type, _created_id(created['result']))
+		return _response_builder(self, object_type, name_or_id, response)
+
+	async def watch_events(self, eventid_from=None, watermark_file=None, limit=1000, min_interval=1.0,
+		max_interval=30.0, stop=None, **kwargs):
+		"""
+		Asynchronous iterator over the new events. See :func:`PyZabbixObj.events.watch_events`
+
+		>>> async for event in server.watch_events(value=1):
+		...     await notify(event)
+
+		:param stop: (optional) the watch ends when the event is set
+		:type stop: :class:`asyncio.Event`
+		"""
+		poller = _Poller(eventid_from, watermark_file, limit, min_interval, max_interval, kwargs)
+		stop = stop or asyncio.Event()
+		if poller.last is None:
+			response = await self._request_handler(_json_constructor("event.get", self.auth, **poller.latest_request()))
+			poller.start(response['result'])
+		try:
+			while not stop.is_set():
+				response = await self._request_handler(_json_constructor("event.get", self.auth, **poller.request()))
+				for event in response['result']:
+					yield event
+					poller.seen(event)
+				wait = poller.done(len(response['result']))
+				if wait:
+					try:
+						await asyncio.wait_for(stop.wait(), wait)
+					except asyncio.TimeoutError:
+						pass
+		finally:
+			poller.save()
+
+	async def __get_by_id__(self, object_type, id):
+		registered = object_types[object_type]
+		return await self._request_handler(_json_constructor(registered.methods['get'], self.auth, output="extend",
+			filter={registered.id_field: id}))
+
+	async def close(self):
+		"""
+		Release the connections held by the transport
+		"""
+		if hasattr(self.transport, "close"):
+			await self.transport.close()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc_info):
+		await self.close()
+
+	def __str__(self):
+		return "Async Server Zabbix %s" % self.api_server
@@ -0,0 +1,111 @@
+"""
+Client-side cache of the objects read from a Zabbix Server
+"""
+
+from __future__ import unicode_literals
+import threading
+import time
+from collections import OrderedDict
+
+
+def copy_json(value):
+	"""
+	Deep copy of a decoded JSON value (dicts, lists and immutable scalars), faster than :func:`copy.deepcopy`
+	"""
+	if type(value) == dict:
+		return dict((k, copy_json(v)) for (k, v) in value.items())
+	if type(value) == list:
+		return [copy_json(v) for v in value]
+	return value
+
+
+class ObjectCache(object):
+	"""
+	Thread-safe LRU cache of API records with time-to-live
+
+	Records are indexed by (object type, field, value, request shape, scope), where field is the id or the
+	name field of the object type, the shape identifies the other get parameters (output, select*) and
+	the scope the frontend and session that read the record, so one cache can serve many servers and users.
+	Records are copied when stored and when returned: callers can modify them freely.
+
+	:param ttl: Seconds a record stays valid
+	:type ttl: float
+	:param max_size: Maximum number of entries, the least recently used ones are evicted first
+	:type max_size: int
+	"""
+
+	def __init__(self, ttl=300, max_size=10000):
+		self.ttl = ttl
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, object_type, field, value, shape, scope=None):
+		"""
+		:return: copy of the cached record or None
+		:rtype: dict
+		"""
+		key = (object_type, field, "%s" % value, shape, scope)
+		with self._lock:
+			entry = self._data.pop(key, None)
+			if entry is None or entry[0] < time.time():
+				self.misses += 1
+				return None
+			# Re-inserted as the most recently used
+			self._data[key] = entry
+			self.hits += 1
+		return copy_json(entry[1])
+
+	def put(self, object_type, record, fields, shape, scope=None):
+		"""
+		Store a copy of a record under each of the given fields (e.g. its id and its name)
+		"""
+		expire = time.time() + self.ttl
+		record = copy_json(record)
+		with self._lock:
+			for field in fields:
+				if field in record:
+					key = (object_type, field, "%s" % record[field], shape, scope)
+					self._data.pop(key, None)
+					self._data[key] = (expire, record)
+			while len(self._data) > self.max_size:
+				self._data.popitem(last=False)
+				self.evictions += 1
+
+	def invalidate(self, object_type=None):
+		"""
+		Drop the records of an object type, or all the records
+		"""
+		with self._lock:
+			if object_type is None:
+				self._data.clear()
+			else:
+				for key in [k for k in self._data if k[0] == object_type]:
+					del self._data[key]
+			self.invalidations += 1
+
+	def stats(self):
+		"""
+		:return: hits, misses, hit ratio, evictions, invalidations and current size
+		:rtype: dict
+		"""
+		with self._lock:
+			total = self.hits + self.misses
+			return {
+				'hits': self.hits,
+				'misses': self.misses,
+				'hit_ratio': float(self.hits) / total if total else 0.0,
+				'evictions': self.evictions,
+				'invalidations': self.invalidations,
+				'size': len(self._data)
+			}
+
+	def __len__(self):
+		return len(self._data)
+
+	def __str__(self):
+		return "ObjectCache (ttl %ss, max size %s)" % (self.ttl, self.max_size)
@@ -0,0 +1,150 @@
+"""
+JSON codecs and gzip helpers used by :class:`PyZabbixObj.ZabbixServer` to encode requests and decode responses
+"""
+
+from __future__ import unicode_literals
+import gc
+import json
+import zlib
+from . import ZabbixRequestError
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+try:
+	import ujson
+except ImportError:
+	ujson = None
+
+gzip_magic = b"\x1f\x8b"
+
+
+class JSONCodec(object):
+	"""
+	Standard library codec, always available. Codecs encode to ``str`` or ``bytes`` and decode both.
+	Subclasses implement :meth:`dumps` and :meth:`decode`
+	"""
+	name = "json"
+	# Opt-in: set to a size (e.g. 1 << 20) to pause the cyclic garbage collector while decoding larger bodies,
+	# whose millions of containers trigger many useless collections (2-4 times the decoding time).
+	# The pause is process-wide: only for applications that do not decode in several threads
+	gc_pause_size = None
+
+	def dumps(self, obj):
+		return json.dumps(obj)
+
+	def decode(self, data):
+		if isinstance(data, bytes) and not isinstance(data, str):
+			# bytes on Python 3 (json.loads accepts them only from 3.6)
+			data = data.decode("utf-8")
+		return json.loads(data)
+
+	def loads(self, data):
+		if self.gc_pause_size is None or len(data) < self.gc_pause_size or not gc.isenabled():
+			return self.decode(data)
+		gc.disable()
+		try:
+			return self.decode(data)
+		finally:
+			gc.enable()
+
+	def __str__(self):
+		return "JSONCodec %s" % self.name
+
+	__repr__ = __str__
+
+
+class OrjsonCodec(JSONCodec):
+	"""
+	Codec based on orjson, encoding to UTF-8 bytes
+	"""
+	name = "orjson"
+
+	def dumps(self, obj):
+		return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+	def decode(self, data):
+		return orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+	"""
+	Codec based on ujson
+	"""
+	name = "ujson"
+
+	def dumps(self, obj):
+		return ujson.dumps(obj, ensure_ascii=True, escape_forward_slashes=False)
+
+	def decode(self, data):
+		return ujson.loads(data)
+
+
+# Codec name -> (class, library), by preference
+codecs = [
+	("orjson", OrjsonCodec, orjson),
+	("ujson", UjsonCodec, ujson),
+	("json", JSONCodec, json)
+]
+
+
+def get_codec(codec=None):
+	"""
+	:param codec: (optional) codec instance or name ("orjson", "ujson", "json"). Default is the fastest installed
+	:return: a codec
+	:rtype: :class:`JSONCodec`
+	:raise: :class: `ZabbixRequestError` exception if the codec is unknown or its library is not installed
+	"""
+	if codec is not None and not isinstance(codec, (str, type(""))):
+		return codec
+	for name, codec_class, library in codecs:
+		if codec in (None, "auto", name) and library is not None:
+			return codec_class()
+	raise ZabbixRequestError("Programmatic error","-1","JSON codec %s not available" % codec)
+
+
+def gzip_compress(body, level=6):
+	"""
+	:param body: encoded request
+	:type body: str or bytes
+	:return: body in the gzip format
+	:rtype: bytes
+	"""
+	if not isinstance(body, bytes):
+		body = body.encode("utf-8")
+	compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+	return compressor.compress(body) + compressor.flush()
+
+
+def gzip_decompress(body):
+	"""
+	Inflate a gzip body. Other bodies (e.g. already inflated by the transport) are returned unchanged
+	"""
+	if isinstance(body, bytes) and body[:2] == gzip_magic:
+		return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+	return body
+
+
+def gzip_decompress_stream(chunks):
+	"""
+	Inflate a gzip body arriving in chunks. Other bodies are yielded unchanged
+	"""
+	chunks = iter(chunks)
+	# The first two bytes tell a gzip body
+	head = None
+	for chunk in chunks:
+		head = chunk if head is None else head + chunk
+		if len(head) >= 2:
+			break
+	if not (isinstance(head, bytes) and head[:2] == gzip_magic):
+		if head:
+			yield head
+		for chunk in chunks:
+			yield chunk
+		return
+	decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+	yield decompressor.decompress(head)
+	for chunk in chunks:
+		yield decompressor.decompress(chunk)
+	yield decompressor.flush()
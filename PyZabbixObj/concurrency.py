@@ -0,0 +1,107 @@
+"""
+Helpers to share a :class:`PyZabbixObj.ZabbixServer` between threads
+"""
+
+from __future__ import unicode_literals
+import threading
+import time
+
+
+class RateLimiter(object):
+	"""
+	Thread-safe token bucket: at most ``rate`` acquisitions per second, with bursts up to ``burst``
+
+	:param rate: Allowed acquisitions per second
+	:type rate: float
+	:param burst: (optional) Size of the bucket. Default is 1 (no burst)
+	:type burst: int
+	"""
+
+	def __init__(self, rate, burst=1):
+		if rate <= 0:
+			raise ValueError("rate must be positive")
+		self.rate = float(rate)
+		self.burst = burst
+		self._tokens = float(burst)
+		self._last = time.time()
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		"""
+		Block until a token is available
+		"""
+		while True:
+			with self._lock:
+				now = time.time()
+				self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+				self._last = now
+				if self._tokens >= 1:
+					self._tokens -= 1
+					return
+				wait = (1 - self._tokens) / self.rate
+			time.sleep(wait)
+
+	def __str__(self):
+		return "RateLimiter %s/s" % self.rate
+
+
+class _Call(object):
+
+	def __init__(self):
+		self.event = threading.Event()
+		self.result = None
+		self.error = None
+
+
+class SingleFlight(object):
+	"""
+	Request coalescing: threads calling :meth:`do` with the same key while a call is
+	in progress wait for it and share its result (or its exception) instead of running their own
+	"""
+
+	def __init__(self):
+		self.calls = 0
+		self.shared = 0
+		self._calls = {}
+		self._lock = threading.Lock()
+
+	def do(self, key, func, share=None):
+		"""
+		:param key: identity of the call
+		:param func: function run by the first caller
+		:param share: (optional) function applied to the result returned to each caller, the one
+			that ran func included, e.g. a copy so that callers can modify their result
+		:return: result of func
+		"""
+		with self._lock:
+			call = self._calls.get(key)
+			leader = call is None
+			if leader:
+				call = self._calls[key] = _Call()
+				self.calls += 1
+			else:
+				self.shared += 1
+		if not leader:
+			call.event.wait()
+			if call.error is not None:
+				raise call.error
+			return share(call.result) if share is not None else call.result
+		try:
+			call.result = func()
+		except Exception as e:
+			call.error = e
+			raise
+		finally:
+			with self._lock:
+				del self._calls[key]
+			call.event.set()
+		# The shared result itself is never handed out: a caller changing its copy while the
+		# others are still copying would corrupt them
+		return share(call.result) if share is not None else call.result
+
+	def stats(self):
+		"""
+		:return: calls run and calls that shared the result of another one
+		:rtype: dict
+		"""
+		return {'calls': self.calls, 'shared': self.shared}
@@ -0,0 +1,138 @@
+"""
+Incremental polling of new events with an ``eventid`` watermark
+"""
+
+from __future__ import unicode_literals
+import os
+import threading
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def load_watermark(path):
+	"""
+	:return: last event id saved in the file, or None if the file does not exist
+	:rtype: int
+	"""
+	try:
+		with open(path) as f:
+			return int(f.read().strip())
+	except (IOError, OSError):
+		return None
+
+
+def save_watermark(path, eventid):
+	"""
+	Write the last event id: the file is replaced atomically, so it is never left half written
+	"""
+	tmp = "%s.tmp" % path
+	with open(tmp, "w") as f:
+		f.write("%s\n" % eventid)
+		f.flush()
+		os.fsync(f.fileno())
+	_replace(tmp, path)
+
+
+class _Poller(object):
+	"""
+	State of a watch: watermark and polling interval, shared by the sync and the async servers.
+
+	The interval drops to 0 while the pages come back full (backlog), goes back to ``min_interval``
+	as soon as a page is not full, and doubles up to ``max_interval`` while there are no events.
+	"""
+
+	def __init__(self, eventid_from, watermark_file, limit, min_interval, max_interval, params):
+		self.watermark_file = watermark_file
+		self.limit = limit
+		self.min_interval = min_interval
+		self.max_interval = max_interval
+		self.interval = min_interval
+		self.params = params
+		self.params.setdefault('output', "extend")
+		self.last = None
+		if eventid_from is not None:
+			self.last = int(eventid_from) - 1
+		elif watermark_file is not None:
+			self.last = load_watermark(watermark_file)
+		self.saved = self.last
+
+	def latest_request(self):
+		"""
+		Parameters of the request of the most recent event, used when there is no watermark
+		"""
+		return {'output': ["eventid"], 'sortfield': ["eventid"], 'sortorder': "DESC", 'limit': 1}
+
+	def start(self, latest):
+		self.last = int(latest[0]['eventid']) if latest else 0
+		self.saved = self.last
+
+	def request(self):
+		params = dict(self.params)
+		params.update(eventid_from="%s" % (self.last + 1), sortfield=["eventid"], sortorder="ASC", limit=self.limit)
+		return params
+
+	def seen(self, event):
+		self.last = max(self.last, int(event['eventid']))
+
+	def done(self, count):
+		"""
+		Save the watermark and return the seconds to wait before the next poll
+		"""
+		self.save()
+		if count >= self.limit:
+			self.interval = self.min_interval
+			return 0
+		if count:
+			self.interval = self.min_interval
+		else:
+			self.interval = min(self.interval * 2, self.max_interval)
+		return self.interval
+
+	def save(self):
+		if self.watermark_file is not None and self.last != self.saved:
+			save_watermark(self.watermark_file, self.last)
+			self.saved = self.last
+
+
+def watch_events(server, eventid_from=None, watermark_file=None, limit=1000, min_interval=1.0, max_interval=30.0,
+	stop=None, **kwargs):
+	"""
+	Generator of the new events, polled with ``event.get`` from the last event id seen.
+	Without ``eventid_from`` or a saved watermark the watch starts after the most recent event.
+	An event counts as seen once the consumer asks for the next one: after a restart, the event being
+	processed when the watch stopped is returned again.
+
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	:param eventid_from: (optional) first event id to return
+	:type eventid_from: int
+	:param watermark_file: (optional) file keeping the last event id returned, to resume after a restart
+	:type watermark_file: String
+	:param limit: events requested by each poll
+	:type limit: int
+	:param min_interval: seconds between polls when events are coming
+	:type min_interval: float
+	:param max_interval: maximum seconds between polls when no event is coming
+	:type max_interval: float
+	:param stop: (optional) the watch ends when the event is set
+	:type stop: :class:`threading.Event`
+	:param kwargs: (optional) other ``event.get`` parameters, e.g. ``value=1``, ``source=0``, ``selectHosts``
+	:return: events, by increasing id
+	:rtype: generator
+	"""
+	poller = _Poller(eventid_from, watermark_file, limit, min_interval, max_interval, kwargs)
+	stop = stop or threading.Event()
+	if poller.last is None:
+		poller.start(list(server.stream("event.get", **poller.latest_request())))
+	try:
+		while not stop.is_set():
+			# A page is bounded by limit: read it whole to release the connection before yielding
+			events = list(server.stream("event.get", **poller.request()))
+			for event in events:
+				yield event
+				poller.seen(event)
+			wait = poller.done(len(events))
+			if wait:
+				stop.wait(wait)
+	finally:
+		poller.save()
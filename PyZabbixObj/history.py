@@ -0,0 +1,170 @@
+"""
+Columnar retrieval of history and trends into NumPy arrays (numpy is required)
+"""
+
+import array
+from multiprocessing.pool import ThreadPool
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Array type code of the unsigned values: the array module of Python 2 has no "Q", its widest
+# unsigned code is "L" (C unsigned long, which numpy reads with the same code)
+_unsigned_code = "Q" if "Q" in getattr(array, "typecodes", "") else "L"
+
+# Value types of history.get: 0 numeric float, 1 character, 2 log, 3 numeric unsigned, 4 text
+history_value_types = {
+	0: ("d", "f8"),
+	3: (_unsigned_code, "u8"),
+}
+trend_fields = ("num", "value_min", "value_avg", "value_max")
+
+
+def _windows(time_from, time_till, window):
+	"""
+	Split [time_from, time_till] in consecutive windows of ``window`` seconds (bounds included)
+	"""
+	start = int(time_from)
+	while start <= time_till:
+		yield start, min(start + window - 1, int(time_till))
+		start += window
+
+
+def _tasks(itemids, time_from, time_till, window, items_per_request):
+	itemids = [str(i) for i in itemids]
+	for i in range(0, len(itemids), items_per_request):
+		for start, end in _windows(time_from, time_till, window):
+			yield itemids[i:i+items_per_request], start, end
+
+
+def _require_numpy():
+	if numpy is None:
+		raise ImportError("History and trend retrieval requires numpy")
+
+
+def _run(tasks, fetch, workers):
+	pool = ThreadPool(workers)
+	try:
+		return pool.map(fetch, list(tasks))
+	finally:
+		pool.close()
+		pool.join()
+
+
+def _merge(parts, columns_dtype, as_array):
+	"""
+	Concatenate the columns of each task into a structured array per item, sorted by clock
+	(or into a single array with an itemid field)
+	"""
+	per_item = {}
+	for part in parts:
+		for itemid, columns in part.items():
+			per_item.setdefault(itemid, []).append(columns)
+	result = {}
+	for itemid, chunks in per_item.items():
+		data = numpy.empty(sum(len(c[0]) for c in chunks), dtype=columns_dtype)
+		for index, (name, dtype) in enumerate(columns_dtype):
+			if dtype == "O":
+				data[name] = [v for c in chunks for v in c[index]]
+			else:
+				# array.array and numpy share the C type codes: no copy through Python objects
+				data[name] = numpy.concatenate([numpy.frombuffer(c[index], dtype=c[index].typecode) for c in chunks])
+		clock = data["clock"]
+		if len(clock) > 1 and not (clock[1:] >= clock[:-1]).all():
+			data = data[numpy.argsort(clock, kind="mergesort")]
+		result[itemid] = data
+	if not as_array:
+		return result
+	out = numpy.empty(sum(len(d) for d in result.values()), dtype=[("itemid", "u8")] + list(columns_dtype))
+	position = 0
+	for itemid in sorted(result, key=int):
+		data = result[itemid]
+		block = out[position:position+len(data)]
+		block["itemid"] = int(itemid)
+		for name, _ in columns_dtype:
+			block[name] = data[name]
+		position += len(data)
+	return out
+
+
+def fetch_history(server, itemids, time_from, time_till, history=0, window=86400, items_per_request=100,
+	workers=4, as_array=False):
+	"""
+	Run ``history.get`` for many items and a time range, split in windows fetched in parallel.
+	Values are decoded from the response stream straight into compact columns.
+
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	:param itemids: ids of the items, all of the same value type
+	:type itemids: list
+	:param time_from: start of the range (unix time, included)
+	:type time_from: int
+	:param time_till: end of the range (unix time, included)
+	:type time_till: int
+	:param history: value type of the items: 0 float, 3 unsigned, 1/2/4 strings (stored as objects)
+	:type history: int
+	:param window: seconds of data requested by each call
+	:type window: int
+	:param items_per_request: items requested by each call
+	:type items_per_request: int
+	:param workers: calls running in parallel
+	:type workers: int
+	:param as_array: return one structured array with an ``itemid`` field, sorted by item
+	:type as_array: bool
+	:return: structured arrays with ``clock`` (uint32), ``ns`` (int32) and ``value`` fields, indexed by itemid
+	:rtype: dict or :class:`numpy.ndarray`
+	"""
+	_require_numpy()
+	value_code, value_dtype = history_value_types.get(history, (None, "O"))
+
+	def fetch(task):
+		chunk, start, end = task
+		columns = {}
+		for record in server.stream("history.get", history=history, itemids=chunk, time_from=start, time_till=end,
+			output=["itemid", "clock", "ns", "value"], sortfield="clock", sortorder="ASC"):
+			c = columns.get(record['itemid'])
+			if c is None:
+				c = columns[record['itemid']] = (array.array("I"), array.array("i"),
+					array.array(value_code) if value_code else [])
+			c[0].append(int(record['clock']))
+			c[1].append(int(record['ns']))
+			c[2].append(float(record['value']) if value_code == "d" else int(record['value']) if value_code else record['value'])
+		return columns
+
+	parts = _run(_tasks(itemids, time_from, time_till, window, items_per_request), fetch, workers)
+	return _merge(parts, [("clock", "u4"), ("ns", "i4"), ("value", value_dtype)], as_array)
+
+
+def fetch_trends(server, itemids, time_from, time_till, window=86400*7, items_per_request=100, workers=4,
+	as_array=False):
+	"""
+	Run ``trend.get`` for many items and a time range, split in windows fetched in parallel.
+	Same parameters of :func:`fetch_history`
+
+	:return: structured arrays with ``clock`` (uint32), ``num`` (uint32), ``value_min``, ``value_avg``
+		and ``value_max`` (float64) fields, indexed by itemid
+	:rtype: dict or :class:`numpy.ndarray`
+	"""
+	_require_numpy()
+
+	def fetch(task):
+		chunk, start, end = task
+		columns = {}
+		for record in server.stream("trend.get", itemids=chunk, time_from=start, time_till=end,
+			output=["itemid", "clock"] + list(trend_fields)):
+			c = columns.get(record['itemid'])
+			if c is None:
+				c = columns[record['itemid']] = (array.array("I"), array.array("I"), array.array("d"),
+					array.array("d"), array.array("d"))
+			c[0].append(int(record['clock']))
+			c[1].append(int(record['num']))
+			c[2].append(float(record['value_min']))
+			c[3].append(float(record['value_avg']))
+			c[4].append(float(record['value_max']))
+		return columns
+
+	parts = _run(_tasks(itemids, time_from, time_till, window, items_per_request), fetch, workers)
+	return _merge(parts, [("clock", "u4"), ("num", "u4"), ("value_min", "f8"), ("value_avg", "f8"),
+		("value_max", "f8")], as_array)
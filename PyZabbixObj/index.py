@@ -0,0 +1,187 @@
+"""
+In-memory secondary indexes over fetched hosts
+"""
+
+from __future__ import unicode_literals
+import bisect
+import threading
+from . import _object_ids
+
+
+def _field(host, name):
+	if type(host) == dict:
+		return host.get(name)
+	return getattr(host, name, None)
+
+
+class HostIndex(object):
+	"""
+	Hash indexes of hosts by group, template, interface IP and technical name, and a sorted
+	index of the names for prefix and range queries
+
+	Hosts can be :class:`Host` objects (e.g. from :meth:`ZabbixServer.get_many` or :meth:`ZabbixServer.iter`)
+	or records as returned by ``host.get``. They need their ``groups``, ``parentTemplates`` and
+	``interfaces``: :attr:`fetch_options` are the get options that select them.
+	An index built by :meth:`ZabbixServer.index_hosts` is kept up to date with the hosts created,
+	updated and deleted through the same server.
+
+	>>> index = server.index_hosts()
+	>>> index.in_group(linux.groupid)
+	>>> index.by_ip("10.0.0.7")
+	>>> index.prefix("web")
+
+	:param hosts: (optional) hosts to index
+	:type hosts: iterable
+	"""
+
+	fetch_options = {
+		'output': ["hostid", "host", "name", "status"],
+		'selectGroups': ["groupid"],
+		'selectParentTemplates': ["templateid"],
+		'selectInterfaces': ["interfaceid", "ip", "dns"]
+	}
+
+	def __init__(self, hosts=()):
+		self.hosts = {}
+		self._groups = {}
+		self._templates = {}
+		self._ips = {}
+		self._names = {}
+		self._sorted_names = []
+		self._keys = {}
+		self._lock = threading.RLock()
+		with self._lock:
+			for host in hosts:
+				self.__insert__(host, sort=False)
+			self._sorted_names.sort()
+
+	def __insert__(self, host, sort=True):
+		hostid = "%s" % _field(host, 'hostid')
+		if hostid in self.hosts:
+			self.__discard__(hostid)
+		templates = _field(host, 'parentTemplates')
+		if templates is None:
+			templates = _field(host, 'templates')
+		keys = (
+			[(self._groups, g) for g in _object_ids(_field(host, 'groups'), "groupid")] +
+			[(self._templates, t) for t in _object_ids(templates, "templateid")] +
+			[(self._ips, i['ip']) for i in _field(host, 'interfaces') or [] if i.get('ip')]
+		)
+		name = _field(host, 'host')
+		if name is not None:
+			keys.append((self._names, name))
+			if sort:
+				bisect.insort(self._sorted_names, (name, hostid))
+			else:
+				self._sorted_names.append((name, hostid))
+		self.hosts[hostid] = host
+		# Keys are kept to remove the host without reading its (possibly changed) attributes
+		self._keys[hostid] = [(index, "%s" % key) for (index, key) in keys]
+		for index, key in self._keys[hostid]:
+			index.setdefault(key, set()).add(hostid)
+
+	def __discard__(self, hostid):
+		host = self.hosts.pop(hostid, None)
+		if host is None:
+			return
+		for index, key in self._keys.pop(hostid):
+			ids = index[key]
+			ids.discard(hostid)
+			if not ids:
+				del index[key]
+			if index is self._names:
+				position = bisect.bisect_left(self._sorted_names, (key, hostid))
+				if position < len(self._sorted_names) and self._sorted_names[position] == (key, hostid):
+					del self._sorted_names[position]
+
+	def add(self, host):
+		"""
+		Index a host, replacing the previous version of the same hostid
+		"""
+		with self._lock:
+			self.__insert__(host)
+
+	def remove(self, host):
+		"""
+		Remove a host, given as object, record or hostid
+		"""
+		with self._lock:
+			for hostid in _object_ids(host, "hostid"):
+				self.__discard__("%s" % hostid)
+
+	def __hosts__(self, ids):
+		return [self.hosts[i] for i in sorted(ids, key=int)]
+
+	def __lookup__(self, index, key):
+		with self._lock:
+			return self.__hosts__(index.get("%s" % key, ()))
+
+	def get(self, hostid):
+		"""
+		:return: host with the given id, or None
+		"""
+		return self.hosts.get("%s" % hostid)
+
+	def in_group(self, groupid):
+		"""
+		:return: hosts of a group, ordered by id
+		:rtype: list
+		"""
+		return self.__lookup__(self._groups, _object_ids(groupid, "groupid")[0])
+
+	def with_template(self, templateid):
+		"""
+		:return: hosts linked to a template, ordered by id
+		:rtype: list
+		"""
+		return self.__lookup__(self._templates, _object_ids(templateid, "templateid")[0])
+
+	def by_ip(self, ip):
+		"""
+		:return: hosts with an interface on the IP, ordered by id
+		:rtype: list
+		"""
+		return self.__lookup__(self._ips, ip)
+
+	def by_name(self, name):
+		"""
+		:return: host with the technical name, or None
+		"""
+		hosts = self.__lookup__(self._names, name)
+		return hosts[0] if hosts else None
+
+	def range(self, start, end=None):
+		"""
+		:return: hosts with start <= technical name < end, ordered by name
+		:rtype: list
+		"""
+		with self._lock:
+			position = bisect.bisect_left(self._sorted_names, (start,))
+			stop = len(self._sorted_names) if end is None else bisect.bisect_left(self._sorted_names, (end,))
+			return [self.hosts[hostid] for (_, hostid) in self._sorted_names[position:stop]]
+
+	def prefix(self, prefix):
+		"""
+		:return: hosts whose technical name starts with prefix, ordered by name
+		:rtype: list
+		"""
+		with self._lock:
+			position = bisect.bisect_left(self._sorted_names, (prefix,))
+			hosts = []
+			while position < len(self._sorted_names) and self._sorted_names[position][0].startswith(prefix):
+				hosts.append(self.hosts[self._sorted_names[position][1]])
+				position += 1
+			return hosts
+
+	def __len__(self):
+		return len(self.hosts)
+
+	def __contains__(self, hostid):
+		return "%s" % hostid in self.hosts
+
+	def __iter__(self):
+		with self._lock:
+			return iter(list(self.hosts.values()))
+
+	def __str__(self):
+		return "HostIndex (%s hosts)" % len(self.hosts)
@@ -0,0 +1,282 @@
+"""
+Local SQLite mirror of the inventory: hosts, host groups, templates, interfaces and their links
+"""
+
+from __future__ import unicode_literals
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from . import ZabbixRequestError, object_types
+
+logger = logging.getLogger(__name__)
+
+schema = """
+CREATE TABLE IF NOT EXISTS hostgroups (groupid INTEGER PRIMARY KEY, name TEXT, hash TEXT, data TEXT);
+CREATE TABLE IF NOT EXISTS templates (templateid INTEGER PRIMARY KEY, host TEXT, hash TEXT, data TEXT);
+CREATE TABLE IF NOT EXISTS hosts (hostid INTEGER PRIMARY KEY, host TEXT, name TEXT, status INTEGER, hash TEXT, data TEXT);
+CREATE TABLE IF NOT EXISTS interfaces (interfaceid INTEGER PRIMARY KEY, hostid INTEGER, ip TEXT, dns TEXT, port TEXT,
+	type INTEGER, main INTEGER, useip INTEGER);
+CREATE TABLE IF NOT EXISTS hosts_groups (hostid INTEGER, groupid INTEGER, PRIMARY KEY (hostid, groupid));
+CREATE TABLE IF NOT EXISTS hosts_templates (hostid INTEGER, templateid INTEGER, PRIMARY KEY (hostid, templateid));
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX IF NOT EXISTS hostgroups_name ON hostgroups (name);
+CREATE INDEX IF NOT EXISTS templates_host ON templates (host);
+CREATE INDEX IF NOT EXISTS hosts_host ON hosts (host);
+CREATE INDEX IF NOT EXISTS interfaces_hostid ON interfaces (hostid);
+CREATE INDEX IF NOT EXISTS interfaces_ip ON interfaces (ip);
+CREATE INDEX IF NOT EXISTS hosts_groups_groupid ON hosts_groups (groupid);
+CREATE INDEX IF NOT EXISTS hosts_templates_templateid ON hosts_templates (templateid);
+"""
+
+# Object type -> table, and get parameters of the refresh
+mirrored_objects = [
+	('hostgroup', "hostgroups", {'output': "extend"}),
+	('template', "templates", {'output': "extend"}),
+	('host', "hosts", {'output': "extend", 'selectInterfaces': "extend", 'selectGroups': ["groupid"],
+		'selectParentTemplates': ["templateid"]}),
+]
+mirrored_tables = dict((object_type, table) for (object_type, table, _) in mirrored_objects)
+
+
+def _content_hash(record):
+	return hashlib.sha1(json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class InventoryMirror(object):
+	"""
+	SQLite copy of the inventory of a Zabbix Server, serving reads with bounded staleness
+
+	The API exposes no modification time or change feed for these objects, so a refresh streams
+	every record and compares its content hash with the stored one: only new, changed and deleted
+	objects are written, with their interfaces and links, in a single transaction.
+	The records are fetched without locking the database, which is locked only for the write:
+	reads keep being served from the current rows while a refresh is running.
+
+	A read of data older than ``max_staleness`` seconds (or made stale by a write through :meth:`do`)
+	starts a refresh in a background thread and is answered from the current rows, so the age of the
+	data is bounded by ``max_staleness`` plus the duration of a refresh. Only the first read of an empty
+	mirror waits for the refresh.
+
+	>>> mirror = server.mirror("/var/cache/zabbix-inventory.db", max_staleness=300)
+	>>> host = mirror.do("get", "host", name="web01")
+	>>> [h['host'] for h in mirror.hosts(groupid=linux.groupid)]
+
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	:param path: SQLite database file (":memory:" for a private in-memory mirror)
+	:type path: String
+	:param max_staleness: maximum age in seconds of the data before a refresh is started
+	:type max_staleness: float
+	"""
+
+	def __init__(self, server, path, max_staleness=300):
+		self.server = server
+		self.path = path
+		self.max_staleness = max_staleness
+		self.refreshes = 0
+		self.changes = 0
+		# Guards the database; held by readers and by the write of a refresh
+		self._lock = threading.RLock()
+		# Held for the whole refresh: one refresh at a time
+		self._refresh_lock = threading.Lock()
+		# Set by the writes sent through do(), cleared when a refresh starts
+		self._stale = False
+		self._db = sqlite3.connect(path, check_same_thread=False)
+		self._db.executescript(schema)
+		row = self._db.execute("SELECT value FROM meta WHERE key='last_refresh'").fetchone()
+		self.last_refresh = float(row[0]) if row else 0.0
+
+	def refresh(self):
+		"""
+		Pull the inventory and write the differences. Waits for the refresh in progress, if any
+
+		:return: objects written (new or changed) and deleted, by object type
+		:rtype: dict
+		"""
+		with self._refresh_lock:
+			return self.__refresh__()
+
+	def __refresh__(self):
+		started = time.time()
+		self._stale = False
+		with self._lock:
+			hashes = [dict(self._db.execute("SELECT %s, hash FROM %s" % (object_types[object_type].id_field, table)))
+				for object_type, table, _ in mirrored_objects]
+		# Fetched and compared without the database lock
+		changes = [self.__diff_type__(object_type, params, type_hashes)
+			for (object_type, _, params), type_hashes in zip(mirrored_objects, hashes)]
+		summary = {}
+		with self._lock:
+			with self._db:
+				for (object_type, table, _), (written, deleted) in zip(mirrored_objects, changes):
+					self.__write_type__(object_type, table, written, deleted)
+					summary[object_type] = {'written': len(written), 'deleted': len(deleted)}
+					self.changes += len(written) + len(deleted)
+				self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_refresh', ?)", ("%s" % started,))
+			self.last_refresh = started
+			self.refreshes += 1
+		return summary
+
+	def __diff_type__(self, object_type, params, hashes):
+		"""
+		:return: (id, hash, record) of the new and changed objects, and ids of the deleted ones
+		:rtype: tuple
+		"""
+		id_field = object_types[object_type].id_field
+		written = []
+		for record in self.server.stream(object_types[object_type].methods['get'], **params):
+			id = int(record[id_field])
+			content_hash = _content_hash(record)
+			if hashes.pop(id, None) != content_hash:
+				written.append((id, content_hash, record))
+		# Left in hashes: objects deleted on the server
+		return written, list(hashes)
+
+	def __write_type__(self, object_type, table, written, deleted):
+		db = self._db
+		id_field = object_types[object_type].id_field
+		for id, content_hash, record in written:
+			data = json.dumps(record, separators=(",", ":"))
+			if object_type == "host":
+				db.execute("INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?, ?, ?)", (id, record.get('host'),
+					record.get('name'), int(record.get('status', 0)), content_hash, data))
+				self.__write_links__(id, record)
+			else:
+				db.execute("INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?)" % table, (id,
+					record.get(object_types[object_type].name_field), content_hash, data))
+		for id in deleted:
+			db.execute("DELETE FROM %s WHERE %s = ?" % (table, id_field), (id,))
+			if object_type == "host":
+				self.__delete_links__(id)
+
+	def __delete_links__(self, hostid):
+		for table in ("interfaces", "hosts_groups", "hosts_templates"):
+			self._db.execute("DELETE FROM %s WHERE hostid = ?" % table, (hostid,))
+
+	def __write_links__(self, hostid, record):
+		db = self._db
+		self.__delete_links__(hostid)
+		db.executemany("INSERT OR REPLACE INTO interfaces VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(int(i['interfaceid']),
+			hostid, i.get('ip'), i.get('dns'), i.get('port'), int(i.get('type', 1)), int(i.get('main', 0)),
+			int(i.get('useip', 1))) for i in record.get('interfaces', [])])
+		db.executemany("INSERT OR IGNORE INTO hosts_groups VALUES (?, ?)",
+			[(hostid, int(g['groupid'])) for g in record.get('groups', [])])
+		db.executemany("INSERT OR IGNORE INTO hosts_templates VALUES (?, ?)",
+			[(hostid, int(t['templateid'])) for t in record.get('parentTemplates', [])])
+
+	def __fresh__(self):
+		if self.last_refresh == 0.0:
+			# Nothing to serve yet
+			with self._refresh_lock:
+				if self.last_refresh == 0.0:
+					self.__refresh__()
+		elif self._stale or time.time() - self.last_refresh > self.max_staleness:
+			self.__refresh_in_background__()
+
+	def __refresh_in_background__(self):
+		# Released by the background thread
+		if not self._refresh_lock.acquire(False):
+			# A refresh is already running
+			return
+		thread = threading.Thread(target=self.__background_refresh__)
+		thread.daemon = True
+		thread.start()
+
+	def __background_refresh__(self):
+		try:
+			self.__refresh__()
+		except Exception:
+			# Retried by the next read
+			logger.warning("Background refresh of %s failed", self, exc_info=True)
+		finally:
+			self._refresh_lock.release()
+
+	def __query__(self, sql, args=()):
+		self.__fresh__()
+		with self._lock:
+			return [json.loads(row[0]) for row in self._db.execute(sql, args)]
+
+	def get(self, object_type, name_or_id):
+		"""
+		Record of an object, as returned by ``<object_type>.get``
+
+		:param object_type: "host", "hostgroup" or "template"
+		:type object_type: String
+		:param name_or_id: name or id of the object
+		:type name_or_id: String
+		:return: record or None
+		:rtype: dict
+		"""
+		if not object_type in mirrored_tables:
+			raise ZabbixRequestError("Programmatic error","-1","Object type %s not mirrored" % object_type)
+		if type(name_or_id) == int or name_or_id.isdigit():
+			field, value = object_types[object_type].id_field, int(name_or_id)
+		else:
+			field, value = object_types[object_type].name_field, name_or_id
+		records = self.__query__("SELECT data FROM %s WHERE %s = ?" % (mirrored_tables[object_type], field), (value,))
+		return records[0] if records else None
+
+	def do(self, operation, object_type, **kwargs):
+		"""
+		Same interface as :meth:`ZabbixServer.do`: gets are served by the mirror, other operations are sent
+		to the server and start a refresh on the next read
+
+		:return: Instantiated class of the object or None if the object does not exist
+		"""
+		if operation != "get" or not object_type in mirrored_tables:
+			result = self.server.do(operation, object_type, **kwargs)
+			self._stale = True
+			return result
+		name_or_id = kwargs.get('id', kwargs.get('name'))
+		record = self.get(object_type, "%s" % name_or_id)
+		if record is None:
+			return None
+		return object_types[object_type].object_class([record], name_or_id, server=self.server)
+
+	def hosts(self, groupid=None, templateid=None, ip=None):
+		"""
+		Records of the hosts in a group, linked to a template and/or with an interface on an IP
+
+		:rtype: list of dict
+		"""
+		sql = "SELECT data FROM hosts WHERE 1"
+		args = []
+		if groupid is not None:
+			sql += " AND hostid IN (SELECT hostid FROM hosts_groups WHERE groupid = ?)"
+			args.append(int(groupid))
+		if templateid is not None:
+			sql += " AND hostid IN (SELECT hostid FROM hosts_templates WHERE templateid = ?)"
+			args.append(int(templateid))
+		if ip is not None:
+			sql += " AND hostid IN (SELECT hostid FROM interfaces WHERE ip = ?)"
+			args.append(ip)
+		return self.__query__(sql + " ORDER BY hostid", args)
+
+	def stats(self):
+		"""
+		:return: refreshes, rows changed, age of the data in seconds, refresh in progress and number of mirrored objects
+		:rtype: dict
+		"""
+		with self._lock:
+			sizes = dict((object_type, self._db.execute("SELECT COUNT(*) FROM %s" % table).fetchone()[0])
+				for object_type, table in mirrored_tables.items())
+		return {'refreshes': self.refreshes, 'changes': self.changes, 'age': time.time() - self.last_refresh,
+			'refreshing': self._refresh_lock.locked(), 'objects': sizes}
+
+	def close(self):
+		# Waits for a background refresh
+		with self._refresh_lock:
+			with self._lock:
+				self._db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __str__(self):
+		return "InventoryMirror %s of %s" % (self.path, self.server)
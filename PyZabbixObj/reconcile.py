@@ -0,0 +1,225 @@
+"""
+Declarative reconciliation of hosts, host groups, template links and interfaces
+"""
+
+from __future__ import unicode_literals
+from . import ZabbixRequestError, Host, _chunks
+
+interface_fields = ("type", "main", "useip", "ip", "dns", "port")
+
+
+def _interface_key(interface):
+	"""
+	Comparable form of an interface, with the defaults of :attr:`Host.standard_interface`
+	"""
+	defaults = dict(Host.standard_interface, ip="", dns="")
+	return tuple("%s" % interface.get(f, defaults[f]) for f in interface_fields)
+
+
+def _desired_hosts(desired_state):
+	hosts = desired_state.get('hosts', {})
+	if type(hosts) == dict:
+		return dict((name, dict(spec or {})) for (name, spec) in hosts.items())
+	return dict((spec['host'], dict(spec)) for spec in hosts)
+
+
+def _fetch(server, method, field, values, **params):
+	"""
+	Records whose field is in values, one streamed get per chunk
+	"""
+	records = {}
+	for chunk in _chunks(sorted(values), server.chunk_size):
+		for record in server.stream(method, filter={field: chunk}, **params):
+			records[record[field]] = record
+	return records
+
+
+class PlanStep(object):
+	"""
+	A call (or a group of identical calls) of a reconciliation plan
+
+	:ivar method: API method
+	:ivar description: what the step changes
+	:ivar result: value returned by the step, once executed
+	"""
+
+	def __init__(self, method, description, action):
+		self.method = method
+		self.description = description
+		self.action = action
+		self.result = None
+
+	def __str__(self):
+		return "%s: %s" % (self.method, self.description)
+
+	__repr__ = __str__
+
+
+class ReconcilePlan(list):
+	"""
+	Ordered list of :class:`PlanStep`. Printing the plan shows the calls that :meth:`execute` would run
+	"""
+
+	def __init__(self, server):
+		super(ReconcilePlan, self).__init__()
+		self.server = server
+		self.executed = False
+		# Group name -> groupid, completed by the group creation step
+		self.groupids = {}
+		self.templateids = {}
+
+	def step(self, method, description, action):
+		self.append(PlanStep(method, description, action))
+
+	def execute(self):
+		"""
+		Run the steps in order
+
+		:return: the plan
+		:rtype: :class:`ReconcilePlan`
+		"""
+		for step in self:
+			step.result = step.action()
+		self.executed = True
+		return self
+
+	def __str__(self):
+		if not self:
+			return "Nothing to change"
+		return "\n".join("%s. %s" % (i + 1, step) for i, step in enumerate(self))
+
+
+def plan(server, desired_state, delete_extra=False):
+	"""
+	Compare the desired state with the server and build the plan of the calls that apply it
+
+	``desired_state`` describes hosts by technical name, with the full list of their groups and
+	linked templates (by name) and optionally their interfaces and other ``host.update`` attributes.
+	Groups, templates and interfaces not given for a host are not changed. Interfaces are completed with
+	:attr:`Host.standard_interface`, which is also the interface of created hosts that give none.
+
+	>>> desired = {
+	...     'groups': ["Web servers"],
+	...     'hosts': {
+	...         "web01": {'groups': ["Web servers"], 'templates': ["Template OS Linux"], 'name': "Web 01"},
+	...         "web02": {'groups': ["Web servers"], 'interfaces': [{'ip': "10.0.0.2"}]},
+	...     }
+	... }
+
+	:param server: Zabbix server
+	:type server: ZabbixServer
+	:param desired_state: ``hosts`` (dict by host, or list of dicts with ``host``) and optional ``groups`` to create
+	:type desired_state: dict
+	:param delete_extra: delete the hosts of the desired groups that are not in the desired state
+	:type delete_extra: bool
+	:rtype: :class:`ReconcilePlan`
+	:raise: :class: `ZabbixRequestError` exception if a template does not exist
+	"""
+	result = ReconcilePlan(server)
+	hosts = _desired_hosts(desired_state)
+	group_names = set(desired_state.get('groups', []))
+	template_names = set()
+	attributes = set()
+	for spec in hosts.values():
+		group_names.update(spec.get('groups', []))
+		template_names.update(spec.get('templates', []))
+		attributes.update(k for k in spec if not k in ("host", "groups", "templates", "interfaces"))
+
+	groups = _fetch(server, "hostgroup.get", "name", group_names, output=["groupid", "name"])
+	result.groupids.update((name, g['groupid']) for (name, g) in groups.items())
+	templates = _fetch(server, "template.get", "host", template_names, output=["templateid", "host"])
+	missing = template_names - set(templates)
+	if missing:
+		raise ZabbixRequestError("Programmatic error","-1","Templates not found: %s" % ", ".join(sorted(missing)))
+	result.templateids.update((name, t['templateid']) for (name, t) in templates.items())
+	current = _fetch(server, "host.get", "host", hosts, output=["hostid", "host"] + sorted(attributes),
+		selectGroups=["groupid"], selectParentTemplates=["templateid"], selectInterfaces=list(interface_fields))
+
+	new_groups = sorted(group_names - set(groups))
+	if new_groups:
+		def create_groups():
+			ids = server.create_many("hostgroup", [{'name': n} for n in new_groups])
+			result.groupids.update(zip(new_groups, ids))
+			return ids
+		result.step("hostgroup.create", "%s groups (%s)" % (len(new_groups), ", ".join(new_groups)), create_groups)
+
+	creations = [name for name in sorted(hosts) if not name in current]
+	if creations:
+		def create_hosts():
+			objects = []
+			for name in creations:
+				spec = dict(hosts[name], host=name)
+				spec['groups'] = [result.groupids[g] for g in spec.get('groups', [])]
+				spec['templates'] = [result.templateids[t] for t in spec.get('templates', [])]
+				spec['interfaces'] = [dict(Host.standard_interface, **i) for i in spec.get('interfaces') or []] or \
+					[Host.standard_interface]
+				objects.append(spec)
+			return server.create_many("host", objects)
+		result.step("host.create", "%s hosts (%s)" % (len(creations), ", ".join(creations[:10]) +
+			(", ..." if len(creations) > 10 else "")), create_hosts)
+
+	additions = {}
+	removals = {}
+	updates = []
+	for name in sorted(current):
+		spec = hosts[name]
+		record = current[name]
+		hostid = record['hostid']
+		groups_add = groups_remove = templates_add = templates_remove = frozenset()
+		if 'groups' in spec:
+			has = set(g['groupid'] for g in record.get('groups', []))
+			groups_add = frozenset(g for g in spec['groups'] if not result.groupids.get(g) in has)
+			groups_remove = frozenset(has - set(result.groupids.get(g) for g in spec['groups']))
+		if 'templates' in spec:
+			has = set(t['templateid'] for t in record.get('parentTemplates', []))
+			wanted = set(result.templateids[t] for t in spec['templates'])
+			templates_add = frozenset(wanted - has)
+			templates_remove = frozenset(has - wanted)
+		# Hosts needing the same links share a single mass call
+		if groups_add or templates_add:
+			additions.setdefault((groups_add, templates_add), []).append(hostid)
+		if groups_remove or templates_remove:
+			removals.setdefault((groups_remove, templates_remove), []).append(hostid)
+		params = dict((k, v) for (k, v) in spec.items() if k in attributes and "%s" % record.get(k) != "%s" % v)
+		if 'interfaces' in spec and sorted(_interface_key(i) for i in spec['interfaces']) != \
+			sorted(_interface_key(i) for i in record.get('interfaces', [])):
+			params['interfaces'] = [dict(Host.standard_interface, **i) for i in spec['interfaces']]
+		if params:
+			params['hostid'] = hostid
+			updates.append((name, params))
+
+	# Links are added before being removed: a host is never left without groups
+	for (group_names_add, templateids_add), hostids in sorted(additions.items(), key=lambda a: sorted(a[1])):
+		def mass_add(hostids=hostids, group_names_add=group_names_add, templateids_add=templateids_add):
+			return server.mass_add(hostids, groups=[result.groupids[g] for g in group_names_add] or None,
+				templates=list(templateids_add) or None)
+		result.step("host.massadd", "%s hosts, groups %s, templates %s" % (len(hostids), sorted(group_names_add),
+			sorted(templateids_add)), mass_add)
+	for (groupids_remove, templateids_remove), hostids in sorted(removals.items(), key=lambda a: sorted(a[1])):
+		def mass_remove(hostids=hostids, groupids_remove=groupids_remove, templateids_remove=templateids_remove):
+			return server.mass_remove(hostids, groups=list(groupids_remove) or None,
+				templates=list(templateids_remove) or None)
+		result.step("host.massremove", "%s hosts, groupids %s, templateids %s" % (len(hostids),
+			sorted(groupids_remove), sorted(templateids_remove)), mass_remove)
+
+	if updates:
+		def update_hosts():
+			updated = []
+			for chunk in _chunks(updates, server.chunk_size):
+				with server.batch() as batch:
+					calls = [batch.call("host.update", **params) for (_, params) in chunk]
+				updated.extend(c.result()['hostids'][0] for c in calls)
+			return updated
+		result.step("host.update", "%s hosts in %s batches (%s)" % (len(updates),
+			(len(updates) + server.chunk_size - 1) // server.chunk_size,
+			", ".join("%s: %s" % (n, sorted(k for k in p if k != "hostid")) for (n, p) in updates[:5]) + (", ..." if len(updates) > 5 else "")),
+			update_hosts)
+
+	if delete_extra and groups:
+		scope = sorted(g['groupid'] for g in groups.values())
+		extra = sorted((r['host'], r['hostid']) for r in server.stream("host.get", groupids=scope,
+			output=["hostid", "host"]) if not r['host'] in hosts)
+		if extra:
+			result.step("host.delete", "%s hosts (%s)" % (len(extra), ", ".join(n for (n, _) in extra[:10]) +
+				(", ..." if len(extra) > 10 else "")), lambda: server.delete_many("host", [i for (_, i) in extra]))
+	return result
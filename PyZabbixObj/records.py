@@ -0,0 +1,166 @@
+"""
+Compact, typed representation of API records
+
+A record class has a ``__slots__`` entry per field of its schema and converts the values returned by the
+API (always strings): ids and flags become ints, repeated strings are interned, and nested groups and
+templates become tuples of ids, shared between the records built by one call. Used by
+:meth:`PyZabbixObj.ZabbixServer.get_many` and :meth:`PyZabbixObj.ZabbixServer.iter` with ``compact=True``.
+"""
+
+from __future__ import unicode_literals
+
+try:
+	from sys import intern as _intern
+except ImportError:
+	# Python 2 builtin
+	_intern = intern
+
+
+def interned(value, shared=None):
+	"""
+	Return the interned copy of a repeated string. Interned strings are freed with their last record.
+	Python 2 cannot intern unicode, the type of the API strings: there the string is shared
+	through the table of the call building the records instead
+	"""
+	try:
+		return _intern(value)
+	except TypeError:
+		return shared.setdefault(value, value) if shared is not None else value
+interned.shared = True
+
+
+def integer(value):
+	return int(value) if value != "" else None
+
+
+def text(value):
+	return value
+
+
+def ids(field):
+	"""
+	Converter of a nested list of objects (e.g. ``groups``) to a tuple of their ids,
+	shared through the table of the call building the records
+	"""
+	def convert(values, shared):
+		value = tuple(int(v[field]) if type(v) == dict else int(v) for v in values)
+		return shared.setdefault(value, value) if shared is not None else value
+	convert.select = [field]
+	convert.shared = True
+	return convert
+
+
+def records(record_class):
+	"""
+	Converter of a nested list of objects (e.g. ``interfaces``) to a tuple of records
+	"""
+	def convert(values, shared):
+		return tuple(record_class(v, shared) for v in values)
+	convert.select = list(record_class.fields)
+	convert.shared = True
+	return convert
+
+
+class CompactRecord(object):
+	"""
+	Base class of the record classes built by :func:`record_class`. Fields missing from the API record are None
+
+	:param record: record returned by the API
+	:type record: dict
+	:param shared: (optional) table of the values shared between the records of one call, e.g. the id tuples
+	:type shared: dict
+	"""
+	__slots__ = ()
+	fields = ()
+	converters = ()
+	# Converters taking the shared table
+	sharing = ()
+	label = None
+
+	def __init__(self, record, shared=None):
+		for name, convert, sharing in zip(self.fields, self.converters, self.sharing):
+			value = record.get(name)
+			if value is None:
+				setattr(self, name, None)
+			elif sharing:
+				setattr(self, name, convert(value, shared))
+			else:
+				setattr(self, name, convert(value))
+
+	def to_dict(self):
+		"""
+		:return: the typed fields as a dict
+		:rtype: dict
+		"""
+		return dict((name, getattr(self, name)) for name in self.fields)
+
+	def __eq__(self, other):
+		return type(self) == type(other) and all(getattr(self, f) == getattr(other, f) for f in self.fields)
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		# Equal records hash alike
+		return hash(tuple(getattr(self, f) for f in self.fields))
+
+	def __str__(self):
+		return "%s %s" % (self.__class__.__name__, getattr(self, self.label))
+
+	__repr__ = __str__
+
+
+def record_class(name, schema, label=None):
+	"""
+	Build a :class:`CompactRecord` subclass
+
+	:param name: name of the class
+	:type name: String
+	:param schema: (field, converter) pairs, e.g. ``[("hostid", integer), ("groups", ids("groupid"))]``
+	:type schema: list
+	:param label: (optional) field shown by str(). Default (and fallback when it is not in the schema) is the first field
+	:type label: String
+	:rtype: class
+	"""
+	fields = tuple(field for (field, _) in schema)
+	return type(str(name), (CompactRecord,), {
+		'__slots__': fields,
+		'fields': fields,
+		'converters': tuple(convert for (_, convert) in schema),
+		'sharing': tuple(getattr(convert, "shared", False) for (_, convert) in schema),
+		'label': label if label in fields else fields[0]
+	})
+
+
+interface_record = record_class("InterfaceRecord", [
+	("interfaceid", integer), ("ip", text), ("dns", interned), ("port", interned), ("type", integer),
+	("main", integer), ("useip", integer)
+], label="ip")
+
+host_schema = [
+	("hostid", integer), ("host", text), ("name", text), ("status", integer), ("available", integer),
+	("maintenance_status", integer), ("proxy_hostid", integer), ("flags", integer), ("description", interned),
+	("groups", ids("groupid")), ("parentTemplates", ids("templateid")), ("interfaces", records(interface_record))
+]
+hostgroup_schema = [("groupid", integer), ("name", text), ("internal", integer), ("flags", integer)]
+template_schema = [
+	("templateid", integer), ("host", text), ("name", text), ("description", interned), ("groups", ids("groupid"))
+]
+trigger_schema = [
+	("triggerid", integer), ("description", interned), ("expression", text), ("priority", integer),
+	("status", integer), ("value", integer), ("state", integer), ("lastchange", integer), ("flags", integer)
+]
+item_schema = [
+	("itemid", integer), ("hostid", integer), ("name", interned), ("key_", interned), ("type", integer),
+	("value_type", integer), ("status", integer), ("state", integer), ("delay", interned), ("units", interned),
+	("lastvalue", text), ("lastclock", integer)
+]
+graph_schema = [
+	("graphid", integer), ("name", interned), ("width", integer), ("height", integer), ("graphtype", integer),
+	("flags", integer)
+]
+proxy_schema = [("proxyid", integer), ("host", text), ("status", integer), ("lastaccess", integer)]
+maintenance_schema = [
+	("maintenanceid", integer), ("name", text), ("maintenance_type", integer), ("active_since", integer),
+	("active_till", integer), ("description", interned)
+]
@@ -0,0 +1,62 @@
+"""
+Registry of the API object types handled by :class:`PyZabbixObj.ZabbixServer`
+"""
+
+from __future__ import unicode_literals
+from .records import record_class, integer, text
+
+
+class ObjectType(object):
+	"""
+	Description of an API object type, computed once at registration
+
+	:ivar name: API name, e.g. "hostgroup"
+	:ivar object_class: class modelling the objects, e.g. :class:`PyZabbixObj.Hostgroup`
+	:ivar id_field: id field, e.g. "groupid"
+	:ivar name_field: field searched by name, e.g. "name"
+	:ivar ids_param: get parameter filtering by id, e.g. "groupids"
+	:ivar methods: API method of each operation, e.g. ``{'get': "hostgroup.get"}``
+	:ivar get_options: get options used when :meth:`ZabbixServer.do` is called without ``output`` or ``select*``
+	:ivar create_from_name: objects can be created from their name alone
+	:ivar selects: attribute -> (get option, result field) of the lazy loaded attributes that do not follow
+		:data:`PyZabbixObj.lazy_selects`, e.g. ``{'templates': ("selectParentTemplates", "parentTemplates")}``
+	:ivar record_class: :class:`PyZabbixObj.records.CompactRecord` subclass built from the schema
+	"""
+
+	operations = ("get", "create", "delete", "update")
+
+	def __init__(self, name, object_class, id_field, name_field=None, ids_param=None, get_options=None,
+		create_from_name=True, schema=None, selects=None):
+		self.name = name
+		self.object_class = object_class
+		self.id_field = id_field
+		self.name_field = name_field or id_field
+		self.ids_param = ids_param or id_field + "s"
+		self.methods = dict((operation, "%s.%s" % (name, operation)) for operation in self.operations)
+		self.get_options = get_options or {'output': "extend"}
+		self.create_from_name = create_from_name
+		self.selects = selects or {}
+		if schema is None:
+			schema = [(self.id_field, integer)] + ([(self.name_field, text)] if self.name_field != self.id_field else [])
+		self.record_class = record_class("%sRecord" % object_class.__name__, schema, label=self.name_field)
+		# Operation classes returned by ZabbixServer.class_constructor, built once
+		self.operation_classes = {}
+
+	def __str__(self):
+		return "ObjectType %s" % self.name
+
+	__repr__ = __str__
+
+
+# Object type name -> ObjectType, filled by PyZabbixObj.register_object_type
+object_types = {}
+
+
+def lookup(object_type):
+	"""
+	:param object_type: name of a registered type, or an :class:`ObjectType`
+	:return: the registered :class:`ObjectType`, or None
+	"""
+	if isinstance(object_type, ObjectType):
+		return object_type
+	return object_types.get(object_type)
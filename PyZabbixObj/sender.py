@@ -0,0 +1,407 @@
+"""
+Zabbix sender: push item values to a Zabbix Server or Proxy with the trapper protocol (port 10051)
+"""
+
+from __future__ import unicode_literals
+import errno
+import json
+import re
+import socket
+import struct
+import threading
+import time
+import zlib
+from multiprocessing.pool import ThreadPool
+from . import ZabbixRequestError
+
+# Header of every packet: "ZBXD", flags, data length and reserved (uncompressed length)
+protocol_header = b"ZBXD"
+flag_zabbix = 0x01
+flag_compressed = 0x02
+flag_large = 0x04
+_info_pattern = re.compile(r"processed: (\d+); failed: (\d+); total: (\d+); seconds spent: ([\d.]+)")
+
+
+def _packet(payload):
+	"""
+	Frame an encoded request
+	"""
+	return protocol_header + struct.pack("<BII", flag_zabbix, len(payload), 0) + payload
+
+
+def _parse_address(address, port):
+	"""
+	Accept "host", "host:port" or (host, port)
+	"""
+	if isinstance(address, (tuple, list)):
+		return address[0], int(address[1])
+	if address.count(":") == 1:
+		host, address_port = address.split(":")
+		return host, int(address_port)
+	return address, port
+
+
+class SenderResult(object):
+	"""
+	Outcome of a batch of values, as reported by the server
+
+	:ivar address: (host, port) the batch was sent to
+	:ivar count: values in the batch
+	:ivar processed: values accepted
+	:ivar failed: values refused (e.g. unknown host or item, item not of type trapper)
+	:ivar total: values seen by the server
+	:ivar seconds: processing time on the server
+	:ivar response: raw response
+	"""
+
+	def __init__(self, address, count, response):
+		self.address = address
+		self.count = count
+		self.response = response
+		match = _info_pattern.search(response.get('info', ""))
+		if match:
+			self.processed, self.failed, self.total = [int(v) for v in match.groups()[:3]]
+			self.seconds = float(match.group(4))
+		else:
+			self.processed = self.failed = self.total = None
+			self.seconds = None
+
+	def __str__(self):
+		return "SenderResult %s:%s processed %s failed %s total %s" % (self.address[0], self.address[1],
+			self.processed, self.failed, self.total)
+
+	__repr__ = __str__
+
+
+class _Connection(object):
+	"""
+	Socket to a single server or proxy, reused between batches when ``keepalive`` is set
+	"""
+
+	def __init__(self, address, timeout, keepalive):
+		self.address = address
+		self.timeout = timeout
+		self.keepalive = keepalive
+		self.sock = None
+		self.lock = threading.Lock()
+
+	def connect(self):
+		self.sock = socket.create_connection(self.address, self.timeout)
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+	def close(self):
+		if self.sock is not None:
+			try:
+				self.sock.close()
+			finally:
+				self.sock = None
+
+	def read(self, size):
+		data = b""
+		while len(data) < size:
+			chunk = self.sock.recv(size - len(data))
+			if not chunk:
+				raise socket.error("Connection closed by %s:%s" % self.address)
+			data += chunk
+		return data
+
+	def alive(self):
+		"""
+		Check, without blocking, that the server has not closed the idle connection
+
+		:return: False when the server closed or reset it (or sent data nobody asked for)
+		:rtype: bool
+		"""
+		self.sock.setblocking(False)
+		try:
+			# Nothing to read is the only healthy state: an empty read is a close
+			self.sock.recv(1, socket.MSG_PEEK)
+			return False
+		except socket.error as e:
+			return e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK)
+		finally:
+			self.sock.settimeout(self.timeout)
+
+	def exchange(self, packet):
+		"""
+		Send a packet and return the decoded response
+
+		Trapper values are not idempotent: a packet is never sent twice. A kept-alive connection closed
+		by the server is replaced before sending, an error once the packet has been sent is raised
+		"""
+		with self.lock:
+			if self.sock is not None and not self.alive():
+				self.close()
+			if self.sock is None:
+				self.connect()
+			try:
+				self.sock.sendall(packet)
+				header = self.read(5)
+				if header[:4] != protocol_header:
+					raise ZabbixRequestError("Sender error", "-1", "Invalid response header from %s:%s" % self.address)
+				flags = bytearray(header)[4]
+				if flags & flag_large:
+					length, uncompressed = struct.unpack("<QQ", self.read(16))
+				else:
+					length, uncompressed = struct.unpack("<II", self.read(8))
+				body = self.read(length)
+				if flags & flag_compressed:
+					body = zlib.decompress(body)
+			except Exception:
+				self.close()
+				raise
+			if not self.keepalive:
+				self.close()
+		return json.loads(body.decode("utf-8"))
+
+
+class ZabbixSender(object):
+	"""
+	Zabbix sender with batching
+
+	Values are queued by :meth:`send` and sent in batches when ``batch_size`` values or ``max_bytes``
+	are reached, or when the oldest queued value is older than ``flush_interval`` seconds (checked by
+	a background thread, so an idle sender flushes too).
+	With several servers (e.g. proxies) each monitored host is routed to one of them by a stable hash
+	of its name. Batches are sent by a pool with a thread per server, so the servers are pushed in parallel
+	and :meth:`send` does not wait for the network: it returns the results of the batches completed since
+	the previous call, :meth:`flush` waits for every batch. The trapper protocol answers each packet before
+	the next one is read, so packets are not pipelined on a connection: parallelism comes from the servers
+	pushed concurrently.
+
+	>>> with ZabbixSender(["proxy1", "proxy2:10052"]) as sender:
+	...     for host, value in values:
+	...         sender.send(host, "app.requests", value)
+
+	:param servers: (optional) addresses of the servers or proxies: "host", "host:port" or (host, port)
+	:type servers: list
+	:param port: (optional) default trapper port
+	:type port: int
+	:param timeout: (optional) socket timeout in seconds
+	:type timeout: float
+	:param batch_size: (optional) values sent in each packet
+	:type batch_size: int
+	:param max_bytes: (optional) approximate maximum size of a packet
+	:type max_bytes: int
+	:param flush_interval: (optional) maximum age in seconds of a queued value. None disables the
+		background flush: values then wait for a full batch or :meth:`flush`
+	:type flush_interval: float
+	:param keepalive: (optional) keep the connections open between batches (for proxies that allow it)
+	:type keepalive: bool
+	"""
+
+	def __init__(self, servers=("127.0.0.1",), port=10051, timeout=30, batch_size=1000, max_bytes=1024*1024,
+		flush_interval=1.0, keepalive=False):
+		if isinstance(servers, (type(""), type(b""))):
+			servers = [servers]
+		self.connections = [_Connection(_parse_address(s, port), timeout, keepalive) for s in servers]
+		self.batch_size = batch_size
+		self.max_bytes = max_bytes
+		self.flush_interval = flush_interval
+		self.batches = 0
+		self.processed = 0
+		self.failed = 0
+		self.bytes_sent = 0
+		self._queues = [[] for _ in self.connections]
+		self._sizes = [0 for _ in self.connections]
+		self._oldest = None
+		self._lock = threading.Lock()
+		self._pool = None
+		# Batches handed to the pool, in order. Beyond the limit send() waits for the oldest ones
+		self._pending = []
+		self._max_pending = 2 * len(self.connections)
+		self._timer = None
+		self._closed = threading.Event()
+
+	def __route__(self, host):
+		if len(self.connections) == 1:
+			return 0
+		return (zlib.crc32(host.encode("utf-8")) & 0xffffffff) % len(self.connections)
+
+	def send(self, host, key, value, clock=None, ns=None):
+		"""
+		Queue a value
+
+		:param host: technical name of the monitored host
+		:type host: String
+		:param key: key of a trapper item
+		:type key: String
+		:param value: value
+		:param clock: (optional) unix time of the value. Default is the time of the server
+		:type clock: int
+		:param ns: (optional) nanoseconds of the value
+		:type ns: int
+		:return: results of the batches completed since the previous call
+		:rtype: list of :class:`SenderResult`
+		:raise: :class: `ZabbixRequestError` exception if a completed batch failed
+		"""
+		record = {'host': host, 'key': key, 'value': "%s" % value}
+		if clock is not None:
+			record['clock'] = int(clock)
+			if ns is not None:
+				record['ns'] = int(ns)
+		index = self.__route__(host)
+		# Size of the encoded record, without the JSON overhead
+		size = len(host) + len(key) + len(record['value']) + 40
+		with self._lock:
+			queue = self._queues[index]
+			queue.append(record)
+			self._sizes[index] += size
+			if self._oldest is None:
+				self._oldest = time.time()
+			if len(queue) >= self.batch_size or self._sizes[index] >= self.max_bytes:
+				ready = [self.__take__(index)]
+			elif self.flush_interval is not None and time.time() - self._oldest >= self.flush_interval:
+				ready = self.__take_all__()
+			else:
+				ready = []
+			if self._timer is None and self.flush_interval is not None:
+				self._timer = threading.Thread(target=self.__flush_timer__)
+				self._timer.daemon = True
+				self._timer.start()
+		self.__submit__(ready)
+		return self.__collect__()
+
+	def send_many(self, values):
+		"""
+		Queue many values
+
+		:param values: (host, key, value) or (host, key, value, clock) tuples
+		:type values: iterable
+		:return: results of the batches completed meanwhile
+		:rtype: list of :class:`SenderResult`
+		"""
+		results = []
+		for value in values:
+			results.extend(self.send(*value))
+		return results
+
+	def flush(self):
+		"""
+		Send every queued value and wait for every batch
+
+		:return: results of the batches completed since the previous call
+		:rtype: list of :class:`SenderResult`
+		:raise: :class: `ZabbixRequestError` exception if a batch failed
+		"""
+		with self._lock:
+			ready = self.__take_all__()
+		self.__submit__(ready)
+		return self.__collect__(wait=True)
+
+	def __take__(self, index):
+		queue = self._queues[index]
+		self._queues[index] = []
+		self._sizes[index] = 0
+		if not any(self._queues):
+			self._oldest = None
+		return index, queue
+
+	def __take_all__(self):
+		return [self.__take__(i) for i in range(len(self._queues)) if self._queues[i]]
+
+	def __flush_timer__(self):
+		"""
+		Background thread sending the values older than ``flush_interval``
+		"""
+		while not self._closed.wait(self.flush_interval / 2.0):
+			with self._lock:
+				expired = self._oldest is not None and time.time() - self._oldest >= self.flush_interval
+				ready = self.__take_all__() if expired else []
+			self.__submit__(ready)
+
+	def __submit__(self, ready):
+		if not ready:
+			return
+		with self._lock:
+			if self._pool is None:
+				self._pool = ThreadPool(len(self.connections))
+			for batch in ready:
+				self._pending.append(self._pool.apply_async(self.__send_batch__, (batch,)))
+
+	def __collect__(self, wait=False):
+		"""
+		Outcomes of the batches completed, in the order they were handed to the pool. Every batch is
+		collected before an error is raised: the results of the others are not lost
+
+		:param wait: wait for every pending batch. Default only waits for the oldest ones beyond the limit
+		:raise: :class: `ZabbixRequestError` exception if a batch failed, with the results of the others
+			in ``results`` and every error in ``errors``
+		"""
+		outcomes = []
+		while True:
+			with self._lock:
+				if not self._pending:
+					break
+				oldest = self._pending[0]
+				if not (wait or oldest.ready() or len(self._pending) > self._max_pending):
+					break
+				self._pending.pop(0)
+			outcomes.append(oldest.get())
+		results = [value for (ok, value) in outcomes if ok]
+		errors = [value for (ok, value) in outcomes if not ok]
+		if errors:
+			error = ZabbixRequestError("Sender error", "-1", "%s of %s batches failed, first error: %s" % (
+				len(errors), len(outcomes), errors[0]))
+			error.results = results
+			error.errors = errors
+			raise error
+		return results
+
+	def __send_batch__(self, batch):
+		"""
+		:return: (True, :class:`SenderResult`) or (False, exception)
+		"""
+		index, records = batch
+		connection = self.connections[index]
+		payload = json.dumps({'request': "sender data", 'data': records, 'clock': int(time.time())},
+			separators=(",", ":")).encode("utf-8")
+		try:
+			response = connection.exchange(_packet(payload))
+			if response.get('response') != "success":
+				raise ZabbixRequestError("Sender error", "-1", "%s:%s refused the values: %s" % (connection.address[0],
+					connection.address[1], response.get('info', response)))
+		except Exception as e:
+			return False, e
+		result = SenderResult(connection.address, len(records), response)
+		with self._lock:
+			self.batches += 1
+			self.bytes_sent += len(payload)
+			self.processed += result.processed or 0
+			self.failed += result.failed or 0
+		return True, result
+
+	def stats(self):
+		"""
+		:return: batches sent, values processed and failed, bytes sent
+		:rtype: dict
+		"""
+		return {'batches': self.batches, 'processed': self.processed, 'failed': self.failed,
+			'bytes': self.bytes_sent}
+
+	def close(self):
+		"""
+		Send the queued values, wait for every batch and close the connections
+		"""
+		self._closed.set()
+		if self._timer is not None:
+			self._timer.join()
+			self._timer = None
+		try:
+			self.flush()
+		finally:
+			if self._pool is not None:
+				self._pool.close()
+				self._pool.join()
+				self._pool = None
+			for connection in self.connections:
+				connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __str__(self):
+		return "ZabbixSender %s" % ", ".join("%s:%s" % c.address for c in self.connections)
@@ -0,0 +1,177 @@
+"""
+Instrumentation of the API requests: counts, latency histograms, bytes and error codes per method
+"""
+
+from __future__ import unicode_literals
+import bisect
+import threading
+
+# Upper bounds (seconds) of the latency histogram buckets
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _MethodStats(object):
+
+	def __init__(self, buckets):
+		self.count = 0
+		self.seconds = 0.0
+		self.request_bytes = 0
+		self.response_bytes = 0
+		# Last slot counts the requests slower than the last bucket
+		self.histogram = [0] * (len(buckets) + 1)
+		self.errors = {}
+
+
+class RequestStats(object):
+	"""
+	Thread-safe counters of the requests sent by a server, updated by :meth:`record`.
+	Batches are counted under the ``batch`` method, with the errors of their calls under each call method
+
+	:param buckets: (optional) upper bounds in seconds of the latency histogram buckets
+	:type buckets: tuple
+	"""
+
+	def __init__(self, buckets=default_buckets):
+		self.buckets = tuple(sorted(buckets))
+		self.batches = 0
+		self.batch_calls = 0
+		self._methods = {}
+		self._lock = threading.Lock()
+
+	def __method__(self, method):
+		stats = self._methods.get(method)
+		if stats is None:
+			stats = self._methods[method] = _MethodStats(self.buckets)
+		return stats
+
+	def record(self, method, seconds, request_bytes=0, response_bytes=0, error_code=None):
+		"""
+		Count a request
+
+		:param method: API method, e.g. ``host.get``
+		:type method: String
+		:param seconds: time spent waiting for the response
+		:type seconds: float
+		:param error_code: (optional) JSON-RPC error code, or exception name for transport errors
+		"""
+		bucket = bisect.bisect_left(self.buckets, seconds)
+		with self._lock:
+			stats = self.__method__(method)
+			stats.count += 1
+			stats.seconds += seconds
+			stats.request_bytes += request_bytes
+			stats.response_bytes += response_bytes
+			stats.histogram[bucket] += 1
+			if error_code is not None:
+				stats.errors["%s" % error_code] = stats.errors.get("%s" % error_code, 0) + 1
+
+	def record_batch(self, methods, error_codes=()):
+		"""
+		Count the calls of a batch
+
+		:param methods: API method of each call
+		:type methods: list
+		:param error_codes: (method, code) of the calls that failed
+		:type error_codes: list
+		"""
+		with self._lock:
+			self.batches += 1
+			self.batch_calls += len(methods)
+			for method, code in error_codes:
+				stats = self.__method__(method)
+				stats.errors["%s" % code] = stats.errors.get("%s" % code, 0) + 1
+
+	def snapshot(self):
+		"""
+		:return: per method count, total and mean seconds, bytes, cumulative latency histogram
+			(upper bound -> requests) and errors by code; batches and calls sent in batches
+		:rtype: dict
+		"""
+		with self._lock:
+			methods = {}
+			for method, stats in self._methods.items():
+				cumulative = 0
+				histogram = []
+				for bound, count in zip(self.buckets + (float("inf"),), stats.histogram):
+					cumulative += count
+					histogram.append((bound, cumulative))
+				methods[method] = {
+					'count': stats.count,
+					'seconds': stats.seconds,
+					'mean_seconds': stats.seconds / stats.count if stats.count else 0.0,
+					'request_bytes': stats.request_bytes,
+					'response_bytes': stats.response_bytes,
+					'histogram': histogram,
+					'errors': dict(stats.errors)
+				}
+			return {'methods': methods, 'batches': self.batches, 'batch_calls': self.batch_calls}
+
+	def reset(self):
+		"""
+		Clear every counter
+		"""
+		with self._lock:
+			self._methods = {}
+			self.batches = 0
+			self.batch_calls = 0
+
+	def __str__(self):
+		return "RequestStats (%s methods)" % len(self._methods)
+
+
+def _label(value):
+	return "%s" % value if not isinstance(value, float) else ("+Inf" if value == float("inf") else repr(value))
+
+
+def _labels(**labels):
+	if not labels:
+		return ""
+	return "{%s}" % ",".join('%s="%s"' % (k, _label(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+		for (k, v) in sorted(labels.items()))
+
+
+def prometheus_text(stats, prefix="pyzabbixobj", **labels):
+	"""
+	Render a :meth:`PyZabbixObj.ZabbixServer.stats` snapshot in the Prometheus text exposition format
+
+	:param stats: snapshot returned by :meth:`PyZabbixObj.ZabbixServer.stats`
+	:type stats: dict
+	:param prefix: prefix of the metric names
+	:type prefix: String
+	:param labels: (optional) labels added to every sample, e.g. ``server="zabbix01"``
+	:rtype: String
+	"""
+	lines = []
+
+	def metric(name, kind, help_text, samples):
+		lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+		lines.append("# TYPE %s_%s %s" % (prefix, name, kind))
+		for suffix, sample_labels, value in samples:
+			lines.append("%s_%s%s%s %s" % (prefix, name, suffix, _labels(**dict(labels, **sample_labels)), value))
+
+	methods = sorted(stats['methods'].items())
+	metric("requests_total", "counter", "API requests sent",
+		[("", {'method': m}, s['count']) for (m, s) in methods])
+	metric("request_errors_total", "counter", "API requests failed, by error code",
+		[("", {'method': m, 'code': c}, n) for (m, s) in methods for (c, n) in sorted(s['errors'].items())])
+	metric("request_duration_seconds", "histogram", "Latency of the API requests",
+		[("_bucket", {'method': m, 'le': bound}, n) for (m, s) in methods for (bound, n) in s['histogram']] +
+		[(suffix, {'method': m}, value) for (m, s) in methods for (suffix, value) in (("_sum", s['seconds']), ("_count", s['count']))])
+	metric("request_bytes_total", "counter", "Bytes of the request bodies",
+		[("", {'method': m}, s['request_bytes']) for (m, s) in methods])
+	metric("response_bytes_total", "counter", "Bytes of the response bodies",
+		[("", {'method': m}, s['response_bytes']) for (m, s) in methods])
+	metric("batches_total", "counter", "JSON-RPC batches sent", [("", {}, stats['batches'])])
+	metric("batch_calls_total", "counter", "Calls sent in JSON-RPC batches", [("", {}, stats['batch_calls'])])
+	if stats.get('coalescing') is not None:
+		metric("coalesced_calls_total", "counter", "Reads sent to the server by request coalescing",
+			[("", {}, stats['coalescing']['calls'])])
+		metric("coalesced_shared_total", "counter", "Reads that shared the response of an identical read in flight",
+			[("", {}, stats['coalescing']['shared'])])
+	if stats.get('cache') is not None:
+		cache = stats['cache']
+		metric("cache_hits_total", "counter", "Gets answered by the object cache", [("", {}, cache['hits'])])
+		metric("cache_misses_total", "counter", "Cacheable gets sent to the server", [("", {}, cache['misses'])])
+		metric("cache_evictions_total", "counter", "Records evicted from the object cache", [("", {}, cache['evictions'])])
+		metric("cache_size", "gauge", "Records in the object cache", [("", {}, cache['size'])])
+	return "\n".join(lines) + "\n"
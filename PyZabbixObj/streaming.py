@@ -0,0 +1,113 @@
+"""
+Incremental decoding of JSON-RPC responses
+"""
+
+from __future__ import unicode_literals
+import codecs
+import json
+
+_whitespace = " \t\n\r"
+_delimiters = _whitespace + ",:]}"
+
+
+class _Reader(object):
+	"""
+	Text buffer filled on demand from an iterable of byte chunks
+	"""
+
+	def __init__(self, chunks):
+		self.chunks = iter(chunks)
+		self.decoder = codecs.getincrementaldecoder("utf-8")()
+		self.json_decoder = json.JSONDecoder()
+		self.buf = ""
+		self.pos = 0
+		self.eof = False
+
+	def fill(self):
+		"""
+		Read the next chunk. Return False at the end of the stream
+		"""
+		if self.eof:
+			return False
+		# Drop the consumed text so the buffer stays as small as a chunk
+		self.buf = self.buf[self.pos:]
+		self.pos = 0
+		try:
+			chunk = next(self.chunks)
+			self.buf += self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+		except StopIteration:
+			self.buf += self.decoder.decode(b"", final=True)
+			self.eof = True
+		return True
+
+	def peek(self):
+		"""
+		Skip the whitespaces and return the next character ("" at the end of the stream)
+		"""
+		while True:
+			while self.pos < len(self.buf) and self.buf[self.pos] in _whitespace:
+				self.pos += 1
+			if self.pos < len(self.buf):
+				return self.buf[self.pos]
+			if not self.fill():
+				return ""
+
+	def expect(self, char):
+		if self.peek() != char:
+			raise ValueError("Expecting '%s' at position %s of the response" % (char, self.pos))
+		self.pos += 1
+
+	def value(self):
+		"""
+		Decode the next complete JSON value
+		"""
+		self.peek()
+		while True:
+			try:
+				value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+			except ValueError:
+				if not self.fill():
+					raise
+				continue
+			# A number cut by the end of the chunk ("-1." or "12") continues in the next one
+			if not self.eof and (end == len(self.buf) or not self.buf[end] in _delimiters):
+				self.fill()
+				continue
+			self.pos = end
+			return value
+
+
+def iter_result(chunks, on_error):
+	"""
+	Parse a JSON-RPC response and yield the elements of its ``result`` array as soon as they are decoded.
+	A result that is not an array is yielded as a single element.
+
+	:param chunks: body of the response
+	:type chunks: iterable of bytes
+	:param on_error: called with the ``error`` member of an error response, returns the exception to raise
+	:type on_error: callable
+	:return: elements of the result
+	:rtype: generator
+	"""
+	reader = _Reader(chunks)
+	reader.expect("{")
+	while reader.peek() != "}":
+		key = reader.value()
+		reader.expect(":")
+		if key == "result" and reader.peek() == "[":
+			reader.pos += 1
+			while reader.peek() != "]":
+				yield reader.value()
+				if reader.peek() == ",":
+					reader.pos += 1
+			reader.pos += 1
+		elif key == "result":
+			yield reader.value()
+		elif key == "error":
+			raise on_error(reader.value())
+		else:
+			reader.value()
+		if reader.peek() == ",":
+			reader.pos += 1
+		elif reader.peek() == "":
+			raise ValueError("Truncated response")
@@ -0,0 +1,661 @@
+"""
+In-process stand-in of the Zabbix JSON-RPC API, to exercise and benchmark the library without a Zabbix Server
+
+>>> api = FakeZabbixAPI(hosts=10000, latency=0.002)
+>>> server = ZabbixServer("http://fake", transport=FakeTransport(api))
+>>> server.login("Admin", "zabbix")
+
+:class:`FakeHTTPServer` serves the same API on a local port, for clients (or transports) that need a real socket.
+:class:`FakeTrapperServer` receives the values of a :class:`PyZabbixObj.ZabbixSender` on a local port.
+"""
+
+from __future__ import unicode_literals
+import itertools
+import json
+import struct
+import threading
+import time
+import zlib
+try:
+	from http.server import BaseHTTPRequestHandler, HTTPServer
+	from socketserver import BaseRequestHandler, TCPServer, ThreadingMixIn
+except ImportError:
+	from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+	from SocketServer import BaseRequestHandler, TCPServer, ThreadingMixIn
+from .codec import gzip_compress, gzip_decompress
+from .sender import flag_compressed, flag_large, flag_zabbix, protocol_header
+
+# Object type -> (id field, name field, get parameter filtering by id)
+fake_types = {
+	'host': ("hostid", "host", "hostids"),
+	'hostgroup': ("groupid", "name", "groupids"),
+	'template': ("templateid", "host", "templateids"),
+	'trigger': ("triggerid", "description", "triggerids"),
+	'item': ("itemid", "key_", "itemids")
+}
+# Types whose names repeat on every host (item keys): filtered by scanning, not through the name index
+fake_per_host = ("item",)
+# Clock of the first generated history value (on the hour), then one value per minute
+history_start = 1500001200
+# select* option -> (field of the stored object, type of the linked objects)
+fake_selects = {
+	'selectGroups': ("groups", "hostgroup"),
+	'selectParentTemplates': ("parentTemplates", "template"),
+	'selectTemplates': ("parentTemplates", "template"),
+	'selectHosts': ("hosts", "host"),
+	'selectInterfaces': ("interfaces", None)
+}
+# select* options rejected by the get of a type, as by the real API
+fake_unsupported = {
+	'host': ("selectTemplates",)
+}
+# Fields that host.create requires on every interface
+interface_required = ("type", "main", "useip", "ip", "dns", "port")
+api_version = "3.0.0"
+
+
+class FakeAPIError(Exception):
+
+	def __init__(self, code, message, data):
+		self.code = code
+		self.message = message
+		self.data = data
+
+
+def _invalid(data):
+	return FakeAPIError(-32602, "Invalid params.", data)
+
+
+def _project(record, output):
+	if output == "extend":
+		return dict(record)
+	if output == "count":
+		return {}
+	return dict((k, record[k]) for k in output if k in record)
+
+
+class FakeZabbixAPI(object):
+	"""
+	In-memory implementation of ``user.login``, ``apiinfo.version`` and of ``get``, ``create`` and ``delete``
+	on hosts, host groups, templates, triggers and items, plus ``host.update``, ``host.massadd``, ``host.massremove``,
+	``host.massupdate``, ``history.get``, ``trend.get`` and ``event.get``, with JSON-RPC batches. ``get`` handles ``output``, ``filter``, the ids parameters,
+	``groupids``/``templateids``/``hostids``, ``search``, ``limit``, ``countOutput`` and the ``select*``
+	options of groups, templates, hosts and interfaces.
+
+	The dataset is generated at creation: host ``host%06d`` has interface IP ``10.x.y.z``, is in group
+	``Group <n % groups>``, is linked to ``Template <n % templates>`` and has ``triggers_per_host`` triggers.
+	Each host has ``items_per_host`` items ``item[<i>]``, numeric float for even i and numeric unsigned for odd i,
+	with ``history_per_item`` values, one per minute from :data:`history_start`. There are no events until
+	:meth:`add_event` is called.
+
+	:param hosts: Hosts generated
+	:type hosts: int
+	:param groups: Host groups generated
+	:type groups: int
+	:param templates: Templates generated
+	:type templates: int
+	:param triggers_per_host: Triggers generated on each host
+	:type triggers_per_host: int
+	:param items_per_host: Items generated on each host
+	:type items_per_host: int
+	:param history_per_item: History values generated for each item
+	:type history_per_item: int
+	:param latency: Seconds added to each round trip by :class:`FakeTransport` and :class:`FakeHTTPServer`
+	:type latency: float
+	:param user: Accepted user
+	:param password: Accepted password
+	:ivar requests: round trips served (a batch counts once)
+	:ivar calls: API calls served
+	:ivar methods: calls served per method
+	"""
+
+	def __init__(self, hosts=100, groups=10, templates=10, triggers_per_host=0, latency=0.0, user="Admin",
+		password="zabbix", items_per_host=0, history_per_item=0):
+		self.latency = latency
+		self.user = user
+		self.password = password
+		self.tokens = set()
+		self.requests = 0
+		self.calls = 0
+		self.methods = {}
+		self.objects = dict((object_type, {}) for object_type in fake_types)
+		# Object type -> name -> id: gets by name and the uniqueness checks do not scan the objects
+		self.names = dict((object_type, {}) for object_type in fake_types)
+		# Itemid -> (clock, ns, value) by increasing clock
+		self.history = {}
+		# Events by increasing eventid
+		self.events = []
+		self._ids = itertools.count(10001)
+		self._lock = threading.RLock()
+		for n in range(groups):
+			self.__insert__("hostgroup", {'name': "Group %s" % n, 'internal': "0", 'flags': "0"})
+		groupids = sorted(self.objects['hostgroup'], key=int)
+		for n in range(templates):
+			self.__insert__("template", {'host': "Template %s" % n, 'name': "Template %s" % n, 'description': "",
+				'groups': [groupids[n % groups]] if groups else []})
+		templateids = sorted(self.objects['template'], key=int)
+		for n in range(hosts):
+			self.__insert__("host", {
+				'host': "host%06d" % n, 'name': "Host %s" % n, 'status': "0", 'available': "1", 'description': "",
+				'maintenance_status': "0", 'proxy_hostid': "0", 'flags': "0",
+				'groups': [groupids[n % groups]] if groups else [],
+				'parentTemplates': [templateids[n % templates]] if templates else [],
+				'interfaces': [{'type': "1", 'main': "1", 'useip': "1", 'dns': "", 'port': "10050",
+					'ip': "10.%s.%s.%s" % ((n >> 16) & 255, (n >> 8) & 255, n & 255)}]
+			})
+		for hostid in sorted(self.objects['host'], key=int):
+			for n in range(triggers_per_host):
+				self.__insert__("trigger", {'description': "Trigger %s on %s" % (n, self.objects['host'][hostid]['host']),
+					'expression': "{%s:agent.ping.nodata(5m)}=1" % self.objects['host'][hostid]['host'],
+					'priority': "3", 'status': "0", 'value': "0", 'hosts': [hostid]})
+			for n in range(items_per_host):
+				values = [(history_start + 60 * i, i, "%s" % (i + n * 0.5 if n % 2 == 0 else i * 10 + n))
+					for i in range(history_per_item)]
+				itemid = self.__insert__("item", {'key_': "item[%s]" % n, 'name': "Item %s" % n, 'hostid': hostid,
+					'hosts': [hostid], 'type': "2", 'value_type': "0" if n % 2 == 0 else "3", 'status': "0", 'state': "0",
+					'delay': "0", 'units': "", 'lastvalue': values[-1][2] if values else "0",
+					'lastclock': "%s" % values[-1][0] if values else "0"})
+				self.history[itemid] = values
+
+	def __insert__(self, object_type, record):
+		id_field = fake_types[object_type][0]
+		objectid = "%s" % next(self._ids)
+		record[id_field] = objectid
+		for interface in record.get('interfaces', []):
+			interface['interfaceid'] = "%s" % next(self._ids)
+			interface['hostid'] = objectid
+		self.objects[object_type][objectid] = record
+		if not object_type in fake_per_host:
+			self.names[object_type][record[fake_types[object_type][1]]] = objectid
+		return objectid
+
+	def handle(self, request):
+		"""
+		Serve a decoded request or batch
+
+		:return: the response (a list for batches)
+		"""
+		with self._lock:
+			self.requests += 1
+			if type(request) == list:
+				return [self.__serve__(r) for r in request]
+			return self.__serve__(request)
+
+	def __serve__(self, request):
+		self.calls += 1
+		method = request.get('method')
+		self.methods[method] = self.methods.get(method, 0) + 1
+		response = {'jsonrpc': "2.0", 'id': request.get('id')}
+		try:
+			response['result'] = self.__dispatch__(method, request.get('params', {}), request.get('auth'))
+		except FakeAPIError as e:
+			response['error'] = {'code': e.code, 'message': e.message, 'data': e.data}
+		return response
+
+	def __dispatch__(self, method, params, auth):
+		if method == "apiinfo.version":
+			return api_version
+		if method == "user.login":
+			if params.get('user') != self.user or params.get('password') != self.password:
+				raise _invalid("Login name or password is incorrect.")
+			token = "%032x" % next(self._ids)
+			self.tokens.add(token)
+			return token
+		if not auth in self.tokens:
+			raise _invalid("Not authorised.")
+		if method == "history.get":
+			return self.__history__(params)
+		if method == "trend.get":
+			return self.__trends__(params)
+		if method == "event.get":
+			return self.__events__(params)
+		object_type, _, operation = ("%s" % method).partition(".")
+		handlers = {'get': self.__read__, 'create': self.__create__, 'delete': self.__remove__}
+		if object_type == "host":
+			handlers.update(update=self.__modify__, massadd=self.__mass_add__, massremove=self.__mass_remove__,
+				massupdate=self.__mass_update__)
+		if not object_type in fake_types or not operation in handlers:
+			raise FakeAPIError(-32601, "Method not found.", "Incorrect API \"%s\"." % object_type)
+		return handlers[operation](object_type, params)
+
+	def __read__(self, object_type, params):
+		id_field, name_field, ids_param = fake_types[object_type]
+		for option in fake_unsupported.get(object_type, ()):
+			if option in params:
+				raise _invalid('Invalid parameter "/": unexpected parameter "%s".' % option)
+		records = self.objects[object_type]
+		names = (params.get('filter') or {}).get(name_field)
+		if names is not None and not object_type in fake_per_host:
+			names = names if type(names) == list else [names]
+			records = dict((i, records[i]) for i in (self.names[object_type].get("%s" % n) for n in names) if i in records)
+		if params.get(ids_param) is not None:
+			ids = params[ids_param] if type(params[ids_param]) == list else [params[ids_param]]
+			records = [records[i] for i in ("%s" % i for i in ids) if i in records]
+		else:
+			records = list(records.values())
+		for param, field in (("groupids", "groups"), ("templateids", "parentTemplates"), ("hostids", "hosts")):
+			if params.get(param) is not None and param != ids_param:
+				wanted = set("%s" % i for i in (params[param] if type(params[param]) == list else [params[param]]))
+				records = [r for r in records if wanted.intersection(r.get(field, []))]
+		for field, values in (params.get('filter') or {}).items():
+			values = set("%s" % v for v in (values if type(values) == list else [values]))
+			records = [r for r in records if "%s" % r.get(field) in values]
+		for field, value in (params.get('search') or {}).items():
+			records = [r for r in records if ("%s" % value).lower() in ("%s" % r.get(field, "")).lower()]
+		records.sort(key=lambda r: int(r[id_field]))
+		if params.get('limit'):
+			records = records[:int(params['limit'])]
+		if params.get('countOutput'):
+			return "%s" % len(records)
+		output = params.get('output', "extend")
+		result = []
+		for record in records:
+			item = _project(dict((k, v) for (k, v) in record.items() if not type(v) == list), output)
+			for option, (field, linked_type) in fake_selects.items():
+				if params.get(option) and field in record:
+					if linked_type is None:
+						item[field] = [_project(v, params[option]) for v in record[field]]
+					else:
+						linked = self.objects[linked_type]
+						item[field] = [_project(linked[i], params[option]) for i in record[field] if i in linked]
+			result.append(item)
+		return result
+
+	def __create__(self, object_type, params):
+		id_field, name_field, _ = fake_types[object_type]
+		created = []
+		for spec in params if type(params) == list else [params]:
+			name = spec.get(name_field)
+			if not name:
+				raise _invalid("Field \"%s\" is mandatory." % name_field)
+			if name in self.names[object_type]:
+				raise _invalid("%s with the same name \"%s\" already exists." % (object_type.capitalize(), name))
+			record = dict((k, "%s" % v) for (k, v) in spec.items() if not type(v) in (list, dict))
+			if object_type in ("host", "template"):
+				groups = [g['groupid'] if type(g) == dict else g for g in spec.get('groups') or []]
+				if not groups:
+					raise _invalid("No groups for %s \"%s\"." % (object_type, name))
+				record['groups'] = ["%s" % g for g in groups]
+				record.setdefault('name', name)
+			if object_type == "host":
+				record['parentTemplates'] = ["%s" % (t['templateid'] if type(t) == dict else t)
+					for t in spec.get('templates') or []]
+				for i in spec.get('interfaces') or []:
+					missing = [f for f in interface_required if not f in i]
+					if missing:
+						raise _invalid("Incorrect arguments passed to function: interface lacks %s." % ", ".join(missing))
+				record['interfaces'] = [dict((k, "%s" % v) for (k, v) in i.items()) for i in spec.get('interfaces') or []]
+			created.append(self.__insert__(object_type, record))
+		return {id_field + "s": created}
+
+	def __remove__(self, object_type, params):
+		id_field = fake_types[object_type][0]
+		ids = ["%s" % i for i in (params if type(params) == list else [params])]
+		if any(not i in self.objects[object_type] for i in ids):
+			raise _invalid("No permissions to referred object or it does not exist!")
+		for i in ids:
+			record = self.objects[object_type].pop(i)
+			self.names[object_type].pop(record[fake_types[object_type][1]], None)
+		return {id_field + "s": ids}
+
+	def __existing__(self, object_type, ids):
+		ids = ["%s" % (i[fake_types[object_type][0]] if type(i) == dict else i) for i in ids]
+		if any(not i in self.objects[object_type] for i in ids):
+			raise _invalid("No permissions to referred object or it does not exist!")
+		return ids
+
+	def __modify__(self, object_type, params):
+		updated = []
+		for spec in params if type(params) == list else [params]:
+			hostid = self.__existing__("host", [spec.get('hostid')])[0]
+			record = self.objects['host'][hostid]
+			name = spec.get('host')
+			if name is not None and name != record['host']:
+				if name in self.names['host']:
+					raise _invalid("Host with the same name \"%s\" already exists." % name)
+				del self.names['host'][record['host']]
+				self.names['host'][name] = hostid
+			for k, v in spec.items():
+				if not type(v) in (list, dict):
+					record[k] = "%s" % v
+			if 'groups' in spec:
+				groups = self.__existing__("hostgroup", spec['groups'])
+				if not groups:
+					raise _invalid("No groups for host \"%s\"." % record['host'])
+				record['groups'] = groups
+			if 'templates' in spec:
+				record['parentTemplates'] = self.__existing__("template", spec['templates'])
+			if 'interfaces' in spec:
+				record['interfaces'] = []
+				for interface in spec['interfaces']:
+					interface = dict((k, "%s" % v) for (k, v) in interface.items())
+					interface['interfaceid'] = "%s" % next(self._ids)
+					interface['hostid'] = hostid
+					record['interfaces'].append(interface)
+			updated.append(hostid)
+		return {'hostids': updated}
+
+	def __mass_add__(self, object_type, params):
+		hostids = self.__existing__("host", params.get('hosts') or [])
+		groups = self.__existing__("hostgroup", params.get('groups') or [])
+		templates = self.__existing__("template", params.get('templates') or [])
+		for hostid in hostids:
+			record = self.objects['host'][hostid]
+			record['groups'] = record['groups'] + [g for g in groups if not g in record['groups']]
+			record['parentTemplates'] = record['parentTemplates'] + [t for t in templates if not t in record['parentTemplates']]
+		return {'hostids': hostids}
+
+	def __mass_remove__(self, object_type, params):
+		hostids = self.__existing__("host", params.get('hostids') or [])
+		groups = set("%s" % g for g in params.get('groupids') or [])
+		templates = set("%s" % t for t in params.get('templateids') or [])
+		for hostid in hostids:
+			if groups and not [g for g in self.objects['host'][hostid]['groups'] if not g in groups]:
+				raise _invalid("Host \"%s\" cannot be without host group." % self.objects['host'][hostid]['host'])
+		for hostid in hostids:
+			record = self.objects['host'][hostid]
+			record['groups'] = [g for g in record['groups'] if not g in groups]
+			record['parentTemplates'] = [t for t in record['parentTemplates'] if not t in templates]
+		return {'hostids': hostids}
+
+	def __mass_update__(self, object_type, params):
+		hostids = self.__existing__("host", params.get('hosts') or [])
+		for hostid in hostids:
+			spec = dict((k, v) for (k, v) in params.items() if k != "hosts")
+			spec['hostid'] = hostid
+			self.__modify__("host", spec)
+		return {'hostids': hostids}
+
+	def __values__(self, params, value_types):
+		"""
+		Itemid and history of the items of params['itemids'] (default all) with a value type in value_types
+		"""
+		itemids = params.get('itemids')
+		if itemids is None:
+			itemids = self.history
+		items = self.objects['item']
+		for itemid in sorted(("%s" % i for i in (itemids if type(itemids) == list else [itemids])), key=int):
+			if itemid in items and items[itemid]['value_type'] in value_types:
+				yield itemid, self.history[itemid]
+
+	def __history__(self, params):
+		time_from = int(params.get('time_from', 0))
+		time_till = int(params.get('time_till', 2 ** 32))
+		records = []
+		for itemid, values in self.__values__(params, ("%s" % params.get('history', 3),)):
+			records.extend({'itemid': itemid, 'clock': "%s" % clock, 'ns': "%s" % ns, 'value': value}
+				for (clock, ns, value) in values if time_from <= clock <= time_till)
+		if params.get('sortfield') == "clock":
+			records.sort(key=lambda r: int(r['clock']), reverse=params.get('sortorder') == "DESC")
+		if params.get('limit'):
+			records = records[:int(params['limit'])]
+		return [_project(r, params.get('output', "extend")) for r in records]
+
+	def __trends__(self, params):
+		time_from = int(params.get('time_from', 0))
+		time_till = int(params.get('time_till', 2 ** 32))
+		records = []
+		for itemid, values in self.__values__(params, ("0", "3")):
+			hours = {}
+			for clock, _, value in values:
+				hours.setdefault(clock - clock % 3600, []).append(float(value))
+			for clock in sorted(hours):
+				if time_from <= clock <= time_till:
+					hour = hours[clock]
+					records.append({'itemid': itemid, 'clock': "%s" % clock, 'num': "%s" % len(hour),
+						'value_min': "%s" % min(hour), 'value_avg': "%s" % (sum(hour) / len(hour)),
+						'value_max': "%s" % max(hour)})
+		return [_project(r, params.get('output', "extend")) for r in records]
+
+	def __events__(self, params):
+		events = self.events
+		if params.get('eventid_from') is not None:
+			events = [e for e in events if int(e['eventid']) >= int(params['eventid_from'])]
+		if params.get('eventid_till') is not None:
+			events = [e for e in events if int(e['eventid']) <= int(params['eventid_till'])]
+		for param, field in (("source", "source"), ("object", "object"), ("value", "value"), ("objectids", "objectid")):
+			if params.get(param) is not None:
+				values = set("%s" % v for v in (params[param] if type(params[param]) == list else [params[param]]))
+				events = [e for e in events if e[field] in values]
+		if params.get('sortorder') == "DESC":
+			events = events[::-1]
+		if params.get('limit'):
+			events = events[:int(params['limit'])]
+		return [_project(e, params.get('output', "extend")) for e in events]
+
+	def add_event(self, name="Problem", value=1, objectid="0", source=0, clock=None):
+		"""
+		Record a new event, returned by the next ``event.get``
+
+		:param value: 1 for a problem, 0 for a recovery
+		:param objectid: id of the trigger of the event
+		:return: the event
+		:rtype: dict
+		"""
+		with self._lock:
+			event = {'eventid': "%s" % next(self._ids), 'source': "%s" % source, 'object': "0",
+				'objectid': "%s" % objectid, 'clock': "%s" % int(clock if clock is not None else time.time()),
+				'ns': "0", 'value': "%s" % value, 'acknowledged': "0", 'name': name}
+			self.events.append(event)
+			return event
+
+	def reset_counters(self):
+		"""
+		Clear :attr:`requests`, :attr:`calls` and :attr:`methods`
+		"""
+		with self._lock:
+			self.requests = 0
+			self.calls = 0
+			self.methods = {}
+
+	def __str__(self):
+		return "FakeZabbixAPI (%s)" % ", ".join("%s %s" % (len(v), k) for (k, v) in sorted(self.objects.items()))
+
+
+def _exchange(api, body, headers):
+	"""
+	Serve an encoded request as the frontend: gzip bodies are inflated and responses gzipped if accepted
+	"""
+	if api.latency:
+		time.sleep(api.latency)
+	if headers.get('Content-Encoding') == "gzip":
+		body = gzip_decompress(body)
+	if isinstance(body, bytes):
+		body = body.decode("utf-8")
+	response = json.dumps(api.handle(json.loads(body))).encode("utf-8")
+	if "gzip" in headers.get('Accept-Encoding', ""):
+		return gzip_compress(response), True
+	return response, False
+
+
+class FakeTransport(object):
+	"""
+	Transport of :class:`PyZabbixObj.ZabbixServer` answering from a :class:`FakeZabbixAPI`, without sockets.
+	Requests and responses are JSON encoded (and compressed) as on the wire
+
+	:param api: the fake API
+	:type api: :class:`FakeZabbixAPI`
+	"""
+
+	def __init__(self, api):
+		self.api = api
+
+	def post(self, url, data, headers):
+		return _exchange(self.api, data, headers)[0]
+
+	def __str__(self):
+		return "FakeTransport %s" % self.api
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+	def do_POST(self):
+		api = self.server.api
+		if self.path.split("?")[0] != "/api_jsonrpc.php":
+			self.send_error(404)
+			return
+		body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+		response, compressed = _exchange(api, body, self.headers)
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		if compressed:
+			self.send_header("Content-Encoding", "gzip")
+		self.send_header("Content-Length", "%s" % len(response))
+		self.end_headers()
+		self.wfile.write(response)
+
+	def log_message(self, *args):
+		pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+
+class FakeHTTPServer(object):
+	"""
+	Local HTTP server exposing a :class:`FakeZabbixAPI` on ``<url>/api_jsonrpc.php``, run in a background thread
+
+	>>> with FakeHTTPServer(FakeZabbixAPI(hosts=1000)) as fake:
+	...     server = ZabbixServer(fake.url)
+
+	:param api: the fake API
+	:type api: :class:`FakeZabbixAPI`
+	:param host: Listening address
+	:param port: Listening port. Default is a free port
+	:ivar url: base URL, to be given to :class:`PyZabbixObj.ZabbixServer`
+	"""
+
+	def __init__(self, api, host="127.0.0.1", port=0):
+		self.api = api
+		self._server = _ThreadingHTTPServer((host, port), _Handler)
+		self._server.api = api
+		self.url = "http://%s:%s" % self._server.server_address[:2]
+		self._thread = threading.Thread(target=self._server.serve_forever)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def close(self):
+		"""
+		Stop the server
+		"""
+		self._server.shutdown()
+		self._server.server_close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def __str__(self):
+		return "FakeHTTPServer %s" % self.url
+
+
+class _TrapperHandler(BaseRequestHandler):
+
+	def handle(self):
+		trapper = self.server.trapper
+		with trapper._lock:
+			trapper.connections += 1
+		while True:
+			header = self.__receive__(5)
+			if header is None or header[:4] != protocol_header:
+				return
+			flags = bytearray(header)[4]
+			sizes = self.__receive__(16 if flags & flag_large else 8)
+			if sizes is None:
+				return
+			length = struct.unpack("<QQ" if flags & flag_large else "<II", sizes)[0]
+			body = self.__receive__(length)
+			if body is None:
+				return
+			if flags & flag_compressed:
+				body = zlib.decompress(body)
+			response = json.dumps(trapper.process(json.loads(body.decode("utf-8")))).encode("utf-8")
+			self.request.sendall(protocol_header + struct.pack("<BII", flag_zabbix, len(response), 0) + response)
+			if not trapper.keepalive:
+				return
+
+	def __receive__(self, size):
+		data = b""
+		while len(data) < size:
+			chunk = self.request.recv(size - len(data))
+			if not chunk:
+				return None
+			data += chunk
+		return data
+
+
+class _ThreadingTCPServer(ThreadingMixIn, TCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+
+class FakeTrapperServer(object):
+	"""
+	Local stand-in of the trapper port (10051) of a Zabbix Server or Proxy, run in a background thread.
+	It answers each ``sender data`` packet with the processed/failed/total counts, like the server
+
+	>>> with FakeTrapperServer(accept=lambda value: value['key'] != "unknown.key") as trapper:
+	...     with ZabbixSender([trapper.address]) as sender:
+	...         sender.send("web01", "app.requests", 12)
+	...     print(len(trapper.values))
+
+	:param host: Listening address
+	:param port: Listening port. Default is a free port
+	:param accept: (optional) function of a value (dict with host, key, value and clock) returning False
+		for the values the server refuses (e.g. unknown host or item). Default accepts every value
+	:param keepalive: (optional) read several packets on one connection, like a proxy that allows it.
+		Default closes the connection after the response, like the server
+	:ivar address: (host, port), to be given to :class:`PyZabbixObj.ZabbixSender`
+	:ivar values: values accepted
+	:ivar packets: packets received
+	:ivar connections: connections accepted
+	"""
+
+	def __init__(self, host="127.0.0.1", port=0, accept=None, keepalive=False):
+		self.accept = accept
+		self.keepalive = keepalive
+		self.values = []
+		self.packets = 0
+		self.connections = 0
+		self._lock = threading.Lock()
+		self._server = _ThreadingTCPServer((host, port), _TrapperHandler)
+		self._server.trapper = self
+		self.address = self._server.server_address[:2]
+		self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,))
+		self._thread.daemon = True
+		self._thread.start()
+
+	def process(self, request):
+		"""
+		:return: response to a trapper request
+		:rtype: dict
+		"""
+		start = time.time()
+		if request.get('request') != "sender data" or not isinstance(request.get('data'), list):
+			return {'response': "failed", 'info': "unsupported request"}
+		accepted = [v for v in request['data'] if self.accept is None or self.accept(v)]
+		with self._lock:
+			self.packets += 1
+			self.values.extend(accepted)
+		total = len(request['data'])
+		return {'response': "success", 'info': "processed: %s; failed: %s; total: %s; seconds spent: %.6f" % (
+			len(accepted), total - len(accepted), total, time.time() - start)}
+
+	def close(self):
+		"""
+		Stop the server
+		"""
+		self._server.shutdown()
+		self._server.server_close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def __str__(self):
+		return "FakeTrapperServer %s:%s" % self.address
@@ -0,0 +1,103 @@
+"""
+HTTP transports used by :class:`PyZabbixObj.ZabbixServer` to reach the JSON-RPC endpoint
+"""
+
+from __future__ import unicode_literals
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RequestsTransport(object):
+	"""
+	Pooled keep-alive transport based on a :class:`requests.Session`
+
+	Connections (and their TLS sessions) are kept open and reused between calls.
+	The underlying urllib3 pool is thread-safe, so a single transport can be shared
+	by every thread using the same :class:`ZabbixServer`.
+
+	:param pool_size: Maximum number of connections kept open per host
+	:type pool_size: int
+	:param timeout: Connect/read timeout in seconds (a float or a (connect, read) tuple)
+	:type timeout: float
+	:param verify: TLS certificate verification, as accepted by requests
+	:type verify: bool or String
+	:param max_retries: Retries on connection errors (never on read errors)
+	:type max_retries: int
+	:param pool_block: If True, wait for a free connection instead of opening a throwaway one
+	:type pool_block: bool
+	"""
+
+	def __init__(self, pool_size=10, timeout=30, verify=True, max_retries=0, pool_block=False):
+		self.pool_size = pool_size
+		self.timeout = timeout
+		self.verify = verify
+		self.max_retries = max_retries
+		self.pool_block = pool_block
+		self._session = None
+		self._lock = threading.Lock()
+
+	@property
+	def session(self):
+		"""
+		Underlying :class:`requests.Session`, created on first use
+		"""
+		if self._session is None:
+			with self._lock:
+				if self._session is None:
+					session = requests.Session()
+					adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+						max_retries=self.max_retries, pool_block=self.pool_block)
+					session.mount("http://", adapter)
+					session.mount("https://", adapter)
+					session.verify = self.verify
+					self._session = session
+		return self._session
+
+	def post(self, url, data, headers):
+		"""
+		Send a POST request and return the raw body of the response
+
+		:param url: Full URL of the JSON-RPC endpoint
+		:type url: String
+		:param data: Encoded request body
+		:type data: String
+		:param headers: HTTP headers of the request
+		:type headers: dict
+		:return: body of the response as received, still gzipped if the server compressed it
+			(the caller measures it, then inflates it)
+		:rtype: bytes
+		"""
+		response = self.session.post(url, data=data, headers=headers, timeout=self.timeout, stream=True)
+		try:
+			response.raise_for_status()
+			return response.raw.read(decode_content=False)
+		finally:
+			response.close()
+
+	def post_stream(self, url, data, headers, chunk_size=65536):
+		"""
+		Send a POST request and yield the body of the response as it arrives from the socket
+
+		:return: chunks of the body as received, still gzipped if the server compressed it
+		:rtype: generator of bytes
+		"""
+		response = self.session.post(url, data=data, headers=headers, timeout=self.timeout, stream=True)
+		try:
+			response.raise_for_status()
+			for chunk in response.raw.stream(chunk_size, decode_content=False):
+				yield chunk
+		finally:
+			response.close()
+
+	def close(self):
+		"""
+		Close every pooled connection
+		"""
+		with self._lock:
+			if self._session is not None:
+				self._session.close()
+				self._session = None
+
+	def __str__(self):
+		return "RequestsTransport (pool size %s)" % self.pool_size
@@ -0,0 +1,142 @@
+"""
+Benchmarks of the main workflows against the in-process fake API (PyZabbixObj.testing)
+
+For each workflow: round trips to the API, API calls, wall time and peak memory allocated by Python
+(Python 3 only). Run from the repository root:
+
+	python benchmarks/run.py --hosts 20000 --latency 0.002
+	python benchmarks/run.py --http --json > baseline.json
+	python benchmarks/run.py --compare baseline.json
+"""
+
+from __future__ import print_function, unicode_literals
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import PyZabbixObj
+from PyZabbixObj.testing import FakeZabbixAPI, FakeTransport, FakeHTTPServer
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+
+def single_get(server, api, options):
+	for n in range(options.repeat):
+		server.do("get", "host", name="host%06d" % (n % options.hosts))
+
+
+def bulk_get(server, api, options):
+	names = ["host%06d" % n for n in range(min(options.hosts, options.bulk))]
+	server.get_many("host", names=names, output=["hostid", "host", "name"], selectGroups=["groupid"])
+
+
+def create_with_groups(server, api, options):
+	group = server.do("get", "hostgroup", name="Group 0")
+	for n in range(options.repeat):
+		PyZabbixObj.Host([], "single%06d" % n, server, groups=group)
+
+
+def bulk_create_with_groups(server, api, options):
+	group = server.do("get", "hostgroup", name="Group 0")
+	server.create_many("host", [{'host': "bulk%06d" % n, 'groups': group} for n in range(options.bulk)])
+
+
+def enumeration(server, api, options):
+	for host in server.iter("host", page_size=1000, selectGroups=["groupid"]):
+		pass
+
+
+def compact_enumeration(server, api, options):
+	for host in server.iter("host", page_size=1000, compact=True):
+		pass
+
+
+workflows = [
+	("single_get", single_get),
+	("bulk_get", bulk_get),
+	("create_with_groups", create_with_groups),
+	("bulk_create_with_groups", bulk_create_with_groups),
+	("enumeration", enumeration),
+	("compact_enumeration", compact_enumeration)
+]
+
+
+def measure(name, workflow, options):
+	"""
+	Run a workflow on a fresh dataset and server
+	"""
+	api = FakeZabbixAPI(hosts=options.hosts, latency=options.latency)
+	http = FakeHTTPServer(api) if options.http else None
+	try:
+		if http is not None:
+			server = PyZabbixObj.ZabbixServer(http.url, codec=options.codec, compress=options.compress)
+		else:
+			server = PyZabbixObj.ZabbixServer("http://fake", transport=FakeTransport(api), codec=options.codec,
+				compress=options.compress)
+		server.login(api.user, api.password)
+		api.reset_counters()
+		gc.collect()
+		if tracemalloc is not None:
+			tracemalloc.start()
+		start = time.time()
+		workflow(server, api, options)
+		seconds = time.time() - start
+		peak = None
+		if tracemalloc is not None:
+			peak = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+		server.close()
+	finally:
+		if http is not None:
+			http.close()
+	return {'workflow': name, 'round_trips': api.requests, 'calls': api.calls, 'seconds': seconds, 'peak_bytes': peak}
+
+
+def report(results, baseline=None):
+	print("%-26s %11s %7s %10s %12s" % ("workflow", "round trips", "calls", "seconds", "peak MB"))
+	for result in results:
+		line = "%-26s %11s %7s %10.3f %12s" % (result['workflow'], result['round_trips'], result['calls'],
+			result['seconds'], "-" if result['peak_bytes'] is None else "%.1f" % (result['peak_bytes'] / 1e6))
+		previous = (baseline or {}).get(result['workflow'])
+		if previous is not None:
+			line += "   (was %s round trips, %.3f s)" % (previous['round_trips'], previous['seconds'])
+			if result['round_trips'] > previous['round_trips']:
+				line += " MORE ROUND TRIPS"
+		print(line)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+	parser.add_argument("--hosts", type=int, default=10000, help="hosts in the fake dataset")
+	parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each round trip")
+	parser.add_argument("--repeat", type=int, default=200, help="iterations of the single object workflows")
+	parser.add_argument("--bulk", type=int, default=5000, help="objects of the bulk workflows")
+	parser.add_argument("--http", action="store_true", help="serve the fake API over local HTTP")
+	parser.add_argument("--codec", help="JSON codec of the server (orjson, ujson, json). Default is the fastest installed")
+	parser.add_argument("--compress", action="store_true", help="gzip the requests and responses")
+	parser.add_argument("--only", action="append", help="workflow to run (repeatable)")
+	parser.add_argument("--json", action="store_true", help="print the results as JSON")
+	parser.add_argument("--compare", help="JSON results of a previous run")
+	options = parser.parse_args()
+	results = [measure(name, workflow, options) for (name, workflow) in workflows
+		if not options.only or name in options.only]
+	if options.json:
+		print(json.dumps(results, indent=1))
+		return
+	baseline = None
+	if options.compare:
+		with open(options.compare) as f:
+			baseline = dict((r['workflow'], r) for r in json.load(f))
+	report(results, baseline)
+
+
+if __name__ == "__main__":
+	main()
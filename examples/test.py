@@ -1 +1,56 @@
-import ../PyZabbix-obj
+"""
+Example of the main PyZabbixObj workflows
+
+Run against the in-process fake API:
+
+	python examples/test.py
+
+or against a Zabbix frontend:
+
+	python examples/test.py http://zabbix.example.com/zabbix Admin zabbix
+"""
+
+from __future__ import print_function
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from PyZabbixObj import ZabbixServer, Host
+from PyZabbixObj.testing import FakeZabbixAPI, FakeTransport
+
+
+def main():
+	if len(sys.argv) == 4:
+		server = ZabbixServer(sys.argv[1])
+		user, password = sys.argv[2:]
+	else:
+		api = FakeZabbixAPI(hosts=100)
+		server = ZabbixServer("http://fake", transport=FakeTransport(api))
+		user, password = api.user, api.password
+
+	with server:
+		server.login(user, password)
+		print("API version", server.get_version())
+
+		# Single objects, by name or id
+		linux = server.do("get", "hostgroup", name="Linux servers") or server.do("create", "hostgroup", name="Linux servers")
+		print(linux, linux.groupid)
+
+		# A host is created when it does not exist
+		host = Host([], "example-host", server, groups=linux)
+		print(host, host.hostid)
+
+		# Many objects with one request per chunk
+		hosts = server.get_many("host", names=["example-host", "missing-host"], selectGroups=["groupid", "name"])
+		print(hosts, "missing:", hosts.missing)
+
+		# Every host, one page at a time
+		print(sum(1 for h in server.iter("host", page_size=500, compact=True)), "hosts")
+
+		server.delete_many("host", [host])
+		print("requests by method:", dict((m, s["count"]) for (m, s) in server.stats()["methods"].items()))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,34 @@
+"""
+Base test case running a ZabbixServer against the in-process fake API
+"""
+
+from __future__ import unicode_literals
+import unittest
+from PyZabbixObj import ZabbixServer
+from PyZabbixObj.testing import FakeZabbixAPI, FakeTransport
+
+
+class FakeServerTestCase(unittest.TestCase):
+	"""
+	Logged-in :class:`ZabbixServer` on a :class:`FakeZabbixAPI` with ``hosts`` hosts
+	"""
+	hosts = 50
+	api_options = {}
+	server_options = {}
+
+	def setUp(self):
+		self.api = FakeZabbixAPI(hosts=self.hosts, **dict({'groups': 5, 'templates': 5}, **self.api_options))
+		self.transport = FakeTransport(self.api)
+		self.server = self.connect()
+		self.api.reset_counters()
+
+	def connect(self, **options):
+		server = ZabbixServer("http://fake", transport=self.transport, **dict(self.server_options, **options))
+		server.login(self.api.user, self.api.password)
+		return server
+
+	def calls(self, method):
+		"""
+		:return: calls of an API method served by the fake
+		"""
+		return self.api.methods.get(method, 0)
@@ -0,0 +1,83 @@
+from __future__ import unicode_literals
+import sys
+import unittest
+from PyZabbixObj import Host, ZabbixRequestError
+from PyZabbixObj.testing import FakeZabbixAPI, FakeTransport, api_version
+
+if sys.version_info >= (3, 6):
+	import asyncio
+	from PyZabbixObj.aio import AsyncZabbixServer, ExecutorTransport
+
+
+@unittest.skipIf(sys.version_info < (3, 6), "asyncio client requires Python 3.6+")
+class AsyncServerTest(unittest.TestCase):
+	"""
+	:class:`AsyncZabbixServer` on the fake API, through a thread pool adapter of :class:`FakeTransport`
+	"""
+
+	def setUp(self):
+		self.api = FakeZabbixAPI(hosts=50, groups=5, templates=5)
+		self.loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(self.loop)
+		self.server = AsyncZabbixServer("http://fake", transport=ExecutorTransport(FakeTransport(self.api), workers=5))
+		self.wait(self.server.login(self.api.user, self.api.password))
+		self.api.reset_counters()
+
+	def tearDown(self):
+		self.wait(self.server.close())
+		self.loop.close()
+		asyncio.set_event_loop(None)
+
+	def wait(self, coroutine):
+		return self.loop.run_until_complete(coroutine)
+
+	def test_login_required(self):
+		server = AsyncZabbixServer("http://fake", transport=ExecutorTransport(FakeTransport(self.api)))
+		self.assertRaises(ZabbixRequestError, self.wait, server.do("get", "host", name="host000001"))
+		self.wait(server.close())
+
+	def test_concurrent_gets(self):
+		names = ["host%06d" % n for n in range(20)]
+		hosts = self.wait(asyncio.gather(*[self.server.do("get", "host", name=n) for n in names]))
+		self.assertEqual([h.host for h in hosts], names)
+		self.assertTrue(all(isinstance(h, Host) for h in hosts))
+		self.assertEqual(self.api.methods["host.get"], 20)
+		self.assertEqual(self.wait(self.server.do("get", "host", name="nothing")), None)
+
+	def test_identical_gets_coalesced(self):
+		hosts = self.wait(asyncio.gather(*[self.server.do("get", "host", name="host000001") for _ in range(5)]))
+		self.assertEqual(self.api.methods["host.get"], 1)
+		self.assertEqual(len(set(id(h) for h in hosts)), 5)
+		self.assertEqual(set(h.hostid for h in hosts), set([hosts[0].hostid]))
+
+	def test_create_and_get_object(self):
+		group = self.wait(self.server.get_object("hostgroup", "Async group"))
+		self.assertEqual(group.name, "Async group")
+		host = self.wait(self.server.get_object("host", "async01", groups=[group]))
+		self.assertEqual(host.host, "async01")
+		record = self.api.objects['host'][host.hostid]
+		self.assertEqual(record['groups'], [group.groupid])
+		self.assertEqual(record['interfaces'][0]['ip'], Host.standard_interface['ip'])
+		self.assertEqual(self.wait(self.server.get_object("hostgroup", "Missing", create=False)), None)
+		self.assertEqual(self.wait(self.server.get_object("hostgroup", group.groupid)).name, "Async group")
+
+	def test_version(self):
+		self.assertEqual(self.wait(self.server.get_version()), api_version)
+
+	def test_watch_events(self):
+		ids = [self.api.add_event("Event %s" % n)['eventid'] for n in range(3)]
+		stop = asyncio.Event()
+		watch = self.server.watch_events(eventid_from=ids[0], limit=2, min_interval=0.01, stop=stop)
+		self.assertEqual([self.wait(watch.__anext__())['eventid'] for _ in range(3)], ids)
+		stop.set()
+		self.wait(watch.aclose())
+		self.assertEqual(self.api.methods["event.get"], 2)
+
+	def test_stats_and_hooks(self):
+		sent = []
+		self.server.add_hook(pre=lambda request: sent.append(request['method']))
+		self.wait(self.server.do("get", "host", name="host000001"))
+		stats = self.server.stats()
+		self.assertEqual(stats['methods']['host.get']['count'], 1)
+		self.assertEqual(sent, ["host.get"])
+		self.assertTrue("pyzabbixobj_requests_total{method=\"host.get\"} 1" in self.server.prometheus().splitlines())
@@ -0,0 +1,71 @@
+from __future__ import unicode_literals
+import json
+from PyZabbixObj import Hostgroup, ZabbixRequestError
+from PyZabbixObj.testing import FakeTransport
+from tests.helpers import FakeServerTestCase
+
+
+class ShuffledTransport(FakeTransport):
+	"""
+	Returns the responses of a batch in reverse order, without the last one if ``drop_last``
+	"""
+	drop_last = False
+
+	def post(self, url, data, headers):
+		response = json.loads(FakeTransport.post(self, url, data, headers).decode("utf-8"))
+		if type(response) == list:
+			response = list(reversed(response[:-1] if self.drop_last else response))
+		return json.dumps(response).encode("utf-8")
+
+
+class BatchTest(FakeServerTestCase):
+
+	def test_one_round_trip(self):
+		with self.server.batch() as batch:
+			results = [batch.do("get", "host", name="host%06d" % i) for i in range(10)]
+		self.assertEqual(self.api.requests, 1)
+		self.assertEqual([r.result().host for r in results], ["host%06d" % i for i in range(10)])
+
+	def test_responses_matched_by_id(self):
+		self.transport = ShuffledTransport(self.api)
+		server = self.connect()
+		batch = server.batch()
+		results = [batch.call("hostgroup.get", filter={'name': "Group %s" % i}, output=["name"]) for i in range(5)]
+		batch.send()
+		self.assertEqual([r.result()[0]['name'] for r in results], ["Group %s" % i for i in range(5)])
+
+	def test_missing_response(self):
+		self.transport = ShuffledTransport(self.api)
+		server = self.connect()
+		batch = server.batch()
+		first = batch.call("apiinfo.version")
+		second = batch.call("apiinfo.version")
+		self.transport.drop_last = True
+		batch.send()
+		self.assertEqual(first.result(), "3.0.0")
+		self.assertRaises(ZabbixRequestError, second.result)
+
+	def test_per_call_errors(self):
+		with self.server.batch() as batch:
+			created = batch.do("create", "hostgroup", name="New group")
+			duplicate = batch.do("create", "hostgroup", name="Group 0")
+			missing = batch.do("get", "host", name="no-such-host")
+			wrong = batch.call("host.get", selectTemplates="extend")
+		self.assertTrue(isinstance(created.result(), Hostgroup))
+		self.assertRaises(ZabbixRequestError, duplicate.result)
+		self.assertEqual(missing.result(), None)
+		self.assertRaises(ZabbixRequestError, wrong.result)
+
+	def test_creates_loaded_with_one_get(self):
+		with self.server.batch() as batch:
+			results = [batch.do("create", "hostgroup", name="Batch group %s" % i) for i in range(20)]
+		self.assertEqual(self.api.requests, 2)
+		self.assertEqual(self.calls("hostgroup.get"), 1)
+		self.assertEqual([r.result().name for r in results], ["Batch group %s" % i for i in range(20)])
+		self.assertEqual(results[3].result().groupid, self.api.names['hostgroup']["Batch group 3"])
+
+	def test_not_sent(self):
+		batch = self.server.batch()
+		result = batch.call("apiinfo.version")
+		self.assertRaises(ZabbixRequestError, result.result)
+		self.assertEqual(len(batch), 1)
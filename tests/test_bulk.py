@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+from PyZabbixObj import Host, ZabbixRequestError
+from tests.helpers import FakeServerTestCase
+
+
+class GetManyTest(FakeServerTestCase):
+
+	def test_missing(self):
+		names = ["host000001", "host000002", "nothing", "host000001"]
+		hosts = self.server.get_many("host", names=names)
+		self.assertEqual(sorted(hosts), ["host000001", "host000002"])
+		self.assertEqual(hosts.missing, set(["nothing"]))
+		self.assertTrue(isinstance(hosts["host000001"], Host))
+
+	def test_ids_and_chunks(self):
+		ids = [h['hostid'] for h in self.api.objects['host'].values()][:25] + [1]
+		hosts = self.server.get_many("host", ids=ids, chunk_size=10)
+		self.assertEqual(len(hosts), 25)
+		self.assertEqual(hosts.missing, set(["1"]))
+		self.assertEqual(self.calls("host.get"), 3)
+
+	def test_compact(self):
+		hosts = self.server.get_many("host", names=["host000001", "host000006"], compact=True)
+		first, second = hosts["host000001"], hosts["host000006"]
+		self.assertTrue(isinstance(first.hostid, int))
+		self.assertEqual(first.groups, second.groups)
+		# Id tuples are shared by the records of one call
+		self.assertTrue(first.groups is second.groups)
+		self.assertEqual(first.interfaces[0].port, "10050")
+
+	def test_compact_equality(self):
+		first = self.server.get_many("host", names=["host000001"], compact=True)["host000001"]
+		second = self.server.get_many("host", names=["host000001"], compact=True)["host000001"]
+		self.assertEqual(first, second)
+		self.assertEqual(len(set([first, second])), 1)
+		# Repeated strings are stored once, on Python 2 too
+		hosts = self.server.get_many("host", names=["host000001", "host000002"], compact=True)
+		self.assertTrue(hosts["host000001"].interfaces[0].port is hosts["host000002"].interfaces[0].port)
+
+	def test_names_or_ids_required(self):
+		self.assertRaises(ZabbixRequestError, self.server.get_many, "host")
+
+
+class IterTest(FakeServerTestCase):
+
+	def test_pages(self):
+		hosts = list(self.server.iter("host", page_size=7, output=["host"]))
+		self.assertEqual(len(hosts), self.hosts)
+		self.assertEqual([int(h.hostid) for h in hosts], sorted(int(h.hostid) for h in hosts))
+		# One listing of the ids, then one get per page
+		self.assertEqual(self.calls("host.get"), 1 + (self.hosts + 6) // 7)
+
+	def test_filter(self):
+		group = self.server.do("get", "hostgroup", name="Group 1")
+		hosts = list(self.server.iter("host", groupids=[group.groupid], compact=True))
+		self.assertEqual(len(hosts), self.hosts // 5)
+		self.assertTrue(all(h.groups == (int(group.groupid),) for h in hosts))
+
+	def test_empty(self):
+		self.assertEqual(list(self.server.iter("host", filter={'host': "nothing"})), [])
+
+
+class WriteTest(FakeServerTestCase):
+
+	def test_create_and_delete_many(self):
+		group = self.server.do("get", "hostgroup", name="Group 0")
+		ids = self.server.create_many("host", [{'host': "new%s" % i, 'groups': group} for i in range(12)], chunk_size=5)
+		self.assertEqual(len(ids), 12)
+		self.assertEqual(self.calls("host.create"), 3)
+		self.assertEqual(self.api.objects['host'][ids[0]]['interfaces'][0]['port'], "10050")
+		self.assertEqual(self.server.delete_many("host", ids), ids)
+		self.assertEqual(self.server.get_many("host", ids=ids).missing, set(ids))
+
+	def test_mass_add_and_remove(self):
+		hosts = list(self.server.get_many("host", names=["host000000", "host000001", "host000002"]).values())
+		group = self.server.do("get", "hostgroup", name="Group 4")
+		template = self.server.do("get", "template", name="Template 4")
+		updated = self.server.mass_add(hosts, groups=[group], templates=[template], chunk_size=2)
+		self.assertEqual(sorted(updated), sorted(h.hostid for h in hosts))
+		self.assertEqual(self.calls("host.massadd"), 2)
+		record = self.api.objects['host'][hosts[0].hostid]
+		self.assertTrue(group.groupid in record['groups'])
+		self.assertTrue(template.templateid in record['parentTemplates'])
+		self.server.mass_remove(hosts, groups=[group], templates=[template])
+		self.assertFalse(group.groupid in record['groups'])
+		self.assertFalse(template.templateid in record['parentTemplates'])
+
+	def test_mass_update(self):
+		hosts = list(self.server.get_many("host", names=["host000000", "host000001"]).values())
+		group = self.server.do("get", "hostgroup", name="Group 3")
+		self.server.mass_update(hosts, groups=[group])
+		self.assertEqual(self.api.objects['host'][hosts[1].hostid]['groups'], [group.groupid])
+
+	def test_host_left_without_groups(self):
+		host = self.server.do("get", "host", name="host000000")
+		self.assertRaises(ZabbixRequestError, self.server.mass_remove, [host], groups=[host.groups[0]['groupid']])
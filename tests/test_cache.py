@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+from PyZabbixObj import ObjectCache, ZabbixServer
+from PyZabbixObj.testing import FakeZabbixAPI, FakeTransport
+from tests.helpers import FakeServerTestCase
+
+
+class ObjectCacheTest(FakeServerTestCase):
+	server_options = {'cache': None}
+
+	def setUp(self):
+		self.server_options = {'cache': ObjectCache(ttl=60)}
+		FakeServerTestCase.setUp(self)
+
+	def test_hit(self):
+		first = self.server.do("get", "host", name="host000001")
+		second = self.server.do("get", "host", id=first.hostid)
+		self.assertEqual(self.calls("host.get"), 1)
+		self.assertEqual(second.host, "host000001")
+
+	def test_shape(self):
+		self.server.do("get", "host", name="host000001")
+		self.server.do("get", "host", name="host000001", output=["host"])
+		self.assertEqual(self.calls("host.get"), 2)
+
+	def test_records_are_copies(self):
+		first = self.server.do("get", "host", name="host000001")
+		second = self.server.do("get", "host", name="host000001")
+		self.assertFalse(first.groups is second.groups)
+		first.groups.append({'groupid': "0"})
+		self.assertEqual(len(self.server.do("get", "host", name="host000001").groups), 1)
+
+	def test_invalidated_by_writes(self):
+		group = self.server.do("get", "hostgroup", name="Group 4")
+		hosts = self.server.get_many("host", names=["host000001"])
+		self.server.do("get", "host", name="host000001")
+		self.server.mass_add(list(hosts.values()), groups=[group])
+		self.assertEqual(len(self.server.do("get", "host", name="host000001").groups), 2)
+		self.assertEqual(self.calls("host.get"), 3)
+		self.server.delete_many("host", list(hosts.values()))
+		self.assertEqual(self.server.do("get", "host", name="host000001"), None)
+
+	def test_scoped_by_server(self):
+		other_api = FakeZabbixAPI(hosts=5)
+		other = ZabbixServer("http://other", transport=FakeTransport(other_api), cache=self.server.cache)
+		other.login(other_api.user, other_api.password)
+		mine = self.server.do("get", "host", name="host000001")
+		theirs = other.do("get", "host", name="host000001")
+		self.assertNotEqual(mine.hostid, theirs.hostid)
+		self.assertEqual(other_api.methods.get("host.get"), 1)
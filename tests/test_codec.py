@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import gc
+import unittest
+from PyZabbixObj import ZabbixRequestError
+from PyZabbixObj.codec import JSONCodec, codecs, get_codec, gzip_compress, gzip_decompress, gzip_decompress_stream
+from PyZabbixObj.testing import FakeTransport
+from tests.helpers import FakeServerTestCase
+
+
+class CodecTest(unittest.TestCase):
+
+	record = {'jsonrpc': "2.0", 'result': [{'hostid': "10001", 'name': "café", 'groups': [{'groupid': "2"}]}], 'id': 1}
+
+	def test_installed_codecs_round_trip(self):
+		for name, codec_class, library in codecs:
+			if library is None:
+				continue
+			codec = get_codec(name)
+			self.assertTrue(isinstance(codec, codec_class))
+			encoded = codec.dumps(self.record)
+			self.assertEqual(codec.loads(encoded), self.record)
+			self.assertEqual(codec.loads(encoded if isinstance(encoded, bytes) else encoded.encode("utf-8")), self.record)
+
+	def test_get_codec(self):
+		codec = JSONCodec()
+		self.assertTrue(get_codec(codec) is codec)
+		self.assertTrue(isinstance(get_codec(), JSONCodec))
+		self.assertRaises(ZabbixRequestError, get_codec, "nothing")
+
+	def test_gc_pause_is_opt_in(self):
+		codec = JSONCodec()
+		self.assertEqual(codec.gc_pause_size, None)
+		codec.gc_pause_size = 1
+		self.assertEqual(codec.loads(codec.dumps(self.record)), self.record)
+		self.assertTrue(gc.isenabled())
+
+
+class GzipTest(unittest.TestCase):
+
+	body = ('{"result": [%s]}' % ", ".join('{"hostid": "%s"}' % i for i in range(1000))).encode("utf-8")
+
+	def test_round_trip(self):
+		compressed = gzip_compress(self.body)
+		self.assertTrue(len(compressed) < len(self.body) // 5)
+		self.assertEqual(gzip_decompress(compressed), self.body)
+		self.assertEqual(gzip_decompress(self.body), self.body)
+		self.assertEqual(gzip_decompress(gzip_compress(self.body.decode("utf-8"))), self.body)
+
+	def test_stream(self):
+		compressed = gzip_compress(self.body)
+		for size in (1, 7, 4096):
+			chunks = [compressed[i:i + size] for i in range(0, len(compressed), size)]
+			self.assertEqual(b"".join(gzip_decompress_stream(chunks)), self.body)
+		self.assertEqual(b"".join(gzip_decompress_stream([self.body[:1], self.body[1:]])), self.body)
+		self.assertEqual(list(gzip_decompress_stream([])), [])
+
+
+class RecordingTransport(FakeTransport):
+
+	def __init__(self, api):
+		FakeTransport.__init__(self, api)
+		self.headers = []
+
+	def post(self, url, data, headers):
+		self.headers.append(dict(headers))
+		return FakeTransport.post(self, url, data, headers)
+
+
+class CompressedServerTest(FakeServerTestCase):
+	hosts = 300
+
+	def setUp(self):
+		FakeServerTestCase.setUp(self)
+		self.transport = RecordingTransport(self.api)
+
+	def test_compressed_exchanges(self):
+		plain = self.connect()
+		compressed = self.connect(compress=True)
+		compressed.compress_min_size = 1024
+		names = ["host%06d" % n for n in range(self.hosts)]
+		expected = sorted(plain.get_many("host", names=names, chunk_size=self.hosts))
+		self.assertEqual(self.transport.headers[-1].get('Content-Encoding'), None)
+		self.assertEqual(self.transport.headers[-1]['Accept-Encoding'], "identity")
+		self.assertEqual(sorted(compressed.get_many("host", names=names, chunk_size=self.hosts)), expected)
+		self.assertEqual(self.transport.headers[-1].get('Content-Encoding'), "gzip")
+		self.assertEqual(self.transport.headers[-1]['Accept-Encoding'], "gzip")
+		# Bytes counted on the wire
+		received = [s.stats()['methods']['host.get']['response_bytes'] for s in (plain, compressed)]
+		self.assertTrue(received[1] < received[0] // 3)
+
+	def test_small_requests_not_compressed(self):
+		self.connect(compress=True).do("get", "host", name="host000001")
+		self.assertEqual(self.transport.headers[-1].get('Content-Encoding'), None)
+		self.assertEqual(self.transport.headers[-1]['Accept-Encoding'], "gzip")
+
+	def test_codec_option(self):
+		server = self.connect(codec="json")
+		self.assertEqual(server.codec.name, "json")
+		self.assertEqual(server.do("get", "host", name="host000001").host, "host000001")
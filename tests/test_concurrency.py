@@ -0,0 +1,88 @@
+from __future__ import unicode_literals
+import threading
+import time
+import unittest
+from PyZabbixObj import ZabbixRequestError
+from PyZabbixObj.concurrency import SingleFlight
+from PyZabbixObj.testing import FakeTransport
+from tests.helpers import FakeServerTestCase
+
+
+class SlowTransport(FakeTransport):
+
+	def post(self, url, data, headers):
+		time.sleep(0.2)
+		return FakeTransport.post(self, url, data, headers)
+
+
+def run_threads(target, count):
+	threads = [threading.Thread(target=target) for _ in range(count)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+
+class SingleFlightTest(unittest.TestCase):
+
+	def test_shared_error(self):
+		flight = SingleFlight()
+		errors = []
+		def fail():
+			time.sleep(0.1)
+			raise ValueError("down")
+		def call():
+			try:
+				flight.do("key", fail)
+			except ValueError as e:
+				errors.append(e)
+		run_threads(call, 4)
+		self.assertEqual(len(errors), 4)
+		self.assertEqual(flight.stats()['calls'] + flight.stats()['shared'], 4)
+
+	def test_every_caller_gets_a_copy(self):
+		flight = SingleFlight()
+		shared = {'result': [1, 2]}
+		results = []
+		def slow():
+			time.sleep(0.1)
+			return shared
+		run_threads(lambda: results.append(flight.do("key", slow, dict)), 4)
+		self.assertEqual(results, [shared] * 4)
+		self.assertFalse(any(r is shared for r in results))
+
+
+class CoalescingTest(FakeServerTestCase):
+
+	def setUp(self):
+		FakeServerTestCase.setUp(self)
+		self.transport = SlowTransport(self.api)
+		self.server = self.connect()
+		self.api.reset_counters()
+
+	def get_hosts(self):
+		return self.server._request_handler({'jsonrpc': "2.0", 'method': "host.get", 'auth': self.server.auth,
+			'params': {'output': ["hostid"]}, 'id': 1})
+
+	def test_identical_reads_coalesced(self):
+		responses = []
+		run_threads(lambda: responses.append(self.get_hosts()), 5)
+		self.assertEqual(self.calls("host.get"), 1)
+		self.assertEqual(self.server.stats()['coalescing'], {'calls': 1, 'shared': 4})
+		# Each caller owns its response
+		self.assertEqual(len(set(id(r['result']) for r in responses)), 5)
+		self.assertTrue(all(r == responses[0] for r in responses))
+
+	def test_writes_not_coalesced(self):
+		def create():
+			try:
+				self.server.do("create", "hostgroup", name="Concurrent group")
+			except ZabbixRequestError:
+				pass
+		run_threads(create, 3)
+		self.assertEqual(self.calls("hostgroup.create"), 3)
+
+	def test_disabled(self):
+		self.server.coalesce = False
+		run_threads(self.get_hosts, 3)
+		self.assertEqual(self.calls("host.get"), 3)
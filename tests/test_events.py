@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from PyZabbixObj.events import load_watermark, save_watermark
+from tests.helpers import FakeServerTestCase
+
+
+class WatermarkTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, "eventid")
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_round_trip(self):
+		self.assertEqual(load_watermark(self.path), None)
+		save_watermark(self.path, 12345)
+		self.assertEqual(load_watermark(self.path), 12345)
+		self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+
+class WatchEventsTest(FakeServerTestCase):
+	hosts = 5
+
+	def setUp(self):
+		FakeServerTestCase.setUp(self)
+		self.stop = threading.Event()
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		self.stop.set()
+		shutil.rmtree(self.directory)
+
+	def watch(self, **kwargs):
+		return self.server.watch_events(min_interval=0.01, max_interval=0.05, stop=self.stop, **kwargs)
+
+	def take(self, watch, count):
+		return [next(watch)['eventid'] for _ in range(count)]
+
+	def test_starts_after_the_latest_event(self):
+		self.api.add_event("Old")
+		watch = self.watch()
+		timer = threading.Timer(0.1, self.api.add_event, ("New",))
+		timer.start()
+		self.assertEqual(next(watch)['name'], "New")
+		timer.join()
+		watch.close()
+
+	def test_pages_from_eventid(self):
+		ids = [self.api.add_event("Event %s" % n)['eventid'] for n in range(5)]
+		watch = self.watch(eventid_from=ids[0], limit=2)
+		self.assertEqual(self.take(watch, 5), ids)
+		watch.close()
+		self.assertEqual(self.calls("event.get"), 3)
+
+	def test_filter(self):
+		problem = self.api.add_event("Problem", value=1)
+		self.api.add_event("Recovery", value=0)
+		second = self.api.add_event("Problem", value=1)
+		watch = self.watch(eventid_from=problem['eventid'], value=1)
+		self.assertEqual(self.take(watch, 2), [problem['eventid'], second['eventid']])
+		watch.close()
+
+	def test_resume_from_watermark(self):
+		path = os.path.join(self.directory, "eventid")
+		ids = [self.api.add_event("Event %s" % n)['eventid'] for n in range(3)]
+		save_watermark(path, int(ids[0]) - 1)
+		watch = self.watch(watermark_file=path)
+		self.assertEqual(self.take(watch, 2), ids[:2])
+		watch.close()
+		# The event being processed when the watch stopped is returned again
+		self.assertEqual(load_watermark(path), int(ids[0]))
+		watch = self.watch(watermark_file=path)
+		self.assertEqual(self.take(watch, 2), ids[1:])
+		watch.close()
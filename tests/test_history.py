@@ -0,0 +1,59 @@
+from __future__ import unicode_literals
+import unittest
+from PyZabbixObj import history
+from PyZabbixObj.testing import history_start
+from tests.helpers import FakeServerTestCase
+
+
+class WindowsTest(unittest.TestCase):
+
+	def test_windows_cover_the_range(self):
+		self.assertEqual(list(history._windows(0, 250, 100)), [(0, 99), (100, 199), (200, 250)])
+		self.assertEqual(list(history._windows(10, 10, 100)), [(10, 10)])
+
+	def test_tasks(self):
+		tasks = list(history._tasks([1, 2, 3], 0, 199, 100, 2))
+		self.assertEqual(tasks, [(["1", "2"], 0, 99), (["1", "2"], 100, 199), (["3"], 0, 99), (["3"], 100, 199)])
+
+	def test_unsigned_type_code(self):
+		import array
+		self.assertEqual(array.array(history.history_value_types[3][0], [2 ** 32]).tolist(), [2 ** 32])
+
+
+@unittest.skipIf(history.numpy is None, "history retrieval requires numpy")
+class HistoryTest(FakeServerTestCase):
+	hosts = 3
+	api_options = {'items_per_host': 2, 'history_per_item': 180}
+
+	def setUp(self):
+		FakeServerTestCase.setUp(self)
+		self.items = dict((i['hostid'] + i['key_'], i['itemid']) for i in self.api.objects['item'].values())
+		self.floats = sorted((i for (k, i) in self.items.items() if k.endswith("[0]")), key=int)
+		self.unsigned = sorted((i for (k, i) in self.items.items() if k.endswith("[1]")), key=int)
+		self.api.reset_counters()
+
+	def test_float_history_in_windows(self):
+		values = self.server.history(self.floats, history_start, history_start + 179 * 60, window=3600, workers=3)
+		self.assertEqual(sorted(values), self.floats)
+		data = values[self.floats[0]]
+		self.assertEqual(len(data), 180)
+		self.assertEqual(data["clock"][0], history_start)
+		self.assertTrue((data["clock"][1:] > data["clock"][:-1]).all())
+		self.assertEqual(data["value"][10], 10.0)
+		self.assertEqual(data["ns"][10], 10)
+		# 3 windows of an hour for the items of a single request
+		self.assertEqual(self.api.methods["history.get"], 3)
+
+	def test_unsigned_history_as_array(self):
+		data = self.server.history(self.unsigned, history_start, history_start + 59 * 60, history=3, as_array=True)
+		self.assertEqual(len(data), 60 * len(self.unsigned))
+		self.assertEqual(sorted(set(int(i) for i in data["itemid"])), [int(i) for i in self.unsigned])
+		self.assertEqual(data["value"].dtype.kind, "u")
+		self.assertEqual(int(data["value"][1]), 10 + 1)
+
+	def test_trends(self):
+		trends = self.server.trends(self.floats[:1], history_start, history_start + 180 * 60)
+		data = trends[self.floats[0]]
+		self.assertEqual(sum(data["num"]), 180)
+		self.assertTrue((data["value_min"] <= data["value_avg"]).all())
+		self.assertTrue((data["value_avg"] <= data["value_max"]).all())
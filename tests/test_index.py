@@ -0,0 +1,76 @@
+from __future__ import unicode_literals
+import unittest
+from PyZabbixObj.index import HostIndex
+from tests.helpers import FakeServerTestCase
+
+
+def _host(hostid, host, groups=(), templates=(), ips=()):
+	return {'hostid': hostid, 'host': host, 'groups': [{'groupid': g} for g in groups],
+		'parentTemplates': [{'templateid': t} for t in templates], 'interfaces': [{'ip': ip} for ip in ips]}
+
+
+class HostIndexTest(unittest.TestCase):
+
+	def setUp(self):
+		self.index = HostIndex([
+			_host("3", "web03", groups=["1"], templates=["9"], ips=["10.0.0.3"]),
+			_host("1", "web01", groups=["1", "2"], ips=["10.0.0.1"]),
+			_host("2", "db01", groups=["2"], templates=["9"], ips=["10.0.0.1"]),
+		])
+
+	def test_lookups(self):
+		self.assertEqual([h['hostid'] for h in self.index.in_group("1")], ["1", "3"])
+		self.assertEqual([h['hostid'] for h in self.index.with_template({'templateid': "9"})], ["2", "3"])
+		self.assertEqual([h['hostid'] for h in self.index.by_ip("10.0.0.1")], ["1", "2"])
+		self.assertEqual(self.index.by_name("db01")['hostid'], "2")
+		self.assertEqual(self.index.by_name("nothing"), None)
+		self.assertEqual(self.index.get(3)['host'], "web03")
+		self.assertTrue("1" in self.index)
+		self.assertEqual(len(self.index), 3)
+
+	def test_prefix_and_range(self):
+		self.assertEqual([h['host'] for h in self.index.prefix("web")], ["web01", "web03"])
+		self.assertEqual([h['host'] for h in self.index.range("db", "web02")], ["db01", "web01"])
+		self.assertEqual([h['host'] for h in self.index.range("web02")], ["web03"])
+
+	def test_replace_and_remove(self):
+		self.index.add(_host("1", "app01", groups=["2"], ips=["10.0.0.9"]))
+		self.assertEqual([h['hostid'] for h in self.index.in_group("1")], ["3"])
+		self.assertEqual([h['hostid'] for h in self.index.by_ip("10.0.0.1")], ["2"])
+		self.assertEqual(self.index.by_name("web01"), None)
+		self.assertEqual([h['host'] for h in self.index.prefix("")], ["app01", "db01", "web03"])
+		self.index.remove(["2", {'hostid': "3"}])
+		self.assertEqual([h['host'] for h in self.index], ["app01"])
+		self.assertEqual([h['host'] for h in self.index.in_group("2")], ["app01"])
+		self.assertEqual(self.index.with_template("9"), [])
+
+
+class ServerIndexTest(FakeServerTestCase):
+
+	def setUp(self):
+		super(ServerIndexTest, self).setUp()
+		self.index = self.server.index_hosts(page_size=20)
+		self.api.reset_counters()
+
+	def test_build(self):
+		self.assertEqual(len(self.index), self.hosts)
+		group = self.api.names['hostgroup']["Group 0"]
+		expected = sorted(int(i) for (i, h) in self.api.objects['host'].items() if group in h['groups'])
+		self.assertEqual([int(h.hostid) for h in self.index.in_group(group)], expected)
+
+	def test_follows_writes(self):
+		group = self.api.names['hostgroup']["Group 1"]
+		hostid = self.server.create_many("host", [{'host': "web99", 'groups': [group]}])[0]
+		self.assertEqual(self.index.by_name("web99").hostid, hostid)
+		self.server.delete_many("host", [hostid])
+		self.assertFalse(hostid in self.index)
+
+	def test_one_refresh_per_batch(self):
+		hostids = sorted(self.api.objects['host'], key=int)[:20]
+		with self.server.batch() as batch:
+			for hostid in hostids:
+				batch.call("host.update", hostid=hostid, name="Renamed %s" % hostid)
+		self.assertEqual(self.api.requests, 2)
+		self.assertEqual(self.calls("host.get"), 1)
+		self.assertEqual([self.index.get(i).name for i in hostids], ["Renamed %s" % i for i in hostids])
+		self.assertEqual(len(self.index), self.hosts)
@@ -0,0 +1,32 @@
+from __future__ import unicode_literals
+from PyZabbixObj import Item
+from PyZabbixObj.testing import history_start
+from tests.helpers import FakeServerTestCase
+
+
+class LatestValuesTest(FakeServerTestCase):
+	hosts = 12
+	api_options = {'items_per_host': 3, 'history_per_item': 5}
+
+	def test_all_hosts(self):
+		values = self.server.latest_values()
+		self.assertEqual(len(values), self.hosts)
+		hostid = sorted(values, key=int)[0]
+		self.assertEqual(values[hostid], {'item[0]': "4.0", 'item[1]': "41", 'item[2]': "5.0"})
+		self.assertEqual(self.calls("item.get"), 1)
+
+	def test_chunks_and_keys(self):
+		hostids = sorted(self.api.objects['host'], key=int)
+		values = self.server.latest_values(hostids=hostids[:10], keys=["item[1]"], with_clock=True, chunk_size=4)
+		self.assertEqual(sorted(values, key=int), hostids[:10])
+		self.assertEqual(values[hostids[0]], {'item[1]': ("41", history_start + 4 * 60)})
+		self.assertEqual(self.calls("item.get"), 3)
+
+	def test_keys_stored_once(self):
+		values = self.server.latest_values()
+		first, second = [values[h] for h in sorted(values, key=int)[:2]]
+		self.assertTrue(all(any(k is other for other in second) for k in first))
+
+	def test_item_object(self):
+		item = self.server.get_many("item", ids=sorted(self.api.objects['item'], key=int)[:1])
+		self.assertTrue(isinstance(list(item.values())[0], Item))
@@ -0,0 +1,61 @@
+from __future__ import unicode_literals
+from tests.helpers import FakeServerTestCase
+from tests.test_concurrency import SlowTransport, run_threads
+
+
+class LazyLoadingTest(FakeServerTestCase):
+
+	def test_extend_has_no_loader(self):
+		host = self.server.do("get", "host", name="host000001")
+		self.assertFalse(hasattr(host, "no_such_field"))
+		self.assertEqual(getattr(host, "templates", None), None)
+		self.assertEqual(self.calls("host.get"), 1)
+
+	def test_projection_loads_missing_fields(self):
+		hosts = self.server.get_many("host", names=["host000001", "host000002"], output=["host"])
+		self.assertEqual(hosts["host000001"].status, "0")
+		self.assertEqual(hosts["host000002"].status, "0")
+		self.assertEqual(len(hosts["host000002"].groups), 1)
+		# One get per attribute for all the objects of the query
+		self.assertEqual(self.calls("host.get"), 3)
+
+	def test_host_templates(self):
+		host = self.server.do("get", "host", name="host000001", output=["host"])
+		self.assertEqual(host.templates[0]['host'], "Template 1")
+		selected = self.server.do("get", "host", name="host000001", output=["host"], selectParentTemplates="extend")
+		self.assertEqual(selected.templates, selected.parentTemplates)
+		self.assertEqual(self.calls("host.get"), 3)
+
+	def test_fetched_fields_not_reloaded(self):
+		host = self.server.do("get", "host", name="host000001", output=["host"], selectGroups="extend")
+		self.assertEqual(len(host.groups), 1)
+		self.assertFalse(hasattr(host, "no_such_field"))
+		self.assertFalse(hasattr(host, "no_such_field"))
+		self.assertEqual(self.calls("host.get"), 2)
+
+	def test_failure_is_attribute_error(self):
+		host = self.server.do("get", "host", name="host000001", output=["host"])
+		self.server.auth = "expired"
+		self.assertFalse(hasattr(host, "status"))
+		self.assertEqual(getattr(host, "name", "default"), "default")
+
+	def test_iter_page_loaded_once(self):
+		names = [h.name for h in self.server.iter("host", page_size=20, output=["host"])]
+		self.assertEqual(len(names), self.hosts)
+		self.assertEqual(self.calls("host.get"), 1 + 3 + 3)
+
+	def test_str_does_not_load(self):
+		host = self.server.do("get", "host", name="host000001", output=["host"])
+		self.assertEqual(str(host), "Host hostid=%s" % host.hostid)
+		self.assertEqual(self.calls("host.get"), 1)
+		hosts = self.server.get_many("host", names=["host000001"])
+		self.assertEqual(repr(hosts["host000001"]), "Host Host 1")
+
+	def test_threads_load_once(self):
+		host = self.server.do("get", "host", name="host000001", output=["host"])
+		self.server.transport = SlowTransport(self.api)
+		self.server.coalesce = False
+		statuses = []
+		run_threads(lambda: statuses.append(host.status), 4)
+		self.assertEqual(statuses, ["0"] * 4)
+		self.assertEqual(self.calls("host.get"), 2)
@@ -0,0 +1,51 @@
+from __future__ import unicode_literals
+import time
+import unittest
+from PyZabbixObj import ZabbixRequestError
+from PyZabbixObj.concurrency import RateLimiter
+from tests.helpers import FakeServerTestCase
+
+
+class RateLimiterTest(unittest.TestCase):
+
+	def test_rate(self):
+		limiter = RateLimiter(50)
+		start = time.time()
+		for _ in range(11):
+			limiter.acquire()
+		self.assertTrue(time.time() - start >= 0.18)
+
+	def test_burst(self):
+		limiter = RateLimiter(1, burst=5)
+		start = time.time()
+		for _ in range(5):
+			limiter.acquire()
+		self.assertTrue(time.time() - start < 0.5)
+
+	def test_invalid_rate(self):
+		self.assertRaises(ValueError, RateLimiter, 0)
+
+
+class MapTest(FakeServerTestCase):
+
+	def test_results_in_order(self):
+		names = ["host%06d" % n for n in range(30)]
+		hosts = self.server.map("get", "host", [{'name': n} for n in names], workers=8)
+		self.assertEqual([h.host for h in hosts], names)
+		self.assertEqual(self.calls("host.get"), 30)
+
+	def test_first_error_raised(self):
+		kwargs = [{'name': "Map group"}, {'name': "Map group"}, {'name': "Other map group"}]
+		self.assertRaises(ZabbixRequestError, self.server.map, "create", "hostgroup", kwargs, workers=1)
+		self.assertTrue("Other map group" in self.api.names['hostgroup'])
+
+	def test_return_exceptions(self):
+		kwargs = [{'name': "Map group"}, {'name': "Map group"}]
+		results = self.server.map("create", "hostgroup", kwargs, workers=1, return_exceptions=True)
+		self.assertEqual(results[0].name, "Map group")
+		self.assertTrue(isinstance(results[1], ZabbixRequestError))
+
+	def test_rate_limit(self):
+		start = time.time()
+		self.server.map("get", "host", [{'name': "host%06d" % n} for n in range(6)], workers=6, rate_limit=25)
+		self.assertTrue(time.time() - start >= 0.18)
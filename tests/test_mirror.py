@@ -0,0 +1,48 @@
+from __future__ import unicode_literals
+import time
+from tests.helpers import FakeServerTestCase
+
+
+class MirrorTest(FakeServerTestCase):
+
+	def setUp(self):
+		FakeServerTestCase.setUp(self)
+		self.mirror = self.server.mirror(":memory:", max_staleness=3600)
+
+	def tearDown(self):
+		self.mirror.close()
+
+	def wait_refresh(self, refreshes):
+		deadline = time.time() + 10
+		while self.mirror.refreshes < refreshes and time.time() < deadline:
+			time.sleep(0.01)
+
+	def test_reads(self):
+		host = self.mirror.do("get", "host", name="host000003")
+		self.assertEqual(host.host, "host000003")
+		group = self.mirror.get("hostgroup", "Group 3")
+		self.assertEqual(len(self.mirror.hosts(groupid=group['groupid'])), self.hosts // 5)
+		self.assertEqual([h['host'] for h in self.mirror.hosts(ip="10.0.0.3")], ["host000003"])
+		self.api.reset_counters()
+		self.mirror.get("host", "host000004")
+		self.assertEqual(self.api.calls, 0)
+
+	def test_refresh_writes_differences(self):
+		self.mirror.refresh()
+		hostid = self.api.names['host']["host000001"]
+		self.api.objects['host'][hostid]['name'] = "Changed"
+		self.server.delete_many("host", [self.api.names['host']["host000002"]])
+		self.assertEqual(self.mirror.refresh()['host'], {'written': 1, 'deleted': 1})
+		self.assertEqual(self.mirror.get("host", hostid)['name'], "Changed")
+		self.assertEqual(self.mirror.get("host", "host000002"), None)
+
+	def test_stale_reads_served_while_refreshing(self):
+		self.mirror.refresh()
+		self.server.delete_many("host", [self.api.names['host']["host000002"]])
+		self.mirror.max_staleness = 0
+		# Answered from the current rows: the background refresh cannot write before the lock is released
+		with self.mirror._lock:
+			self.assertNotEqual(self.mirror.get("host", "host000002"), None)
+		self.wait_refresh(2)
+		self.mirror.max_staleness = 3600
+		self.assertEqual(self.mirror.get("host", "host000002"), None)
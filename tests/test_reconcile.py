@@ -0,0 +1,53 @@
+from __future__ import unicode_literals
+from PyZabbixObj.testing import interface_required
+from tests.helpers import FakeServerTestCase
+
+
+class ReconcileTest(FakeServerTestCase):
+
+	desired = {
+		'groups': ["Web servers"],
+		'hosts': {
+			"web01": {'groups': ["Web servers"], 'templates': ["Template 0"], 'name': "Web 01"},
+			"host000001": {'groups': ["Web servers", "Group 0"], 'templates': [], 'name': "Renamed",
+				'interfaces': [{'ip': "10.9.9.9"}]},
+		}
+	}
+
+	def test_dry_run(self):
+		plan = self.server.reconcile(self.desired, dry_run=True)
+		self.assertEqual([step.method for step in plan],
+			["hostgroup.create", "host.create", "host.massadd", "host.massremove", "host.update"])
+		self.assertFalse("web01" in self.api.names['host'])
+
+	def test_apply(self):
+		self.server.reconcile(self.desired)
+		group = self.api.names['hostgroup']["Web servers"]
+		web = self.api.objects['host'][self.api.names['host']["web01"]]
+		self.assertEqual(web['groups'], [group])
+		self.assertEqual(web['parentTemplates'], [self.api.names['template']["Template 0"]])
+		host = self.api.objects['host'][self.api.names['host']["host000001"]]
+		self.assertEqual(sorted(host['groups']), sorted([group, self.api.names['hostgroup']["Group 0"]]))
+		self.assertEqual(host['parentTemplates'], [])
+		self.assertEqual(host['name'], "Renamed")
+		self.assertEqual([i['ip'] for i in host['interfaces']], ["10.9.9.9"])
+		self.assertEqual(len(self.server.reconcile(self.desired, dry_run=True)), 0)
+
+	def test_create_with_partial_interfaces(self):
+		desired = {'hosts': {
+			"web02": {'groups': ["Group 0"], 'interfaces': [{'ip': "10.0.0.2"}]},
+			"web03": {'groups': ["Group 0"]},
+		}}
+		self.server.reconcile(desired)
+		web02 = self.api.objects['host'][self.api.names['host']["web02"]]
+		self.assertEqual([tuple(i[f] for f in interface_required) for i in web02['interfaces']],
+			[("1", "1", "1", "10.0.0.2", "", "10050")])
+		web03 = self.api.objects['host'][self.api.names['host']["web03"]]
+		self.assertEqual([i['ip'] for i in web03['interfaces']], ["127.0.0.1"])
+		self.assertEqual(len(self.server.reconcile(desired, dry_run=True)), 0)
+
+	def test_delete_extra(self):
+		desired = {'hosts': {"host000000": {'groups': ["Group 0"]}}}
+		plan = self.server.reconcile(desired, delete_extra=True)
+		self.assertEqual([step.method for step in plan], ["host.delete"])
+		self.assertEqual(len([h for h in self.api.objects['host'].values() if "10001" in h['groups']]), 1)
@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+import unittest
+import PyZabbixObj
+from PyZabbixObj import GenericZabbixObject, Hostgroup, ZabbixRequestError, register_object_type
+from PyZabbixObj.registry import ObjectType, lookup, object_types
+from tests.helpers import FakeServerTestCase
+
+
+class Usergroup(GenericZabbixObject):
+	pass
+
+
+class ObjectTypeTest(unittest.TestCase):
+
+	def test_builtin_types(self):
+		hostgroup = lookup("hostgroup")
+		self.assertTrue(lookup(hostgroup) is hostgroup)
+		self.assertTrue(Hostgroup._type is hostgroup)
+		self.assertEqual((hostgroup.id_field, hostgroup.name_field, hostgroup.ids_param), ("groupid", "name", "groupids"))
+		self.assertEqual(hostgroup.methods['get'], "hostgroup.get")
+		self.assertEqual(lookup("host").selects['templates'], ("selectParentTemplates", "parentTemplates"))
+		self.assertEqual(lookup("nothing"), None)
+
+	def test_defaults(self):
+		registered = ObjectType("usergroup", Usergroup, "usrgrpid")
+		self.assertEqual((registered.name_field, registered.ids_param), ("usrgrpid", "usrgrpids"))
+		self.assertEqual(registered.get_options, {'output': "extend"})
+		self.assertEqual(registered.record_class.fields, ("usrgrpid",))
+
+
+class RegisterObjectTypeTest(FakeServerTestCase):
+
+	def setUp(self):
+		FakeServerTestCase.setUp(self)
+		self.registered = register_object_type("usergroup", Usergroup, "usrgrpid", "name", create_from_name=False)
+
+	def tearDown(self):
+		del object_types["usergroup"]
+		PyZabbixObj.allowed_objects.remove("usergroup")
+		del PyZabbixObj.search_by_id["usergroup"]
+		del PyZabbixObj.search_by_name["usergroup"]
+		Usergroup._type = None
+
+	def test_registration(self):
+		self.assertTrue(object_types["usergroup"] is self.registered)
+		self.assertTrue(Usergroup._type is self.registered)
+		self.assertTrue("usergroup" in PyZabbixObj.allowed_objects)
+		self.assertEqual(PyZabbixObj.search_by_name["usergroup"], "name")
+		self.assertEqual(self.registered.record_class.fields, ("usrgrpid", "name"))
+
+	def test_requests_use_the_registered_methods(self):
+		try:
+			self.server.do("get", "usergroup", name="Operators")
+			self.fail("the fake API has no usergroup.get")
+		except ZabbixRequestError:
+			pass
+		self.assertEqual(self.calls("usergroup.get"), 1)
+
+	def test_operation_classes_built_once(self):
+		operation = self.server.class_constructor("get", "usergroup")
+		self.assertTrue(self.server.class_constructor("get", "usergroup") is operation)
+		self.assertTrue(operation.object_type is self.registered)
+		self.assertFalse(self.server.class_constructor("delete", "usergroup") is operation)
@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+import time
+import unittest
+from PyZabbixObj import ZabbixSender, ZabbixRequestError
+from PyZabbixObj.sender import _Connection, _packet
+from PyZabbixObj.testing import FakeTrapperServer
+
+
+class SenderTest(unittest.TestCase):
+
+	def setUp(self):
+		self.trappers = [FakeTrapperServer(accept=lambda value: value['key'] != "unknown") for _ in range(3)]
+
+	def tearDown(self):
+		for trapper in self.trappers:
+			trapper.close()
+
+	def test_batches(self):
+		with ZabbixSender([t.address for t in self.trappers], batch_size=100) as sender:
+			results = sender.send_many(("host%s" % (i % 50), "unknown" if i % 100 == 0 else "app.requests", i)
+				for i in range(1000))
+			results += sender.flush()
+		self.assertEqual(sum(r.count for r in results), 1000)
+		self.assertEqual(sender.stats()['processed'], 990)
+		self.assertEqual(sender.stats()['failed'], 10)
+		self.assertEqual(sum(len(t.values) for t in self.trappers), 990)
+		# A host always goes to the same server
+		for trapper in self.trappers:
+			hosts = set(v['host'] for v in trapper.values)
+			for other in self.trappers:
+				if other is not trapper:
+					self.assertFalse(hosts.intersection(v['host'] for v in other.values))
+
+	def test_keepalive(self):
+		trapper = FakeTrapperServer(keepalive=True)
+		try:
+			with ZabbixSender([trapper.address], batch_size=10, keepalive=True) as sender:
+				sender.send_many(("web01", "app.requests", i, 1500000000) for i in range(100))
+			self.assertEqual(trapper.packets, 10)
+			self.assertEqual(trapper.connections, 1)
+			self.assertEqual(trapper.values[0]['clock'], 1500000000)
+		finally:
+			trapper.close()
+
+	def test_servers_pushed_in_parallel(self):
+		def slow(value):
+			time.sleep(0.3)
+			return True
+		trappers = [FakeTrapperServer(accept=slow) for _ in range(2)]
+		try:
+			sender = ZabbixSender([t.address for t in trappers], batch_size=1, flush_interval=None)
+			hosts = dict((sender.__route__("host%s" % i), "host%s" % i) for i in range(20))
+			start = time.time()
+			self.assertEqual(sender.send(hosts[0], "app.requests", 1), [])
+			self.assertEqual(sender.send(hosts[1], "app.requests", 1), [])
+			# Full batches are sent by the pool, not by the caller
+			self.assertTrue(time.time() - start < 0.2)
+			self.assertEqual(len(sender.flush()), 2)
+			self.assertTrue(time.time() - start < 0.55)
+			sender.close()
+		finally:
+			for trapper in trappers:
+				trapper.close()
+
+	def test_idle_flush(self):
+		sender = ZabbixSender([self.trappers[0].address], flush_interval=0.2)
+		try:
+			sender.send("web01", "app.requests", 1)
+			time.sleep(0.6)
+			self.assertEqual(len(self.trappers[0].values), 1)
+			self.assertEqual(len(sender.flush()), 1)
+		finally:
+			sender.close()
+
+	def test_failed_batch_keeps_other_results(self):
+		down = FakeTrapperServer()
+		down.close()
+		sender = ZabbixSender([self.trappers[0].address, down.address], batch_size=1, flush_interval=None)
+		hosts = dict((sender.__route__("host%s" % i), "host%s" % i) for i in range(20))
+		sender.send(hosts[0], "app.requests", 1)
+		sender.send(hosts[1], "app.requests", 1)
+		try:
+			sender.flush()
+			self.fail("flush did not raise")
+		except ZabbixRequestError as e:
+			self.assertEqual(len(e.results), 1)
+			self.assertEqual(len(e.errors), 1)
+		self.assertEqual(sender.stats()['processed'], 1)
+		sender.close()
+
+	def test_values_never_sent_twice(self):
+		seen = []
+		def crash(value):
+			seen.append(value)
+			if value['key'] == "crash":
+				raise ValueError("server crash")
+			return True
+		trapper = FakeTrapperServer(accept=crash, keepalive=True)
+		try:
+			with ZabbixSender([trapper.address], batch_size=1, keepalive=True, flush_interval=None) as sender:
+				sender.send("web01", "app.requests", 1)
+				sender.flush()
+				sender.send("web01", "crash", 2)
+				self.assertRaises(ZabbixRequestError, sender.flush)
+			self.assertEqual([v['key'] for v in seen], ["app.requests", "crash"])
+		finally:
+			trapper.close()
+
+	def test_closed_connection_replaced_before_sending(self):
+		trapper = FakeTrapperServer()
+		try:
+			connection = _Connection(trapper.address, 5, keepalive=True)
+			packet = _packet(b'{"request":"sender data","data":[{"host":"web01","key":"k","value":"1"}]}')
+			connection.exchange(packet)
+			# The server closes the connection after each response
+			time.sleep(0.1)
+			connection.exchange(packet)
+			connection.close()
+			self.assertEqual((trapper.packets, trapper.connections), (2, 2))
+		finally:
+			trapper.close()
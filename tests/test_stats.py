@@ -0,0 +1,74 @@
+from __future__ import unicode_literals
+import unittest
+from PyZabbixObj import ZabbixRequestError
+from PyZabbixObj.stats import RequestStats, prometheus_text
+from tests.helpers import FakeServerTestCase
+
+
+class RequestStatsTest(unittest.TestCase):
+
+	def test_snapshot(self):
+		stats = RequestStats(buckets=(0.1, 1.0))
+		stats.record("host.get", 0.05, 100, 1000)
+		stats.record("host.get", 0.5, 100, 2000)
+		stats.record("host.get", 5.0, 100, 0, error_code="ConnectionError")
+		stats.record_batch(["host.get", "hostgroup.get"], [("hostgroup.get", -32602)])
+		snapshot = stats.snapshot()
+		host = snapshot['methods']['host.get']
+		self.assertEqual(host['count'], 3)
+		self.assertEqual((host['request_bytes'], host['response_bytes']), (300, 3000))
+		self.assertEqual(host['histogram'], [(0.1, 1), (1.0, 2), (float("inf"), 3)])
+		self.assertEqual(host['errors'], {'ConnectionError': 1})
+		self.assertEqual(snapshot['methods']['hostgroup.get']['errors'], {'-32602': 1})
+		self.assertEqual((snapshot['batches'], snapshot['batch_calls']), (1, 2))
+		stats.reset()
+		self.assertEqual(stats.snapshot()['methods'], {})
+
+	def test_prometheus(self):
+		stats = RequestStats(buckets=(0.1,))
+		stats.record("host.get", 0.05, 10, 20, error_code=-32500)
+		snapshot = dict(stats.snapshot(), coalescing=None, cache=None)
+		text = prometheus_text(snapshot, prefix="zbx", server='zabbix "01"')
+		lines = text.splitlines()
+		self.assertTrue('# TYPE zbx_request_duration_seconds histogram' in lines)
+		self.assertTrue('zbx_requests_total{method="host.get",server="zabbix \\"01\\""} 1' in lines)
+		self.assertTrue('zbx_request_errors_total{code="-32500",method="host.get",server="zabbix \\"01\\""} 1' in lines)
+		self.assertTrue('zbx_request_duration_seconds_bucket{le="+Inf",method="host.get",server="zabbix \\"01\\""} 1' in lines)
+		self.assertFalse("coalesced" in text)
+
+
+class ServerStatsTest(FakeServerTestCase):
+	hosts = 10
+
+	def test_requests_counted(self):
+		self.server.do("get", "host", name="host000001")
+		self.server.do("get", "host", name="host000002")
+		self.assertRaises(ZabbixRequestError, self.server.create_many, "hostgroup", [{'name': "Group 0"}])
+		with self.server.batch() as batch:
+			batch.call("apiinfo.version")
+			batch.call("hostgroup.get", output=["groupid"])
+		stats = self.server.stats()
+		host = stats['methods']['host.get']
+		self.assertEqual(host['count'], 2)
+		self.assertTrue(host['response_bytes'] > 0 and host['request_bytes'] > 0)
+		self.assertEqual(stats['methods']['hostgroup.create']['errors'], {'-32602': 1})
+		self.assertEqual((stats['batches'], stats['batch_calls']), (1, 2))
+		self.assertEqual(stats['coalescing']['calls'], 2)
+		self.assertEqual(stats['cache'], None)
+		text = self.server.prometheus(server="fake")
+		self.assertTrue('pyzabbixobj_requests_total{method="host.get",server="fake"} 2' in text.splitlines())
+
+	def test_hooks(self):
+		sent = []
+		received = []
+		self.server.add_hook(pre=lambda request: sent.append(request['method']),
+			post=lambda request, response, seconds, error: received.append((response is not None, error)))
+		self.server.do("get", "host", name="host000001")
+		self.assertEqual(sent, ["host.get"])
+		self.assertEqual(received, [(True, None)])
+
+	def test_hook_errors_propagate(self):
+		def refuse(request):
+			raise ValueError("refused")
+		self.server.add_hook(pre=refuse)
+		self.assertRaises(ValueError, self.server.do, "get", "host", name="host000001")
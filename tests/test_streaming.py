@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import json
+import unittest
+from PyZabbixObj import ZabbixRequestError
+from PyZabbixObj.codec import gzip_compress, gzip_decompress_stream
+from PyZabbixObj.streaming import iter_result
+from tests.helpers import FakeServerTestCase
+
+
+class Error(Exception):
+	pass
+
+
+def chunked(body, size):
+	return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class IterResultTest(unittest.TestCase):
+
+	records = [
+		{'hostid': "10001", 'name': "café 漢字", 'tags': [], 'inventory': {}},
+		{'hostid': "10002", 'name': "quote \" and \\ backslash", 'value': -1.5e-3, 'items': [1, [2, {'a': None}]]},
+		{'hostid': "10003", 'name': "", 'enabled': True}
+	]
+
+	def body(self, **response):
+		return json.dumps(dict({'jsonrpc': "2.0", 'id': 1}, **response), ensure_ascii=False).encode("utf-8")
+
+	def parse(self, body, size):
+		return list(iter_result(chunked(body, size), lambda error: Error(error['code'])))
+
+	def test_any_chunk_size(self):
+		body = self.body(result=self.records)
+		for size in list(range(1, 40)) + [len(body)]:
+			self.assertEqual(self.parse(body, size), self.records, "chunk size %s" % size)
+
+	def test_numbers_cut_by_chunks(self):
+		body = b'{"jsonrpc":"2.0","result":[12345,-1.25,67e3],"id":1}'
+		for size in range(1, len(body) + 1):
+			self.assertEqual(self.parse(body, size), [12345, -1.25, 67e3])
+
+	def test_empty_and_scalar_results(self):
+		self.assertEqual(self.parse(self.body(result=[]), 1), [])
+		self.assertEqual(self.parse(self.body(result="3.0.0"), 2), ["3.0.0"])
+
+	def test_error(self):
+		body = self.body(error={'code': -32602, 'message': "Invalid params.", 'data': "x"})
+		for size in (1, 7, len(body)):
+			self.assertRaises(Error, self.parse, body, size)
+
+	def test_truncated(self):
+		body = self.body(result=self.records)
+		self.assertRaises(ValueError, self.parse, body[:-10], 5)
+
+	def test_gzip_chunks(self):
+		body = self.body(result=self.records)
+		compressed = gzip_compress(body)
+		for size in (1, 2, 3, 50, len(compressed)):
+			chunks = gzip_decompress_stream(chunked(compressed, size))
+			self.assertEqual(list(iter_result(chunks, Error)), self.records)
+
+
+class ServerStreamTest(FakeServerTestCase):
+
+	def test_stream_matches_get(self):
+		streamed = list(self.server.stream("host.get", output=["hostid", "host"], selectGroups=["groupid"]))
+		self.assertEqual(len(streamed), self.hosts)
+		self.assertEqual(streamed[0]['host'], "host000000")
+		self.assertEqual(len(streamed[0]['groups']), 1)
+
+	def test_stream_error(self):
+		def consume():
+			return list(self.server.stream("host.get", selectTemplates="extend"))
+		self.assertRaises(ZabbixRequestError, consume)
+
+	def test_stream_compressed(self):
+		server = self.connect(compress=True)
+		self.assertEqual(len(list(server.stream("host.get", output="extend"))), self.hosts)
@@ -0,0 +1,66 @@
+from __future__ import unicode_literals
+import logging
+import sys
+from PyZabbixObj import trace_logger
+from tests.helpers import FakeServerTestCase
+
+try:
+	from StringIO import StringIO
+except ImportError:
+	from io import StringIO
+
+
+class _Records(logging.Handler):
+
+	def __init__(self):
+		logging.Handler.__init__(self, logging.DEBUG)
+		self.messages = []
+
+	def emit(self, record):
+		self.messages.append(record.getMessage())
+
+
+class TraceTest(FakeServerTestCase):
+	hosts = 20
+
+	def setUp(self):
+		self.records = _Records()
+		trace_logger.addHandler(self.records)
+		self.level = trace_logger.level
+		trace_logger.setLevel(logging.DEBUG)
+		FakeServerTestCase.setUp(self)
+
+	def tearDown(self):
+		trace_logger.removeHandler(self.records)
+		trace_logger.setLevel(self.level)
+
+	def test_only_a_null_handler(self):
+		self.assertEqual([type(h).__name__ for h in logging.getLogger("PyZabbixObj").handlers], ["NullHandler"])
+
+	def test_nothing_printed_or_traced_by_default(self):
+		stdout = sys.stdout
+		sys.stdout = StringIO()
+		try:
+			self.server.do("get", "host", name="host000001")
+			self.server.get_many("host", names=["host000002"])
+			printed = sys.stdout.getvalue()
+		finally:
+			sys.stdout = stdout
+		self.assertEqual(printed, "")
+		self.assertEqual(self.records.messages, [])
+
+	def test_trace(self):
+		server = self.connect(trace=True, trace_limit=None)
+		server.do("get", "host", name="host000001")
+		self.assertEqual(len(self.records.messages), 4)
+		self.assertTrue(self.records.messages[0].startswith("Request "))
+		self.assertTrue('"password":"***"' in self.records.messages[0].replace(" ", ""))
+		self.assertFalse(self.api.password in self.records.messages[0])
+		self.assertTrue("host000001" in self.records.messages[-1])
+
+	def test_trace_limit(self):
+		server = self.connect(trace=True, trace_limit=50)
+		list(server.iter("host", page_size=100))
+		response = [m for m in self.records.messages if m.startswith("Response ")][-1]
+		self.assertTrue(response.endswith("characters)"))
+		self.assertTrue(len(response) < 100)